@@ -1,12 +1,18 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
 from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
-from ultralytics import YOLO
-import cv2
 import requests
-import numpy as np
 import os
-from datetime import datetime
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from securevision.events import default_store
+from securevision.harness import check_frame, HarnessVerdictCache, HARNESS_IMGSZ, HARNESS_MAX_BATCH, HARNESS_VERDICT_TTL
+from securevision.metrics import draw_stats, get_metrics, serve_metrics
+from securevision.models import load_model
+from securevision.scheduler import InferenceScheduler, SCHED_MAX_WAIT_MS
+from securevision.snapshots import SnapshotWriter, ViolationEpisodes
 
 # Page configuration
 st.set_page_config(page_title="Harness Detection", page_icon="🧰", layout="wide")
@@ -26,64 +32,90 @@ if lottie_ai:
 st.title("🧰 Real-Time Harness Compliance Monitoring")
 st.caption("Using YOLOv8 + Streamlit for live safety violation detection")
 
-# Load models
+# Load models (from the shared model server when $SECUREVISION_MODEL_SERVER is set)
 
 @st.cache_resource
 def load_models():
-    person_path = os.path.join(os.path.dirname(__file__), "yolo11n.pt")
-    harness_path = os.path.join(os.path.dirname(__file__), "best.pt")
-    
-    person_model = YOLO(person_path)
-    harness_model = YOLO(harness_path)
-    
+    person_model = load_model("harness_person")   # yolo11n.pt
+    harness_model = load_model("harness")         # best.pt
+
     return person_model, harness_model
 
+# Per-stage latency shared by every stream; /metrics when $SECUREVISION_METRICS_PORT is set
+metrics = get_metrics("harness")
+serve_metrics()
+
+# Frames (and crops) from every browser session are batched on one inference thread
+@st.cache_resource
+def get_scheduler():
+    return InferenceScheduler(metrics=metrics)
+
+scheduler = get_scheduler()
 person_model, harness_model = load_models()
-# Ensure output directory exists
-os.makedirs("flagged_frames", exist_ok=True)
+person_model = scheduler.wrap(person_model, "person")
+harness_model = scheduler.wrap(harness_model, "harness")
+
+# Flagged frames are written off the video thread, one per violation episode
+@st.cache_resource
+def get_snapshot_writer():
+    return SnapshotWriter("flagged_frames", metrics=metrics)
+
+snapshot_writer = get_snapshot_writer()
+# Each episode is also recorded in the queryable event store ($SECUREVISION_EVENTS_DB)
+event_store = default_store()
 
 # Video processor
 class HarnessVideoProcessor(VideoTransformerBase):
     def __init__(self):
         self.frame_idx = 0
+        self.harness_imgsz = HARNESS_IMGSZ
+        self.max_batch = HARNESS_MAX_BATCH
+        self.show_stats = False
+        self.episodes = ViolationEpisodes(snapshot_writer, prefix="flagged", events=event_store,
+                                          camera="webcam", app="harness")
+        # tracked people keep their harness verdict until it goes stale
+        self.verdicts = HarnessVerdictCache(metrics=metrics)
 
     def transform(self, frame):
+        started = time.perf_counter()
         self.frame_idx += 1
-        img = frame.to_ndarray(format="bgr24")
-        annotated_frame = img.copy()
-        flagged = False
-
-        # Detect people
-        results = person_model(img, classes=[0], conf=0.4)[0]
-        person_boxes = results.boxes.xyxy.cpu().numpy().astype(int)
-
-        for box in person_boxes:
-            x1, y1, x2, y2 = box
-            person_crop = img[y1:y2, x1:x2]
-            harness_results = harness_model(person_crop, conf=0.4)[0]
-            harness_boxes = harness_results.boxes.xyxy.cpu().numpy().astype(int)
-
-            if len(harness_boxes) == 0:
-                flagged = True
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                cv2.putText(annotated_frame, "❌ No Harness", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            else:
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(annotated_frame, "✅ Harness", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-        # Save flagged frame
-        if flagged:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            path = os.path.join("flagged_frames", f"flagged_{timestamp}.jpg")
-            cv2.imwrite(path, annotated_frame)
-
+        with metrics.stage("decode"):
+            img = frame.to_ndarray(format="bgr24")
+
+        # Detect people, check the new or uncertain ones for a harness, box everyone
+        annotated_frame, violators = check_frame(person_model, harness_model, img, self.verdicts,
+                                                 imgsz=self.harness_imgsz, max_batch=self.max_batch,
+                                                 metrics=metrics)
+
+        # Keep the frame with the most violators of each episode
+        with metrics.stage("io.snapshot"):
+            self.episodes.update(annotated_frame, violators > 0, score=violators,
+                                 classes={"No Harness": violators})
+
+        metrics.frame_done(started)
+        if self.show_stats:
+            draw_stats(annotated_frame, metrics)
         return annotated_frame
 
+    def on_ended(self):
+        # stream closed mid-episode: still save its snapshot
+        self.episodes.flush()
+
 # Webcam stream
 st.header("📸 Live Detection Feed")
-webrtc_streamer(
+max_batch = st.sidebar.slider("Max harness batch size", 1, 32, HARNESS_MAX_BATCH,
+                              help="Person crops sent to the harness model per forward pass.")
+verdict_ttl = st.sidebar.slider("Re-check each worker's harness every (s)", 0.0, 10.0, HARNESS_VERDICT_TTL, 0.5,
+                                help="Tracked workers keep their verdict this long, unless their box changes "
+                                     "a lot or the score was borderline. 0 = check everyone every frame.")
+batch_window = st.sidebar.slider("Cross-session batch window (ms)", 0, 100, int(SCHED_MAX_WAIT_MS),
+                                 help="How long a frame waits for other sessions' frames to share a forward pass. "
+                                      "0 = lowest latency, higher = more throughput with many viewers. "
+                                      "Applies to every session.")
+scheduler.max_wait_ms = batch_window
+show_stats = st.sidebar.checkbox("Show FPS / latency overlay", value=False)
+
+ctx = webrtc_streamer(
     key="harness_stream",
     video_processor_factory=HarnessVideoProcessor,
     rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},
@@ -91,6 +123,19 @@ webrtc_streamer(
     async_processing=True
 )
 
+if ctx.video_processor:
+    ctx.video_processor.max_batch = max_batch
+    ctx.video_processor.verdicts.ttl = verdict_ttl
+    ctx.video_processor.show_stats = show_stats
+
+with st.expander("⏱️ Stage latency (ms)"):
+    st.json(metrics.snapshot())
+    if ctx.video_processor:
+        st.json(ctx.video_processor.verdicts.stats())
+    st.json(scheduler.stats())
+    if event_store:
+        st.json(event_store.stats())
+
 # Footer
 st.markdown("---")
 st.markdown(
@@ -1,13 +1,20 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
 from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
-import torch
-from ultralytics import YOLO
-import cv2
 import requests
-import numpy as np
-import json
 import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from securevision.annotate import as_array, downscale
+from securevision.events import default_store
+from securevision.metrics import draw_stats, get_metrics, serve_metrics
+from securevision.models import load_model as load_weights
+from securevision.ppe import check_frame
+from securevision.scheduler import InferenceScheduler, SCHED_MAX_WAIT_MS
+from securevision.snapshots import ViolationEpisodes
+from securevision.tracking import KeyframeDetector, MAX_DETECT_EVERY
 
 # Streamlit page config
 st.set_page_config(page_title="PPE Detection", page_icon="🦺", layout="wide")
@@ -26,30 +33,25 @@ if lottie_ai:
 st.title("🦺 Real-Time PPE Detection")
 st.caption("Using YOLOv8 + Streamlit for live compliance monitoring")
 
-# Load model
+# Per-stage latency shared by every stream (and the Demo page); /metrics when $SECUREVISION_METRICS_PORT is set
+metrics = get_metrics("ppe")
+serve_metrics()
+
+# Load model (from the shared model server when $SECUREVISION_MODEL_SERVER is set)
 @st.cache_resource
 def load_model():
-    model_path = os.path.join(os.path.dirname(__file__), "best.pt")
-    return YOLO(model_path)
+    return load_weights("ppe")   # best.pt
 
-model = load_model()
-class_names = model.names
+# Frames from every browser session are batched on one inference thread
+@st.cache_resource
+def get_scheduler():
+    return InferenceScheduler(metrics=metrics)
 
-REQUIRED_LABELS = {
-    "Glasses": "🕶️ Wear safety glasses",
-    "Mask": "😷 Wear a mask",
-    "Vest": "🦺 Wear a safety vest",
-    "Safety Shoes": "🥾 Wear safety shoes",
-    "Helmet": "⛑️ Wear a helmet"
-}
-
-VIOLATION_LABELS = {
-    "Without Glass": "❌ No safety glasses",
-    "Without Mask": "❌ No mask",
-    "Without Vest": "❌ No safety vest",
-    "Without Safety Shoes": "❌ No safety shoes",
-    "Without Helmet": "❌ No helmet"
-}
+scheduler = get_scheduler()
+model = scheduler.wrap(load_model(), "ppe")
+class_names = model.names
+# Violation episodes go to the queryable event store ($SECUREVISION_EVENTS_DB)
+event_store = default_store()
 
 CONFIDENCE_THRESHOLD = 0.25
 
@@ -57,36 +59,51 @@ CONFIDENCE_THRESHOLD = 0.25
 class PPEVideoProcessor(VideoTransformerBase):
     def __init__(self):
         self.frame_width = 640
-        self.frame_height = 480
+        self.show_stats = False
+        # detector on keyframes only; boxes follow optical flow in between
+        self.keyframes = KeyframeDetector(metrics=metrics)
+        self.episodes = ViolationEpisodes(None, events=event_store, camera="webcam", app="ppe")
 
-    def transform(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        img_resized = cv2.resize(img, (self.frame_width, self.frame_height))
-
-        results = model(img_resized, conf=CONFIDENCE_THRESHOLD)[0]
-        boxes = results.boxes
-        detected_classes = [class_names[int(cls)] for cls in boxes.cls]
-
-        annotated = results.plot()  # has bounding boxes
-
-        y = 30
-        if "Person" in detected_classes:
-            for label, message in REQUIRED_LABELS.items():
-                if label not in detected_classes:
-                    cv2.putText(annotated, message, (10, y),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    y += 30
-            for label, message in VIOLATION_LABELS.items():
-                if label in detected_classes:
-                    cv2.putText(annotated, message, (10, y),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    y += 30
+    def detect(self, img):
+        with metrics.stage("inference.ppe"):
+            return as_array(model(img, conf=CONFIDENCE_THRESHOLD)[0])
 
+    def transform(self, frame):
+        started = time.perf_counter()
+        with metrics.stage("decode"):
+            img = frame.to_ndarray(format="bgr24")
+        with metrics.stage("preprocess"):
+            # keep the aspect ratio: YOLO's letterbox then has nothing left to resize or distort
+            img_resized = downscale(img, self.frame_width)
+
+        dets = self.keyframes.update(img_resized, self.detect)
+        # per-worker compliance, boxes and the REQUIRED/VIOLATION overlay
+        annotated, missing = check_frame(img_resized, dets, class_names, metrics)
+        self.episodes.update(None, bool(missing), score=sum(missing.values()), classes=missing)
+
+        metrics.frame_done(started)
+        if self.show_stats:
+            draw_stats(annotated, metrics)
         return annotated
 
+    def on_ended(self):
+        self.episodes.flush()
+
 # Stream video from webcam
 st.header("📸 Live Detection Feed")
-webrtc_streamer(
+batch_window = st.sidebar.slider("Cross-session batch window (ms)", 0, 100, int(SCHED_MAX_WAIT_MS),
+                                 help="How long a frame waits for other sessions' frames to share a forward pass. "
+                                      "0 = lowest latency, higher = more throughput with many viewers. "
+                                      "Applies to every session.")
+scheduler.max_wait_ms = batch_window
+max_k = st.sidebar.slider("Max frames between detections", 1, 20, MAX_DETECT_EVERY,
+                          help="In between, boxes are carried forward with optical flow. "
+                               "1 = run the detector on every frame.")
+adaptive_k = st.sidebar.checkbox("Adapt to processing lag", value=True,
+                                 help="Detect less often while frames take longer than the frame budget.")
+show_stats = st.sidebar.checkbox("Show FPS / latency overlay", value=False)
+
+ctx = webrtc_streamer(
     key="ppe_stream",
     video_processor_factory=PPEVideoProcessor,
     rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},
@@ -94,6 +111,18 @@ webrtc_streamer(
     async_processing=True
 )
 
+if ctx.video_processor:
+    ctx.video_processor.show_stats = show_stats
+    keyframes = ctx.video_processor.keyframes
+    keyframes.max_k, keyframes.adaptive = max_k, adaptive_k
+    keyframes.k = min(keyframes.k, max_k) if adaptive_k else max_k
+
+with st.expander("⏱️ Stage latency (ms)"):
+    st.json(metrics.snapshot())
+    st.json(scheduler.stats())
+    if event_store:
+        st.json(event_store.stats())
+
 st.markdown("---")
 st.markdown(
     "<div style='text-align: center; color: #ccc;'>© 2025 | TATAVision Secure | Powered by YOLOv8</div>",
@@ -1,9 +1,11 @@
 import streamlit as st
 import cv2
+import csv
+import io
 import os
-import tempfile
+import sys
+import threading
 import time
-from ultralytics import YOLO
 from collections import Counter
 
 st.set_page_config(page_title="PPE Demo", page_icon="🎬", layout="wide")
@@ -13,9 +15,29 @@ st.caption("Run the model on a demo video or upload your own")
 
 # ── Paths ──────────────────────────────────────────────────────────────────────
 BASE_DIR   = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "best.pt")
 DEMO_DIR   = os.path.join(BASE_DIR, "demo_videos")
 
+sys.path.append(os.path.dirname(BASE_DIR))
+from securevision.annotate import as_array, downscale, render
+from securevision.batching import auto_batch_size, infer_batched
+from securevision.detcache import CACHE_CONF, DetectionCache, model_id, warm
+from securevision.metrics import draw_stats, get_metrics, serve_metrics
+from securevision.models import load_model as load_weights
+from securevision.pipeline import VideoPipeline
+from securevision.roi import DEFAULT_IMGSZ
+from securevision.ppe import (COMPLIANCE_HEADER, class_counts, compliance, compliance_rows, matrix_messages,
+                             update_peaks, worker_tags)
+from securevision.ui import UIScheduler
+from securevision.uploads import deferred_file, session_dir, spool_upload
+from securevision.video import iter_frames, iter_sampled, sampled_indices
+
+# Max refreshes per second for each placeholder (each one is a websocket message)
+UI_RATES = {"frame": 8, "detections": 4, "peaks": 2, "progress": 4, "stats": 1}
+
+# Per-stage latency across sessions; /metrics when $SECUREVISION_METRICS_PORT is set
+metrics = get_metrics("ppe_demo")
+serve_metrics()
+
 DEMO_VIDEOS = [
     {"title": "🏗️ Construction Site", "file": "construction_site.mp4"},
     {"title": "🏭 Factory Floor",      "file": "factory_floor.mp4"},
@@ -28,13 +50,45 @@ if "running"      not in st.session_state: st.session_state.running      = False
 if "tmp_vid_path" not in st.session_state: st.session_state.tmp_vid_path = None
 
 # ── Model ──────────────────────────────────────────────────────────────────────
+# the shared model server is used when $SECUREVISION_MODEL_SERVER is set
 @st.cache_resource
 def load_model():
-    return YOLO(MODEL_PATH)
+    return load_weights("ppe")   # best.pt
 
 model       = load_model()
 class_names = model.names  # dict {int: str}
 
+# Raw detections per (video content, weights), stored at the lowest confidence:
+# moving the slider or switching modes re-filters them instead of re-inferring
+@st.cache_resource
+def get_detection_cache():
+    return DetectionCache()
+
+@st.cache_resource
+def get_model_lock():
+    # runs and the demo-clip pre-warm thread share one model
+    return threading.Lock()
+
+detections = get_detection_cache()
+model_lock = get_model_lock()
+
+def detect_raw(frames, imgsz=DEFAULT_IMGSZ):
+    return [as_array(r) for r in model(frames, conf=CACHE_CONF, imgsz=imgsz, verbose=False)]
+
+@st.cache_resource
+def prewarm_demo_clips():
+    # once per process, in the background: the demo clips' first Run is then a cache hit
+    paths = [os.path.join(DEMO_DIR, d["file"]) for d in DEMO_VIDEOS]
+    def work():
+        for path in paths:
+            if os.path.exists(path):
+                warm(detections, path, model_id("ppe"), detect_raw, lock=model_lock)
+    thread = threading.Thread(target=work, name="detcache-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+prewarm_demo_clips()
+
 # ── Sidebar ────────────────────────────────────────────────────────────────────
 st.sidebar.header("Controls")
 source = st.sidebar.radio("Video source", ["Upload a video", "Use a demo video"])
@@ -44,14 +98,8 @@ video_path = None
 if source == "Upload a video":
     uploaded = st.sidebar.file_uploader("Upload video", type=["mp4", "avi", "mov", "mkv"])
     if uploaded:
-        # Only write to disk once per upload, reuse on reruns
-        if st.session_state.tmp_vid_path is None or \
-           not os.path.exists(st.session_state.tmp_vid_path):
-            suffix = os.path.splitext(uploaded.name)[-1] or ".mp4"
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            tmp.write(uploaded.read())
-            tmp.close()
-            st.session_state.tmp_vid_path = tmp.name
+        # Spooled to this session's scratch dir in chunks, once per upload
+        st.session_state.tmp_vid_path = spool_upload(uploaded, session_dir(st.session_state))
         video_path = st.session_state.tmp_vid_path
 else:
     # Clear any stale upload temp path when switching to demo mode
@@ -65,23 +113,52 @@ else:
         st.sidebar.warning(f"File not found: {options[choice]}")
 
 conf       = st.sidebar.slider("Confidence", 0.10, 0.90, 0.25, 0.05)
-frame_skip = st.sidebar.slider("Process every N frames", 1, 6, 2)
+imgsz      = st.sidebar.select_slider("Inference size (px)", options=[320, 480, 640, 960, 1280],
+                                      value=DEFAULT_IMGSZ,
+                                      help="Longest side frames are resized to for detection, whatever the "
+                                           "video's resolution. Higher finds smaller objects in 4K footage, "
+                                           "at more cost.")
+MODEL_ID   = model_id("ppe", imgsz=imgsz)
+sampling   = st.sidebar.radio("Frame sampling", ["Every N frames", "Frames per second"], horizontal=True,
+                              help="Skipped frames are only grabbed, never fully decoded to BGR. "
+                                   "Frames per second ignores the source FPS and seeks over long gaps. "
+                                   "Export always writes every frame.")
+if sampling == "Every N frames":
+    frame_skip = st.sidebar.slider("Process every N frames", 1, 6, 2)
+    per_second = None
+else:
+    frame_skip = 1
+    per_second = st.sidebar.slider("Analysed frames per second", 0.2, 10.0, 2.0, 0.2)
+batch_choice = st.sidebar.select_slider(
+    "Frames per inference batch", options=["Auto", 1, 2, 4, 8, 16, 32], value="Auto",
+    help="Used by Export and Offline Analysis. Auto picks the largest batch that fits the memory budget."
+)
+show_stats = st.sidebar.checkbox("Show FPS / latency overlay", value=False,
+                                 help="Drawn on the Live Preview frames.")
 
 st.sidebar.markdown("---")
 mode = st.sidebar.radio(
     "Mode",
-    ["▶ Live Preview", "💾 Export Annotated Video"],
-    help="Live Preview streams frames as they process. Export saves the full annotated video for download."
+    ["▶ Live Preview", "💾 Export Annotated Video", "⚡ Offline Analysis"],
+    help="Live Preview streams frames as they process. Export saves the full annotated video for download. "
+         "Offline Analysis runs batched inference for the summary only."
 )
 
 run  = st.sidebar.button("Run",  disabled=video_path is None, use_container_width=True)
-stop = st.sidebar.button("■ Stop", disabled=mode == "💾 Export Annotated Video",
+stop = st.sidebar.button("■ Stop", disabled=mode != "▶ Live Preview",
                           use_container_width=True)
 
 if stop: st.session_state.running = False
 if run:  st.session_state.running = True
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
+def resolve_batch_size(cap):
+    if batch_choice != "Auto":
+        return batch_choice
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720
+    width  = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280
+    return auto_batch_size((height, width))
+
 def render_peak_html(peak_counts):
     rows = []
     for cls, cnt in peak_counts.most_common():
@@ -97,6 +174,86 @@ def render_peak_html(peak_counts):
         )
     return "".join(rows)
 
+def render_detections_md(frame_counts):
+    if not frame_counts:
+        return "_Nothing detected_"
+    lines = []
+    for cls, cnt in sorted(frame_counts.items(), key=lambda x: -x[1]):
+        icon = "🔴" if ("no-" in cls.lower() or "without" in cls.lower()) else "🟢"
+        lines.append(f"{icon} **{cls}** × {cnt}")
+    return "\n".join(lines)
+
+def render_peaks(ui, peak_counts):
+    if peak_counts:
+        ui.update("peaks", tuple(sorted(peak_counts.items())),
+                  lambda: peak_slot.markdown(render_peak_html(peak_counts), unsafe_allow_html=True))
+
+def update_progress(ui, idx, total, fps):
+    pct = min(idx / total, 1.0)
+    ts  = f"{int(idx/fps//60):02d}:{int(idx/fps%60):02d}"
+    ui.update("progress", idx, lambda: prog_slot.progress(pct, text=f"{ts}  |  frame {idx}/{total}"))
+
+def sampled_frames(cap, fps):
+    if per_second:
+        frames = iter_sampled(cap, per_second, fps)
+    else:
+        frames = iter_frames(cap, every=frame_skip)
+    return metrics.timed_iter(frames, "decode")
+
+def infer_frames(frames):
+    with model_lock, metrics.stage("inference.ppe"):
+        return detect_raw(frames, imgsz)
+
+def cached_detect(clip):
+    # (idx, frame) pairs → detections above the slider's confidence; only uncached frames hit the model
+    return lambda batch: clip.detect(infer_frames, batch, conf)
+
+def worker_compliance(dets, frame_counts):
+    # persons x PPE items for one frame and its overlay; feeds the preview/video, the worker tags and the CSV
+    persons, matrix, unassigned = compliance(dets, class_names)
+    return persons, matrix, matrix_messages(matrix, frame_counts, unassigned)
+
+def show_preview(frame, dets, persons, matrix, messages):
+    # only frames that are actually sent get annotated, at 800px
+    with metrics.stage("annotate"):
+        preview = render(frame, dets, class_names, max_width=800,
+                         messages=messages, tags=worker_tags(persons, matrix))
+        if show_stats:
+            draw_stats(preview, metrics)
+        preview = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+    with metrics.stage("io.preview"):
+        frame_slot.image(preview, use_container_width=True)
+
+def offer_compliance_csv(rows):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(COMPLIANCE_HEADER)
+    w.writerows(rows)
+    st.download_button("⬇️ Download per-worker compliance (CSV)", buf.getvalue(),
+                       file_name="ppe_compliance.csv", mime="text/csv", on_click="ignore")
+
+def stage_latency():
+    with st.expander("⏱️ Stage latency (ms)"):
+        st.json(metrics.snapshot())
+        st.json(detections.stats())
+
+def cache_caption(clip):
+    st.caption(f"Detections: {clip.hits} frame(s) from cache, {clip.misses} inferred")
+
+def sampling_label():
+    return f"{per_second:g} frame(s) per second" if per_second else f"every {frame_skip} frame(s)"
+
+def pipeline_caption(stats):
+    return "  |  ".join(
+        f"{name} {stats[name]['fps']:.0f} fps (queue {stats[name]['queue']})"
+        for name in ("decode", "infer", "encode")
+    ) + f"  |  overall {stats['overall_fps']:.1f} fps"
+
+def ui_rate_caption(ui):
+    per_widget = ", ".join(f"{k} {v}" for k, v in sorted(ui.sent.items()))
+    st.caption(f"UI updates sent: {ui.updates_per_second():.1f}/s "
+               f"({ui.total_sent()} sent — {per_widget}; {ui.skipped} throttled or unchanged)")
+
 def render_summary(peak_counts):
     st.markdown("---")
     st.subheader("✅ Analysis Complete — Final Summary")
@@ -128,7 +285,7 @@ with info_col:
     det_slot  = st.empty()
     st.markdown("---")
     st.markdown("#### 📊 Peak Counts")
-    st.caption("Max of each class seen in any single frame")
+    st.caption("Max boxes of each class seen in any single frame, worn by a detected worker or not")
     peak_slot = st.empty()
     st.markdown("---")
     prog_slot = st.empty()
@@ -151,57 +308,43 @@ if st.session_state.running and video_path and mode == "▶ Live Preview":
     fps   = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
     idx   = 0
     peak_counts = Counter()
+    ui    = UIScheduler(UI_RATES)
+    clip  = detections.clip(video_path, MODEL_ID)
+    detect = cached_detect(clip)
 
     try:
-        while cap.isOpened() and st.session_state.running:
-            ret, frame = cap.read()
-            if not ret:
+        started = time.perf_counter()
+        for idx, frame in sampled_frames(cap, fps):
+            if not st.session_state.running:
                 break
 
-            idx += 1
-            if idx % frame_skip != 0:
-                continue
-
-            results  = model(frame, conf=conf, verbose=False)[0]
-            boxes    = results.boxes
-            detected = [class_names[int(c)] for c in boxes.cls] if len(boxes) > 0 else []
-
-            frame_counts = Counter(detected)
-            for cls, cnt in frame_counts.items():
-                if cnt > peak_counts[cls]:
-                    peak_counts[cls] = cnt
-
-            annotated = results.plot(line_width=2)
-            h, w      = annotated.shape[:2]
-            if w > 800:
-                annotated = cv2.resize(annotated, (800, int(h * 800 / w)))
+            dets = detect([(idx, frame)])[0]
+            with metrics.stage("postprocess"):
+                frame_counts = class_counts(dets, class_names)
+                persons, matrix, messages = worker_compliance(dets, frame_counts)
+                update_peaks(peak_counts, frame_counts)
 
-            if idx % 5 == 0:
-                frame_slot.image(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB),
-                                 use_container_width=True)
+            ui.update("frame", idx, lambda: show_preview(frame, dets, persons, matrix, messages))
 
-            if detected:
-                lines = []
-                for cls, cnt in sorted(frame_counts.items(), key=lambda x: -x[1]):
-                    icon = "🔴" if ("no-" in cls.lower() or "without" in cls.lower()) else "🟢"
-                    lines.append(f"{icon} **{cls}** × {cnt}")
-                det_slot.markdown("\n".join(lines))
-            else:
-                det_slot.markdown("_Nothing detected_")
+            with metrics.stage("io.ui"):
+                ui.update("detections", tuple(sorted(frame_counts.items())),
+                          lambda: det_slot.markdown(render_detections_md(frame_counts)))
+                render_peaks(ui, peak_counts)
+                update_progress(ui, idx, total, fps)
 
-            if peak_counts:
-                peak_slot.markdown(render_peak_html(peak_counts), unsafe_allow_html=True)
+            metrics.frame_done(started)
+            started = time.perf_counter()
 
-            pct = min(idx / total, 1.0)
-            ts  = f"{int(idx/fps//60):02d}:{int(idx/fps%60):02d}"
-            prog_slot.progress(pct, text=f"{ts}  |  frame {idx}/{total}")
-
-            time.sleep(0.01)
+        ui.flush()
 
     finally:
         cap.release()
+        detections.save(clip)
         st.session_state.running = False
 
+    ui_rate_caption(ui)
+    cache_caption(clip)
+    stage_latency()
     if peak_counts:
         render_summary(peak_counts)
 
@@ -223,10 +366,8 @@ if st.session_state.running and video_path and mode == "💾 Export Annotated Vi
     idx    = 0
     peak_counts = Counter()
 
-    # temp output file
-    out_tmp  = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-    out_path = out_tmp.name
-    out_tmp.close()
+    # output lives in this session's scratch dir until the next export
+    out_path = os.path.join(session_dir(st.session_state), "ppe_annotated.mp4")
 
     writer = cv2.VideoWriter(
         out_path,
@@ -236,45 +377,66 @@ if st.session_state.running and video_path and mode == "💾 Export Annotated Vi
     )
 
     prog_slot.info("⏳ Processing all frames and writing annotated video…")
+    stats_slot = st.empty()
+    ui = UIScheduler(UI_RATES)
+
+    def detect_and_check(batch):
+        # each frame's compliance is worked out once, here, for both the writer and the CSV
+        with metrics.stage("postprocess"):
+            results = []
+            for dets in detect(batch):
+                frame_counts = class_counts(dets, class_names)
+                results.append((dets, frame_counts, *worker_compliance(dets, frame_counts)))
+            return results
+
+    def annotate_and_write(i, frame, result):
+        # runs on the encode thread, in frame order
+        dets, _, persons, matrix, messages = result
+        with metrics.stage("annotate"):
+            annotated = render(frame, dets, class_names, messages=messages, tags=worker_tags(persons, matrix))
+        with metrics.stage("io.video_write"):
+            writer.write(annotated)
+        metrics.frame_done()
+        return i, annotated
+
+    # decode and annotate/encode overlap inference on their own threads
+    clip = detections.clip(video_path, MODEL_ID)
+    detect = cached_detect(clip)
+    pipeline = VideoPipeline(
+        cap,
+        infer=detect_and_check,
+        sink=annotate_and_write,
+        batch_size=resolve_batch_size(cap),
+        metrics=metrics,
+        indexed=True,
+    )
 
+    worker_rows = []
     try:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        for idx, frame, (dets, frame_counts, persons, matrix, _) in pipeline:
+            worker_rows.extend(compliance_rows((idx - 1) / fps, persons, matrix))
+            update_peaks(peak_counts, frame_counts)
 
-            idx += 1
-            results  = model(frame, conf=conf, verbose=False)[0]
-            boxes    = results.boxes
-            detected = [class_names[int(c)] for c in boxes.cls] if len(boxes) > 0 else []
-
-            frame_counts = Counter(detected)
-            for cls, cnt in frame_counts.items():
-                if cnt > peak_counts[cls]:
-                    peak_counts[cls] = cnt
-
-            # write every frame (no skip — export should be complete)
-            annotated = results.plot(line_width=2)
-            writer.write(annotated)
+            # preview the latest encoded frame so user sees progress
+            if pipeline.latest is not None:
+                shown_idx, annotated = pipeline.latest
+                ui.update("frame", shown_idx, lambda: frame_slot.image(
+                    cv2.cvtColor(downscale(annotated, 800), cv2.COLOR_BGR2RGB),
+                    use_container_width=True,
+                    caption=f"Processing frame {shown_idx}/{total}…"))
 
-            # preview every 15th frame so user sees progress
-            if idx % 15 == 0:
-                h, w = annotated.shape[:2]
-                preview = cv2.resize(annotated, (800, int(h * 800 / w))) if w > 800 else annotated
-                frame_slot.image(cv2.cvtColor(preview, cv2.COLOR_BGR2RGB),
-                                 use_container_width=True,
-                                 caption=f"Processing frame {idx}/{total}…")
+            ui.update("stats", idx, lambda: stats_slot.caption(pipeline_caption(pipeline.summary())))
+            render_peaks(ui, peak_counts)
+            update_progress(ui, idx, total, fps)
 
-            if peak_counts:
-                peak_slot.markdown(render_peak_html(peak_counts), unsafe_allow_html=True)
-
-            pct = min(idx / total, 1.0)
-            ts  = f"{int(idx/fps//60):02d}:{int(idx/fps%60):02d}"
-            prog_slot.progress(pct, text=f"{ts}  |  frame {idx}/{total}")
+        ui.flush()
+        clip.frame_count = idx   # every frame is cached now
 
     finally:
+        pipeline.close()   # joins the stage threads before the capture is released
         cap.release()
         writer.release()
+        detections.save(clip)
         st.session_state.running = False
 
     # ── Offer download ──────────────────────────────────────────────────────
@@ -282,20 +444,82 @@ if st.session_state.running and video_path and mode == "💾 Export Annotated Vi
     prog_slot.empty()
 
     if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
-        with open(out_path, "rb") as f:
-            video_bytes = f.read()
-        os.unlink(out_path)   # clean up temp file after reading
-
         st.success("✅ Done! Your annotated video is ready.")
+        # read from disk only when clicked; no rerun so the button stays
         st.download_button(
             label="⬇️ Download Annotated Video",
-            data=video_bytes,
+            data=deferred_file(out_path),
             file_name="ppe_annotated.mp4",
             mime="video/mp4",
+            on_click="ignore",
             use_container_width=True,
         )
     else:
         st.error("Something went wrong writing the video file.")
+    if worker_rows:
+        offer_compliance_csv(worker_rows)
+
+    cache_caption(clip)
+    stage_latency()
+    if peak_counts:
+        render_summary(peak_counts)
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MODE C — Offline Analysis (batched inference, summary only)
+# ══════════════════════════════════════════════════════════════════════════════
+if st.session_state.running and video_path and mode == "⚡ Offline Analysis":
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        st.error("Could not open video — try re-uploading or check the demo file path.")
+        st.session_state.running = False
+        st.stop()
+
+    total      = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    fps        = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+    batch_size = resolve_batch_size(cap)
+    analysed   = 0
+    peak_counts = Counter()
+
+    frame_slot.info(f"⚡ Analysing {sampling_label()} in batches of {batch_size}…")
+    started = time.perf_counter()
+    ui = UIScheduler(UI_RATES)
+
+    worker_rows = []
+    clip = detections.clip(video_path, MODEL_ID)
+    wanted = sampled_indices(clip.frame_count, frame_skip, per_second, fps) if clip.frame_count else None
+    try:
+        if wanted is not None and clip.covers(wanted):
+            frames = ((i, None) for i in wanted)   # all cached: no decoding either
+        else:
+            frames = sampled_frames(cap, fps)
+        for idx, frame, dets in infer_batched(cached_detect(clip), frames, batch_size, indexed=True):
+            analysed += 1
+            with metrics.stage("postprocess"):
+                persons, matrix, _ = compliance(dets, class_names)
+                worker_rows.extend(compliance_rows((idx - 1) / fps, persons, matrix))
+                update_peaks(peak_counts, class_counts(dets, class_names))
+
+            with metrics.stage("io.ui"):
+                render_peaks(ui, peak_counts)
+                update_progress(ui, idx, total, fps)
+            metrics.frame_done()
+
+    finally:
+        cap.release()
+        detections.save(clip)
+        st.session_state.running = False
+
+    elapsed = time.perf_counter() - started
+    ui.flush()
+    frame_slot.empty()
+    prog_slot.empty()
+    st.caption(f"Analysed {analysed} frames in {elapsed:.1f}s "
+               f"({analysed / max(elapsed, 1e-6):.1f} fps, batch size {batch_size})")
+    cache_caption(clip)
+    stage_latency()
+    if worker_rows:
+        offer_compliance_csv(worker_rows)
 
     if peak_counts:
         render_summary(peak_counts)
@@ -1,74 +1,83 @@
 import streamlit as st
 import cv2
 import numpy as np
-from shapely.geometry import Point, Polygon
-from ultralytics import YOLO
 from PIL import Image
 import os
-from datetime import datetime
+import sys
+import time
 
-# Load your model
-model_path = os.path.join(os.path.dirname(__file__), "yolo11n.pt")
-model = YOLO(model_path)  # 🔁 Replace with your custom model if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from securevision.events import default_store
+from securevision.metrics import draw_stats, get_metrics, serve_metrics
+from securevision.models import load_model
+from securevision.roi import InferenceView, ROI_PAD
+from securevision.snapshots import SnapshotWriter, ViolationEpisodes
+from securevision.uploads import session_dir, spool_upload
+from securevision.zone import check_frame, GreenZoneCache, ZONE_REFRESH_FRAMES, ZONE_DRIFT_THRESHOLD, ZONE_MARGIN
 
-# Directories
-os.makedirs("output/violations", exist_ok=True)
+# Load your model (served by the shared model server when $SECUREVISION_MODEL_SERVER is set)
+model = load_model("zone_person")  # 🔁 yolo11n.pt — replace with your custom model if needed
 
 # Page setup
 st.set_page_config(layout="wide")
 st.title("🚧 Safety Zone Monitor with YOLO & HSV")
 
+# Per-stage latency across sessions; /metrics when $SECUREVISION_METRICS_PORT is set
+metrics = get_metrics("zone")
+serve_metrics()
+
+# Violation snapshots: written in the background, one per episode
+@st.cache_resource
+def get_snapshot_writer():
+    return SnapshotWriter("output/violations", metrics=metrics)
+
+# ...and recorded in the queryable event store ($SECUREVISION_EVENTS_DB)
+event_store = default_store()
+episodes = ViolationEpisodes(get_snapshot_writer(), prefix="frame", events=event_store, camera="demo", app="zone")
+
 # ------------------------------
-# Green Zone Detection Function
+# Green Zone Detection (cached per camera)
 # ------------------------------
-def detect_green_zone(frame):
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    lower_green = np.array([35, 40, 40])
-    upper_green = np.array([85, 255, 255])
-    mask = cv2.inRange(hsv, lower_green, upper_green)
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    if contours:
-        largest = max(contours, key=cv2.contourArea)
-        approx = cv2.approxPolyDP(largest, 5, True)
-        pts = [tuple(pt[0]) for pt in approx]
-        return Polygon(pts), np.array(pts)
-    return None, None
+st.sidebar.header("Safety Zone")
+zone_interval = st.sidebar.slider("Re-detect zone every N frames", 1, 600, ZONE_REFRESH_FRAMES)
+zone_drift = st.sidebar.slider("Zone drift threshold", 0.01, 0.50, ZONE_DRIFT_THRESHOLD, 0.01,
+                               help="Re-detect early when the low-res green mask changes by more than this (1 - IoU).")
+zone_margin = st.sidebar.slider("Zone tolerance (px)", -50, 50, ZONE_MARGIN,
+                                help="Grow (or shrink) the zone before checking workers' feet against it.")
+near_zone_only = st.sidebar.checkbox("Detect only near the zone", value=False,
+                                     help="Run person detection on a crop around the detected zone instead of "
+                                          "the whole frame. Workers far from the zone are then not checked.")
+roi_pad = st.sidebar.slider("Crop padding around the zone (px)", 0, 400, ROI_PAD * 4, 16, disabled=not near_zone_only)
+imgsz = st.sidebar.select_slider("Inference size (px)", options=[320, 480, 640, 960, 1280], value=640,
+                                 help="Longest side the frame (or crop) is resized to for detection. "
+                                      "Higher finds smaller workers on high-resolution cameras, at more cost.")
+show_stats = st.sidebar.checkbox("Show FPS / latency overlay", value=False)
+
+# inference size and region of interest for this session's frames
+view = InferenceView(imgsz=imgsz, pad=roi_pad, zone_roi=near_zone_only)
+
+def get_zone_cache(camera_id):
+    caches = st.session_state.setdefault("zone_caches", {})
+    if camera_id not in caches:
+        caches[camera_id] = GreenZoneCache(camera_id)
+    cache = caches[camera_id]
+    if cache.margin != zone_margin:
+        cache.margin = zone_margin
+        cache.invalidate()   # rebuild the zone mask with the new tolerance
+    cache.interval, cache.drift_threshold = zone_interval, zone_drift
+    return cache
 
 # ------------------------------
 # Person Detection & Violation Check
 # ------------------------------
-def process_frame(frame):
-    orig_frame = frame.copy()
-    zone_polygon, zone_pts = detect_green_zone(frame)
-
-    if zone_pts is not None:
-        cv2.polylines(frame, [zone_pts], isClosed=True, color=(0, 255, 0), thickness=2)
-
-    results = model.predict(orig_frame, verbose=False)[0]
-    boxes = results.boxes
-
-    violation = False
-    for box in boxes:
-        cls = int(box.cls[0])
-        if cls != 0:
-            continue
+def process_frame(frame, now=None, zone_cache=None):
+    zone_cache = zone_cache or GreenZoneCache()
+    # zone outline, person boxes and foot-points drawn on the frame
+    violators = check_frame(frame, model, zone_cache, view, metrics)
 
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        cx, cy = (x1 + x2) // 2, y2
-
-        if zone_polygon and not zone_polygon.contains(Point(cx, cy)):
-            color = (0, 0, 255)
-            violation = True
-        else:
-            color = (0, 255, 0)
-
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-        cv2.circle(frame, (cx, cy), 5, color, -1)
-
-    if violation:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        cv2.imwrite(f"output/violations/frame_{timestamp}.jpg", frame)
+    # `now` is the video timestamp when replaying a file, wall-clock otherwise
+    with metrics.stage("io.snapshot"):
+        episodes.update(frame, violators > 0, score=violators, now=now, classes={"Outside Zone": violators})
 
     return frame
 
@@ -79,23 +88,45 @@ st.header("📹 Main Video Processing")
 
 uploaded_file = st.file_uploader("Upload factory floor video", type=["mp4", "mov", "avi"])
 if uploaded_file:
-    tfile = open("input.mp4", 'wb')
-    tfile.write(uploaded_file.read())
+    # each session gets its own copy, spooled to disk in chunks
+    video_path = spool_upload(uploaded_file, session_dir(st.session_state))
 
-    cap = cv2.VideoCapture("input.mp4")
+    cap = cv2.VideoCapture(video_path)
     stframe = st.empty()
+    zone_cache = get_zone_cache(uploaded_file.name)
+    # events are stamped from when processing started, plus the video timestamp
+    episodes.camera = uploaded_file.name
+    processing_started = time.time()
 
     while cap.isOpened():
-        ret, frame = cap.read()
+        started = time.perf_counter()
+        with metrics.stage("decode"):
+            ret, frame = cap.read()
         if not ret:
             break
 
-        result = process_frame(frame)
-        stframe.image(result, channels="BGR", use_container_width=True)
+        result = process_frame(frame, now=processing_started + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000,
+                               zone_cache=zone_cache)
+        metrics.frame_done(started)
+        if show_stats:
+            draw_stats(result, metrics)
+        with metrics.stage("io.ui"):
+            stframe.image(result, channels="BGR", use_container_width=True)
 
     cap.release()
+    episodes.flush()
     st.success("✅ Video Processing Completed.")
 
+    zone_stats = zone_cache.summary()
+    st.caption(f"Green zone re-detected {zone_stats['recomputes']}× over {zone_stats['frames']} frames — "
+               f"{zone_stats['cached_ms_per_frame']:.2f} ms/frame cached vs "
+               f"{zone_stats['full_detect_ms']:.2f} ms per full detection")
+    with st.expander("⏱️ Stage latency (ms)"):
+        st.json(metrics.snapshot())
+        st.json({"inference_view": view.stats()})
+        if event_store:
+            st.json(event_store.stats())
+
 # ===================================
 # REGION 1.5: Explanation Section
 # ===================================
@@ -142,5 +173,7 @@ with col2:
             demo_image = demo_image.convert("RGB")
         img_np = np.array(demo_image)
         frame = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+        episodes.camera = "demo"
         result = process_frame(frame)
+        episodes.flush()
         st.image(result, channels="BGR", caption="Processed Demo Image", use_container_width=True)
@@ -1,12 +1,16 @@
 import streamlit as st
 from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
-from ultralytics import YOLO
-import av
-import cv2
-import numpy as np
 import os
+import sys
 import time
-from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from securevision.events import default_store
+from securevision.kadhai import KadhaiMonitor, GATE_MAX_INTERVAL, TIMER_DURATION
+from securevision.metrics import draw_stats, get_metrics, serve_metrics
+from securevision.models import load_model
+from securevision.scheduler import InferenceScheduler, SCHED_MAX_WAIT_MS
+from securevision.snapshots import SnapshotWriter
 
 # ----------------- UI Setup -----------------
 st.set_page_config(page_title="Kadhai Safety Monitor", page_icon="🫕", layout="wide")
@@ -14,90 +18,63 @@ st.title(" 🫕 Kadhai Safety Monitoring System")
 st.caption("Monitors if a person leaves the kadhai unattended for more than 5 minutes.")
 
 # ----------------- Load Models -----------------
+# from the shared model server when $SECUREVISION_MODEL_SERVER is set
 @st.cache_resource
 def load_models():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    kadhai_model_path = os.path.join(script_dir, "best.pt")
-    person_model_path = os.path.join(script_dir, "yolov8n.pt")
-
-    kadhai_model = YOLO(kadhai_model_path)
-    person_model = YOLO(person_model_path)
+    kadhai_model = load_model("kadhai")          # best.pt
+    person_model = load_model("kadhai_person")   # yolov8n.pt
     return kadhai_model, person_model
 
+# Per-stage latency shared by every stream; /metrics when $SECUREVISION_METRICS_PORT is set
+metrics = get_metrics("kadhai")
+serve_metrics()
+
+# Frames from every browser session are batched on one inference thread
+@st.cache_resource
+def get_scheduler():
+    return InferenceScheduler(metrics=metrics)
+
+scheduler = get_scheduler()
 kadhai_model, person_model = load_models()
+kadhai_model = scheduler.wrap(kadhai_model, "kadhai")
+person_model = scheduler.wrap(person_model, "person")
 
 # ----------------- Video Logic -----------------
-TIMER_DURATION = 5 * 60  # 5 minutes
 output_dir = "flagged_frames"
-os.makedirs(output_dir, exist_ok=True)
+
+# Snapshots are written off the video thread
+@st.cache_resource
+def get_snapshot_writer():
+    return SnapshotWriter(output_dir, metrics=metrics)
+
+snapshot_writer = get_snapshot_writer()
+# Alerts are also recorded in the queryable event store ($SECUREVISION_EVENTS_DB)
+event_store = default_store()
 
 class KadhaiSafetyTransformer(VideoTransformerBase):
     def __init__(self):
-        self.timer_started = False
-        self.start_time = None
-        self.warning_triggered = False
+        # detections, motion gate and the unattended timer, driven by frame timestamps
+        self.monitor = KadhaiMonitor(kadhai_model, person_model, TIMER_DURATION, metrics=metrics)
         self.last_frame = None
-        self.show_alert = False
-        self.time_remaining = TIMER_DURATION
+        self.show_stats = False
 
     def transform(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        annotated_frame = img.copy()
-
-        # Detect Kadhai
-        kadhai_results = kadhai_model.predict(img, conf=0.5, verbose=False)[0]
-        kadhai_boxes = [box for box in kadhai_results.boxes.data]
-
-        # Detect Person
-        person_results = person_model.predict(img, conf=0.5, classes=[0], verbose=False)[0]
-        person_boxes = [box for box in person_results.boxes.data]
-
-        kadhai_detected = len(kadhai_boxes) > 0
-        person_detected = len(person_boxes) > 0
-
-        # Draw bounding boxes
-        for box in kadhai_boxes:
-            x1, y1, x2, y2, conf, cls = box.cpu().numpy()
-            cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 165, 0), 2)
-            cv2.putText(annotated_frame, f"Kadhai {conf:.2f}", (int(x1), int(y1)-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,165,0), 2)
-
-        for box in person_boxes:
-            x1, y1, x2, y2, conf, cls = box.cpu().numpy()
-            cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-            cv2.putText(annotated_frame, f"Person {conf:.2f}", (int(x1), int(y1)-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
-
-        # Safety Logic
-        if kadhai_detected:
-            if not person_detected:
-                if not self.timer_started:
-                    self.start_time = time.time()
-                    self.timer_started = True
-                    self.warning_triggered = False
-                else:
-                    elapsed = time.time() - self.start_time
-                    self.time_remaining = max(0, TIMER_DURATION - int(elapsed))
-                    if elapsed >= TIMER_DURATION and not self.warning_triggered:
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filepath = os.path.join(output_dir, f"flagged_{timestamp}.jpg")
-                        cv2.imwrite(filepath, annotated_frame)
-                        self.warning_triggered = True
-                        self.show_alert = True
-            else:
-                self.timer_started = False
-                self.start_time = None
-                self.warning_triggered = False
-                self.show_alert = False
-                self.time_remaining = TIMER_DURATION
-        else:
-            self.timer_started = False
-            self.start_time = None
-            self.warning_triggered = False
-            self.show_alert = False
-            self.time_remaining = TIMER_DURATION
+        started = time.perf_counter()
+        with metrics.stage("decode"):
+            img = frame.to_ndarray(format="bgr24")
+        # stream time (PTS) rather than processing time; wall clock if the frame has none
+        now = frame.time if frame.time is not None else time.time()
+
+        # Safety logic and bounding boxes
+        annotated_frame, fired = self.monitor.process(img, now)
+
+        if fired:
+            self.monitor.record_alert(annotated_frame, now, snapshot_writer, event_store)
 
         self.last_frame = annotated_frame
+        metrics.frame_done(started)
+        if self.show_stats:
+            draw_stats(annotated_frame, metrics)
         return annotated_frame
 
 # ----------------- Streamlit UI -----------------
@@ -107,6 +84,17 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+batch_window = st.sidebar.slider("Cross-session batch window (ms)", 0, 100, int(SCHED_MAX_WAIT_MS),
+                                 help="How long a frame waits for other sessions' frames to share a forward pass. "
+                                      "0 = lowest latency, higher = more throughput with many viewers. "
+                                      "Applies to every session.")
+scheduler.max_wait_ms = batch_window
+gate_enabled = st.sidebar.checkbox("Skip inference while the scene is static", value=True,
+                                   help="Reuse the last detections until the picture changes.")
+gate_interval = st.sidebar.slider("Full inference at least every (s)", 1, 60, int(GATE_MAX_INTERVAL),
+                                  help="Keeps the unattended timer honest even if nothing moves.")
+show_stats = st.sidebar.checkbox("Show FPS / latency overlay", value=False)
+
 ctx = webrtc_streamer(
     key="kadhai-monitor",
     video_processor_factory=KadhaiSafetyTransformer,
@@ -117,18 +105,30 @@ ctx = webrtc_streamer(
 
 if ctx.video_transformer:
     t = ctx.video_transformer
-
-    if t.timer_started and not t.warning_triggered:
-        mins = t.time_remaining // 60
-        secs = t.time_remaining % 60
+    t.show_stats = show_stats
+    t.monitor.gated = gate_enabled
+    t.monitor.gate.max_interval = gate_interval
+    timer = t.monitor.timer
+
+    if timer.timer_started and not timer.warning_triggered:
+        mins = timer.time_remaining // 60
+        secs = timer.time_remaining % 60
         st.warning(f"⏳ Timer: {mins:02d}:{secs:02d} - Kadhai is unattended!")
 
-    if t.show_alert:
+    if timer.show_alert:
         st.markdown(
             "<h1 style='color:red; text-align:center;'>🚨 ALERT: KADHAI UNATTENDED FOR OVER 5 MINUTES! 🚨</h1>",
             unsafe_allow_html=True
         )
         st.error("Frame has been saved. Please check immediately!")
 
+with st.expander("⏱️ Stage latency (ms)"):
+    st.json(metrics.snapshot())
+    if ctx.video_transformer:
+        st.json({"motion_gate": ctx.video_transformer.monitor.gate.stats()})
+    st.json(scheduler.stats())
+    if event_store:
+        st.json(event_store.stats())
+
 st.markdown("---")
 st.markdown("<center><sub>© 2025 TATASecureVision</sub></center>", unsafe_allow_html=True)
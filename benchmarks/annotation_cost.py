@@ -0,0 +1,79 @@
+"""Per-frame annotation cost: ``results.plot()`` vs. ``securevision.annotate.render``.
+
+Usage:
+    python benchmarks/annotation_cost.py [--video PPEStreamlitApp/demo_videos/road_works.mp4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.annotate import as_array, render
+
+NAMES = {0: "Person", 1: "Helmet", 2: "Vest", 3: "Glasses", 4: "Mask", 5: "Safety Shoes",
+         6: "Without Helmet", 7: "Without Vest", 8: "Without Glass", 9: "Without Mask"}
+
+
+def fake_results(frame, n, rng):
+    h, w = frame.shape[:2]
+    x1 = rng.uniform(0, w * 0.8, n)
+    y1 = rng.uniform(0, h * 0.8, n)
+    data = np.stack([x1, y1, x1 + rng.uniform(20, w * 0.2, n), y1 + rng.uniform(20, h * 0.2, n),
+                     rng.uniform(0.25, 1, n), rng.integers(0, len(NAMES), n)], axis=1)
+    return Results(frame, path="", names=NAMES, boxes=torch.tensor(data, dtype=torch.float32))
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "road_works.mp4"))
+    parser.add_argument("--size", type=int, nargs=2, metavar=("W", "H"), default=[1920, 1080],
+                        help="Resize the sample frame to this size")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok:
+        frame = np.zeros((args.size[1], args.size[0], 3), dtype=np.uint8)
+    frame = cv2.resize(frame, tuple(args.size))
+    rng = np.random.default_rng(0)
+
+    print(f"frame {args.size[0]}x{args.size[1]}")
+    print(f"{'boxes':>5} | {'plot()+resize ms':>16} | {'render full ms':>14} | {'render 800px ms':>15}")
+    for n in args.counts:
+        results = fake_results(frame, n, rng)
+        dets = as_array(results)
+
+        def plot_preview():
+            # The old Live Preview path: full-res plot, then shrink to 800 px
+            annotated = results.plot(line_width=2)
+            h, w = annotated.shape[:2]
+            return cv2.resize(annotated, (800, int(h * 800 / w)))
+
+        old = timed(plot_preview, args.repeats)
+        full = timed(lambda: render(frame, dets, NAMES), args.repeats)
+        preview = timed(lambda: render(frame, dets, NAMES, max_width=800), args.repeats)
+        print(f"{n:>5} | {old:>16.2f} | {full:>14.2f} | {preview:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
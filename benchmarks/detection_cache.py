@@ -0,0 +1,76 @@
+"""Re-running a Demo clip at a new confidence: re-inferring vs. filtering cached detections.
+
+Usage:
+    python benchmarks/detection_cache.py
+    python benchmarks/detection_cache.py --video PPEStreamlitApp/demo_videos/road_works.mp4 --per-second 5
+
+The first run fills a throwaway ``DetectionCache`` at ``CACHE_CONF``. Each
+later run sweeps the given confidences, first by calling the model again (what
+every Run used to do) and then from the cache. It checks that both give the
+same boxes per frame. With the cache, the sampled frames aren't even decoded.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.annotate import as_array
+from securevision.detcache import CACHE_CONF, DetectionCache, model_id
+from securevision.models import load_model
+from securevision.video import iter_sampled, sampled_indices
+
+
+def sampled(video, per_second):
+    cap = cv2.VideoCapture(video)
+    fps = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+    frames = list(iter_sampled(cap, per_second, fps))
+    cap.release()
+    return frames, fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "lab_env.mp4"))
+    parser.add_argument("--weights", help="PPE weights (default: the app's best.pt)")
+    parser.add_argument("--per-second", type=float, default=2.0)
+    parser.add_argument("--confs", type=float, nargs="+", default=[0.25, 0.4, 0.6])
+    args = parser.parse_args()
+
+    model = load_model("ppe", args.weights)
+    cache = DetectionCache(tempfile.mkdtemp(prefix="detcache-bench-"))
+    mid = model_id("ppe", args.weights)
+
+    t0 = time.perf_counter()
+    frames, fps = sampled(args.video, args.per_second)
+    total = int(cv2.VideoCapture(args.video).get(cv2.CAP_PROP_FRAME_COUNT))
+    wanted = sampled_indices(total, per_second=args.per_second, fps=fps)
+    clip = cache.clip(args.video, mid)
+    clip.detect(lambda fs: [as_array(model(f, conf=CACHE_CONF, verbose=False)[0]) for f in fs], frames)
+    cache.save(clip)
+    print(f"{len(frames)} frames, first run (fills the cache) {time.perf_counter() - t0:.2f}s")
+    print(f"{'conf':>5} | {'re-infer s':>10} | {'cached s':>8} | {'speed-up':>8} | same")
+    for conf in args.confs:
+        t0 = time.perf_counter()
+        frames, _ = sampled(args.video, args.per_second)
+        direct = [as_array(model(f, conf=conf, verbose=False)[0]) for _, f in frames]
+        direct_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        clip = cache.clip(args.video, mid)
+        cached = clip.detect(None, [(idx, None) for idx in wanted], conf)
+        cached_s = time.perf_counter() - t0
+
+        same = len(direct) == len(cached) and all(
+            len(a) == len(b) and np.allclose(a, b, atol=1e-3) for a, b in zip(direct, cached))
+        print(f"{conf:>5.2f} | {direct_s:>10.2f} | {cached_s:>8.3f} | {direct_s / cached_s:>7.0f}x | {same}")
+
+
+if __name__ == "__main__":
+    main()
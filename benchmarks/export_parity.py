@@ -0,0 +1,166 @@
+"""Exported backends vs. PyTorch: detection parity on the demo videos, and speed.
+
+Usage:
+    python benchmarks/export_parity.py                                   # every model, every backend
+    python benchmarks/export_parity.py --keys ppe --backends onnx onnx-int8
+    python benchmarks/export_parity.py --weights ppe=/models/best.pt --frames 60
+
+For each model, every backend's detections are matched to the PyTorch ones
+(same class, IoU >= 0.5). Recall/precision are then against PyTorch, not
+ground truth. ONNX backends also report how far the raw network output drifts
+(max |Δ| relative to the output's range), which is meaningful even when a
+model finds nothing on these clips. Exports land in the normal cache, so a
+second run only measures.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.annotate import as_array
+from securevision.export import BACKENDS, exported, load_exported, to_input
+from securevision.models import WEIGHTS
+from securevision.video import iter_sampled
+
+
+def sample_frames(videos, n):
+    frames = []
+    per_video = max(1, n // max(1, len(videos)))
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        for count, (_, frame) in enumerate(iter_sampled(cap, per_second=1.0), 1):
+            frames.append(frame)
+            if count == per_video:
+                break
+        cap.release()
+    return frames
+
+
+def box_iou(a, b):
+    """(N, M) IoU of xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match(ref, dets, thr=0.5):
+    """Greedy same-class matching; returns (matched, IoUs of the matches)."""
+    if len(ref) == 0 or len(dets) == 0:
+        return 0, []
+    iou = box_iou(ref[:, :4], dets[:, :4])
+    iou[ref[:, None, 5] != dets[None, :, 5]] = 0
+    ious = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < thr:
+            break
+        ious.append(iou[i, j])
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return len(ious), ious
+
+
+def raw_outputs(yolo, frames):
+    import torch
+
+    yolo.model.eval()
+    with torch.no_grad():
+        return [yolo.model(torch.from_numpy(to_input(f)))[0].numpy() for f in frames]
+
+
+def onnx_outputs(path, frames):
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+    name = session.get_inputs()[0].name
+    return [session.run(None, {name: to_input(f)})[0] for f in frames]
+
+
+def timed_predict(model, frames, conf):
+    model(frames[0], conf=conf, verbose=False)   # warm-up
+    dets, times = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        result = model(frame, conf=conf, verbose=False)[0]
+        times.append(time.perf_counter() - t0)
+        dets.append(as_array(result))
+    return dets, np.array(times) * 1000
+
+
+def available_backends():
+    found = ["torch"]
+    for backend, module in (("onnx", "onnxruntime"), ("openvino", "openvino")):
+        try:
+            __import__(module)
+            found += [backend, f"{backend}-int8"]
+        except ImportError:
+            pass
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", nargs="+", choices=sorted(WEIGHTS), default=sorted(WEIGHTS))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS[1:], default=None,
+                        help="Default: every backend whose runtime is installed")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--videos", nargs="+",
+                        default=sorted(glob.glob(os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "*.mp4"))))
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--conf", type=float, default=0.25)
+    args = parser.parse_args()
+
+    overrides = dict(item.partition("=")[::2] for item in args.weights or [])
+    backends = args.backends or [b for b in available_backends() if b != "torch"]
+    frames = sample_frames(args.videos, args.frames)
+    print(f"{len(frames)} frames from {len(args.videos)} video(s); backends: torch, {', '.join(backends)}")
+
+    for key in args.keys:
+        path = overrides.get(key, WEIGHTS[key])
+        torch_model = load_exported(path, "torch")
+        ref_raw = raw_outputs(torch_model, frames)
+        ref, ref_ms = timed_predict(torch_model, frames, args.conf)
+        n_ref = sum(len(d) for d in ref)
+
+        print(f"\n{key} ({os.path.basename(path)}): {n_ref} PyTorch detections")
+        print(f"{'backend':<14} | {'p50 ms':>7} | {'fps':>6} | {'speed-up':>8} | {'recall':>6} | "
+              f"{'precision':>9} | {'mean IoU':>8} | {'raw max Δ':>9}")
+        print(f"{'torch':<14} | {np.median(ref_ms):>7.1f} | {1000 / ref_ms.mean():>6.1f} | {'1.00x':>8} |")
+        for backend in backends:
+            try:
+                model = load_exported(path, backend)
+                dets, ms = timed_predict(model, frames, args.conf)
+            except Exception as e:
+                print(f"{backend:<14} | failed: {e}")
+                continue
+            matched, ious, n = 0, [], sum(len(d) for d in dets)
+            for r, d in zip(ref, dets):
+                m, i = match(r, d)
+                matched += m
+                ious += i
+            recall = f"{matched / n_ref:.3f}" if n_ref else "n/a"
+            precision = f"{matched / n:.3f}" if n else "n/a"
+            mean_iou = f"{np.mean(ious):.3f}" if ious else "n/a"
+            raw = "n/a"
+            if backend.startswith("onnx"):
+                outs = onnx_outputs(exported(path, backend), frames)
+                scale = max(float(np.ptp(np.concatenate([o.ravel() for o in ref_raw]))), 1e-9)
+                raw = f"{max(float(np.abs(o - r).max()) for o, r in zip(outs, ref_raw)) / scale:.2%}"
+            print(f"{backend:<14} | {np.median(ms):>7.1f} | {1000 / ms.mean():>6.1f} | "
+                  f"{np.median(ref_ms) / np.median(ms):>7.2f}x | {recall:>6} | {precision:>9} | "
+                  f"{mean_iou:>8} | {raw:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Decode throughput: read-and-discard vs. grab-only skipping vs. time-based sampling.
+
+Usage:
+    python benchmarks/frame_skipping.py [--every 2 4 6] [--per-second 2]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.video import iter_frames, iter_sampled
+
+
+def read_and_discard(cap, every):
+    # The pre-grab behaviour of the 2_Demo loop
+    idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        idx += 1
+        if idx % every != 0:
+            continue
+        yield idx, frame
+
+
+def run(path, make_frames):
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    t0 = time.perf_counter()
+    analysed = sum(1 for _ in make_frames(cap))
+    elapsed = time.perf_counter() - t0
+    cap.release()
+    return analysed, total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", nargs="+",
+                        default=sorted(glob.glob(os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "*.mp4"))))
+    parser.add_argument("--every", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--per-second", type=float, nargs="+", default=[2.0, 0.2])
+    args = parser.parse_args()
+
+    print(f"{'video':<16} | {'mode':<22} | {'analysed':>8} | {'source fps':>10}")
+    for path in args.videos:
+        name = os.path.basename(path)
+        for every in args.every:
+            for label, fn in (("read+discard", read_and_discard), ("grab", iter_frames)):
+                analysed, speed = run(path, lambda cap: fn(cap, every))
+                print(f"{name:<16} | {f'{label} every {every}':<22} | {analysed:>8} | {speed:>10.0f}")
+        for rate in args.per_second:
+            analysed, speed = run(path, lambda cap: iter_sampled(cap, rate))
+            print(f"{name:<16} | {f'sampled {rate:g}/s':<22} | {analysed:>8} | {speed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Per-frame harness latency: one pass per person crop vs. one batched pass.
+
+Usage:
+    python benchmarks/harness_batch.py --weights HarnessStreamlitApp/best.pt
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from ultralytics import YOLO
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.harness import check_harness, HARNESS_CONF, HARNESS_IMGSZ, HARNESS_MAX_BATCH
+
+
+def person_grid(n, width=640, height=480, box_w=60, box_h=160):
+    """``n`` person-sized boxes tiled over the frame (wrapping when it is full)."""
+    cols = width // box_w
+    rows = height // box_h
+    boxes = []
+    for i in range(n):
+        c, r = i % cols, (i // cols) % rows
+        boxes.append([c * box_w, r * box_h, (c + 1) * box_w, (r + 1) * box_h])
+    return np.array(boxes, dtype=int)
+
+
+def per_crop(model, img, boxes):
+    # The pre-batching behaviour of HarnessVideoProcessor.transform
+    for x1, y1, x2, y2 in boxes:
+        model(img[y1:y2, x1:x2], conf=HARNESS_CONF, verbose=False)
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weights", default=os.path.join(ROOT_DIR, "HarnessStreamlitApp", "best.pt"))
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--imgsz", type=int, default=HARNESS_IMGSZ)
+    parser.add_argument("--max-batch", type=int, default=HARNESS_MAX_BATCH)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    model = YOLO(args.weights)
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+    # Warm up both paths so the first timed call doesn't pay for setup
+    per_crop(model, img, person_grid(2))
+    check_harness(model, img, person_grid(2), imgsz=args.imgsz, max_batch=args.max_batch)
+
+    print(f"{'persons':>7} | {'per-crop ms':>11} | {'batched ms':>10} | {'speed-up':>8}")
+    for n in args.counts:
+        boxes = person_grid(n)
+        seq = timed(lambda: per_crop(model, img, boxes), args.repeats)
+        bat = timed(lambda: check_harness(model, img, boxes, imgsz=args.imgsz,
+                                          max_batch=args.max_batch), args.repeats)
+        print(f"{n:>7} | {seq:>11.1f} | {bat:>10.1f} | {seq / bat:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Per-frame latency of every app's hot path, on synthetic frames and the demo videos.
+
+Usage:
+    python benchmarks/hot_paths.py                          # stub models: non-inference overhead only
+    python benchmarks/hot_paths.py --model real --save after.json --compare before.json
+    python benchmarks/hot_paths.py --model real --weights ppe=/models/best.pt --apps ppe
+
+Each ``*Frame`` class below holds one app's per-frame state and calls the
+same ``securevision`` functions as its callback (``PPEVideoProcessor``,
+``HarnessVideoProcessor``, ``KadhaiSafetyTransformer`` and SafetyRegion's
+``process_frame``): ``ppe.check_frame``, ``harness.check_frame``,
+``KadhaiMonitor.process`` and ``zone.check_frame``. They take a BGR ndarray,
+so webrtc's ``frame.to_ndarray`` isn't measured. With ``--model stub`` every
+model returns random boxes immediately, so the numbers show the cost of
+everything except inference. ``--compare`` exits with status
+1 if any p50 or p95 got slower than ``--tolerance`` allows.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision import harness, kadhai, ppe, zone
+from securevision.annotate import as_array, downscale
+from securevision.models import load_model
+from securevision.roi import InferenceView
+from securevision.snapshots import SnapshotWriter, ViolationEpisodes
+from securevision.tracking import DETECT_EVERY, KeyframeDetector
+
+STUB_NAMES = {
+    "ppe": dict(enumerate(["Person", *ppe.PPE_ITEMS, *ppe.ITEM_VIOLATIONS.values()])),
+    "harness": {0: "harness"},
+    "kadhai": {0: "kadhai"},
+}
+PERSON_NAMES = {0: "person"}
+
+
+class StubModel:
+    """Stands in for a YOLO model: returns up to ``max_dets`` random boxes per image, instantly."""
+
+    def __init__(self, names, max_dets=6, seed=0):
+        self.names = names
+        self.max_dets = max_dets
+        self.rng = np.random.default_rng(seed)
+
+    def _result(self, img, classes):
+        h, w = img.shape[:2]
+        n = int(self.rng.integers(0, self.max_dets + 1))
+        x1 = self.rng.uniform(0, w * 0.8, n)
+        y1 = self.rng.uniform(0, h * 0.6, n)
+        cls = self.rng.choice(classes if classes is not None else list(self.names), n)
+        data = np.stack([x1, y1, x1 + self.rng.uniform(10, w * 0.2, n), y1 + self.rng.uniform(20, h * 0.4, n),
+                         self.rng.uniform(0.25, 1, n), cls], axis=1)
+        return Results(img, path="", names=self.names, boxes=torch.tensor(data, dtype=torch.float32))
+
+    def __call__(self, source, classes=None, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        return [self._result(img, classes) for img in images]
+
+    predict = __call__
+
+
+def load_models(mode, weights):
+    if mode == "stub":
+        return {"ppe": StubModel(STUB_NAMES["ppe"]),
+                "harness_person": StubModel(PERSON_NAMES), "harness": StubModel(STUB_NAMES["harness"]),
+                "zone_person": StubModel(PERSON_NAMES),
+                "kadhai": StubModel(STUB_NAMES["kadhai"]), "kadhai_person": StubModel(PERSON_NAMES)}
+    return _LazyModels(weights)
+
+
+class _LazyModels(dict):
+    # only load the weights of the apps actually benchmarked
+    def __init__(self, weights):
+        super().__init__()
+        self.weights = weights
+
+    def __missing__(self, key):
+        self[key] = load_model(key, self.weights.get(key))
+        return self[key]
+
+
+# ------------------------------------------------------------------
+# One class per app, driving the same per-frame functions as its callback
+# ------------------------------------------------------------------
+
+class PPEFrame:
+    # fixed k rather than the app's adaptive one, so runs are comparable
+    detect_every = DETECT_EVERY
+
+    def __init__(self, models, snapshots):
+        self.model = models["ppe"]
+        self.keyframes = KeyframeDetector(k=self.detect_every, adaptive=False)
+        self.episodes = ViolationEpisodes(None)
+
+    def detect(self, img):
+        return as_array(self.model(img, conf=0.25, verbose=False)[0])
+
+    def __call__(self, img):
+        img_resized = downscale(img, 640)
+        dets = self.keyframes.update(img_resized, self.detect)
+        annotated, missing = ppe.check_frame(img_resized, dets, self.model.names)
+        self.episodes.update(None, bool(missing), score=sum(missing.values()), classes=missing)
+        return annotated
+
+
+class PPEEveryFrame(PPEFrame):
+    # the detector on every frame, as before keyframes
+    detect_every = 1
+
+
+class HarnessFrame:
+    def __init__(self, models, snapshots):
+        self.person_model, self.harness_model = models["harness_person"], models["harness"]
+        self.episodes = ViolationEpisodes(snapshots, prefix="harness")
+        self.verdicts = harness.HarnessVerdictCache()
+
+    def __call__(self, img):
+        annotated_frame, violators = harness.check_frame(self.person_model, self.harness_model, img, self.verdicts)
+        self.episodes.update(annotated_frame, violators > 0, score=violators, classes={"No Harness": violators})
+        return annotated_frame
+
+
+class ZoneFrame:
+    def __init__(self, models, snapshots):
+        self.model = models["zone_person"]
+        self.zone_cache = zone.GreenZoneCache("benchmark")
+        self.view = InferenceView()
+        self.episodes = ViolationEpisodes(snapshots, prefix="zone")
+
+    def __call__(self, frame):
+        frame = frame.copy()   # process_frame draws on the decoded frame it owns
+        violators = zone.check_frame(frame, self.model, self.zone_cache, self.view)
+        self.episodes.update(frame, violators > 0, score=violators, classes={"Outside Zone": violators})
+        return frame
+
+
+class KadhaiFrame:
+    def __init__(self, models, snapshots):
+        self.monitor = kadhai.KadhaiMonitor(models["kadhai"], models["kadhai_person"])
+        self.snapshots = snapshots
+
+    def __call__(self, img):
+        now = time.time()
+        annotated_frame, fired = self.monitor.process(img, now)
+        if fired:
+            self.monitor.record_alert(annotated_frame, now, self.snapshots)
+        return annotated_frame
+
+
+APPS = {"ppe": PPEFrame, "ppe_k1": PPEEveryFrame, "harness": HarnessFrame, "zone": ZoneFrame, "kadhai": KadhaiFrame}
+
+
+# ------------------------------------------------------------------
+# Frame sources
+# ------------------------------------------------------------------
+
+def synthetic_frames(n, width=1280, height=720, seed=0):
+    """A fixed camera: static noisy floor with a painted green zone, a grey block moving across it."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    painted = np.array([[width // 5, height // 4], [width * 4 // 5, height // 4],
+                        [width * 9 // 10, height - 20], [width // 10, height - 20]])
+    cv2.polylines(base, [painted], isClosed=True, color=(40, 200, 40), thickness=12)
+    frames = []
+    for i in range(n):
+        frame = base.copy()
+        x = (i * 17) % (width - 100)
+        cv2.rectangle(frame, (x, height // 3), (x + 80, height // 3 + 240), (150, 150, 150), -1)
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path, n):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < n:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def measure(make_app, frames, warmup, rounds=1):
+    """Latency stats of a fresh app over ``frames``; the best of ``rounds`` (lowest p50) is kept."""
+    best = None
+    for _ in range(rounds):
+        app = make_app()
+        for frame in frames[:warmup]:
+            app(frame)
+        times = []
+        for frame in frames:
+            t0 = time.perf_counter()
+            app(frame)
+            times.append(time.perf_counter() - t0)
+        ms = np.array(times) * 1000
+        if best is None or np.percentile(ms, 50) < np.percentile(best, 50):
+            best = ms
+    ms = best
+    return {
+        "frames": len(frames),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "fps": round(len(frames) / ms.sum() * 1000, 2),
+    }
+
+
+def environment(mode):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"model": mode, "commit": commit, "python": platform.python_version(),
+            "torch": torch.__version__, "opencv": cv2.__version__, "cpus": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(), "machine": platform.machine()}
+
+
+def compare(results, baseline, tolerance):
+    """Print p50/p95/fps deltas against ``baseline``; returns the regressed rows."""
+    old = {(r["app"], r["source"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'app':<8} | {'source':<16} | {'p50 Δ':>8} | {'p95 Δ':>8} | {'fps Δ':>8}")
+    for r in results:
+        b = old.get((r["app"], r["source"]))
+        if b is None:
+            continue
+        d50 = r["p50_ms"] / b["p50_ms"] - 1 if b["p50_ms"] else 0.0
+        d95 = r["p95_ms"] / b["p95_ms"] - 1 if b["p95_ms"] else 0.0
+        dfps = r["fps"] / b["fps"] - 1 if b["fps"] else 0.0
+        flag = ""
+        if d50 > tolerance or d95 > tolerance:
+            regressions.append(r)
+            flag = "  ← regression"
+        print(f"{r['app']:<8} | {r['source']:<16} | {d50:>+8.1%} | {d95:>+8.1%} | {dfps:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=("stub", "real"), default="stub")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override real weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=list(APPS))
+    parser.add_argument("--videos", nargs="*",
+                        default=sorted(glob.glob(os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "*.mp4"))))
+    parser.add_argument("--frames", type=int, default=120, help="Frames per source")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="Repeat each measurement and keep the fastest round, to damp noise")
+    parser.add_argument("--save", default=None, help="Results JSON (default: hot_paths_<model>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed p50/p95 slow-down before --compare fails (default: 10%%)")
+    args = parser.parse_args()
+
+    weights = dict(item.partition("=")[::2] for item in args.weights or [])
+    models = load_models(args.model, weights)
+    sources = {"synthetic_720p": synthetic_frames(args.frames)}
+    for path in args.videos:
+        frames = video_frames(path, args.frames)
+        if frames:
+            sources[os.path.basename(path)] = frames
+
+    results = []
+    print(f"{args.model} models, {torch.get_num_threads()} torch thread(s)")
+    print(f"{'app':<8} | {'source':<16} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'fps':>7}")
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        snapshots = SnapshotWriter(snapshot_dir)
+        for app in args.apps:
+            for source, frames in sources.items():
+                r = {"app": app, "source": source,
+                     **measure(lambda: APPS[app](models, snapshots), frames, args.warmup, args.rounds)}
+                results.append(r)
+                print(f"{app:<8} | {source:<16} | {r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | "
+                      f"{r['p99_ms']:>8.2f} | {r['fps']:>7.1f}")
+        snapshots.close()
+
+    save = args.save or f"hot_paths_{args.model}.json"
+    with open(save, "w") as f:
+        json.dump({"environment": environment(args.model), "results": results}, f, indent=2)
+    print(f"\nSaved {save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["environment"].get("model") != args.model:
+            print(f"warning: baseline used {baseline['environment'].get('model')} models")
+        if compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Resident memory of the four apps' models: one copy per app vs. the shared model server.
+
+Usage:
+    python benchmarks/model_memory.py
+    python benchmarks/model_memory.py --weights ppe=yolo11n.pt --weights kadhai=yolo11n.pt ...
+
+Each app is stood in for by a child process that loads that app's models the
+way it does at startup (``securevision.models.load_model``). It runs a few
+frames and then reports its RSS. The run is repeated with a
+``securevision.serving`` process up and ``SECUREVISION_MODEL_SERVER`` set. Linux
+only (reads ``/proc``).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.serving import SERVER_ENV, server_available
+
+APP_MODELS = {
+    "ppe": ("ppe",),
+    "harness": ("harness_person", "harness"),
+    "zone": ("zone_person",),
+    "kadhai": ("kadhai", "kadhai_person"),
+}
+
+
+def rss_mb(pid="self"):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child(app, weights, frames):
+    # stands in for one app process: load its models, run a few frames, report
+    from securevision.models import load_model
+
+    t0 = time.perf_counter()
+    models = [load_model(key, None if os.environ.get(SERVER_ENV) else weights.get(key))
+              for key in APP_MODELS[app]]
+    img = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    for model in models:
+        model(img, verbose=False)
+    ready = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        for model in models:
+            model(img, verbose=False)
+    per_frame = (time.perf_counter() - t0) / frames * 1000
+    print(json.dumps({"app": app, "rss_mb": round(rss_mb(), 1), "ready_s": round(ready, 2),
+                      "frame_ms": round(per_frame, 1), "remote": type(models[0]).__name__ == "RemoteModel"}))
+
+
+def run_apps(args, env):
+    rows = []
+    for app in APP_MODELS:
+        cmd = [sys.executable, __file__, "--child", app, "--frames", str(args.frames)]
+        for item in args.weights or []:
+            cmd += ["--weights", item]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(out.strip().splitlines()[-1]))
+    return rows
+
+
+def report(title, rows, server_mb=0.0):
+    print(f"\n{title}")
+    print(f"{'app':<8} | {'RSS MB':>7} | {'ready s':>7} | {'ms/frame':>8}")
+    for r in rows:
+        print(f"{r['app']:<8} | {r['rss_mb']:>7.0f} | {r['ready_s']:>7.2f} | {r['frame_ms']:>8.1f}")
+    if server_mb:
+        print(f"{'server':<8} | {server_mb:>7.0f} |")
+    total = sum(r["rss_mb"] for r in rows) + server_mb
+    print(f"{'total':<8} | {total:>7.0f} |")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--child", choices=sorted(APP_MODELS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    weights = dict(item.partition("=")[::2] for item in args.weights or [])
+
+    if args.child:
+        child(args.child, weights, args.frames)
+        return
+
+    env = {k: v for k, v in os.environ.items() if k != SERVER_ENV}
+    local = report("Each app loads its own models", run_apps(args, env))
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "models.sock")
+    cmd = [sys.executable, "-m", "securevision.serving", "--socket", socket_path]
+    for item in args.weights or []:
+        cmd += ["--weights", item]
+    server = subprocess.Popen(cmd, cwd=ROOT_DIR, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        while not server_available(socket_path):
+            if server.poll() is not None or time.perf_counter() - started > 300:
+                raise SystemExit("model server failed to start")
+            time.sleep(0.5)
+        print(f"\nmodel server ready in {time.perf_counter() - started:.1f}s")
+        rows = run_apps(args, dict(env, **{SERVER_ENV: socket_path}))
+        shared = report("Apps using the shared model server", rows, rss_mb(server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\nshared server saves {local - shared:.0f} MB ({1 - shared / local:.0%})")
+
+
+if __name__ == "__main__":
+    main()
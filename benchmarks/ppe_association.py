@@ -0,0 +1,103 @@
+"""Person-to-PPE association cost per frame: vectorised matrix vs. a Python loop over boxes.
+
+Usage:
+    python benchmarks/ppe_association.py
+    python benchmarks/ppe_association.py --counts 10 50 100 200 --repeats 200
+
+Each frame has ``n`` person boxes in a crowd, each with a random subset of
+the PPE items or their "Without ..." classes inside it, plus a few
+stray boxes. The loop baseline checks every PPE box against every person
+one pair at a time. Both produce the same compliance matrix.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.ppe import ITEM_VIOLATIONS, MIN_CONTAINMENT, MISSING, PPE_ITEMS, WORN, compliance_matrix
+
+NAMES = dict(enumerate(["Person", *PPE_ITEMS, *ITEM_VIOLATIONS.values()]))
+
+
+def crowd(n, rng, width=1920, height=1080):
+    """(N, 6) detections for ``n`` workers with their PPE boxes, in random order."""
+    ids = {name: cid for cid, name in NAMES.items()}
+    dets = []
+    for _ in range(n):
+        x, y = rng.uniform(0, width - 80), rng.uniform(0, height - 200)
+        dets.append([x, y, x + 80, y + 200, 0.9, 0])
+        for item in PPE_ITEMS:
+            if rng.random() < 0.7:
+                worn = item not in ITEM_VIOLATIONS or rng.random() < 0.8
+                cls = ids[item] if worn else ids[ITEM_VIOLATIONS[item]]
+                ix, iy = x + rng.uniform(0, 50), y + rng.uniform(0, 170)
+                dets.append([ix, iy, ix + 30, iy + 30, 0.8, cls])
+    for _ in range(3):
+        x, y = rng.uniform(0, width - 30), rng.uniform(0, height - 30)
+        dets.append([x, y, x + 30, y + 30, 0.6, ids["Helmet"]])
+    dets = np.array(dets, dtype=np.float32)
+    return dets[rng.permutation(len(dets))]
+
+
+def loop_matrix(dets, names):
+    # straightforward per-pair version, for comparison
+    persons = [d for d in dets if names[int(d[5])] == "Person"]
+    violations = {v: k for k, v in ITEM_VIOLATIONS.items()}
+    matrix = np.zeros((len(persons), len(PPE_ITEMS)), dtype=np.int8)
+    for d in dets:
+        name = names[int(d[5])]
+        if name == "Person" or (name not in PPE_ITEMS and name not in violations):
+            continue
+        area = (d[2] - d[0]) * (d[3] - d[1])
+        best, best_score, best_cont = None, -1.0, 0.0
+        for i, p in enumerate(persons):
+            w = max(0.0, min(d[2], p[2]) - max(d[0], p[0]))
+            h = max(0.0, min(d[3], p[3]) - max(d[1], p[1]))
+            inter = w * h
+            cont = inter / (area + 1e-9)
+            iou = inter / (area + (p[2] - p[0]) * (p[3] - p[1]) - inter + 1e-9)
+            if cont + 1e-3 * iou > best_score:
+                best, best_score, best_cont = i, cont + 1e-3 * iou, cont
+        if best is None or best_cont < MIN_CONTAINMENT:
+            continue
+        item = PPE_ITEMS.index(violations.get(name, name))
+        if name in violations:
+            matrix[best, item] = MISSING
+        elif matrix[best, item] != MISSING:
+            matrix[best, item] = WORN
+    return matrix
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'persons':>7} | {'boxes':>5} | {'loop ms':>8} | {'matrix ms':>9} | {'speed-up':>8} | same")
+    for n in args.counts:
+        dets = crowd(n, rng)
+        _, matrix = compliance_matrix(dets, NAMES)
+        same = np.array_equal(matrix, loop_matrix(dets, NAMES))
+        loop_ms = timed(lambda: loop_matrix(dets, NAMES), args.repeats)
+        vec_ms = timed(lambda: compliance_matrix(dets, NAMES), args.repeats)
+        print(f"{n:>7} | {len(dets):>5} | {loop_ms:>8.3f} | {vec_ms:>9.3f} | {loop_ms / vec_ms:>7.1f}x | {same}")
+
+
+if __name__ == "__main__":
+    main()
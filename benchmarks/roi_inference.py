@@ -0,0 +1,60 @@
+"""Detection on a high-resolution frame: whole frame vs. a region of interest, at several input sizes.
+
+Usage:
+    python benchmarks/roi_inference.py
+    python benchmarks/roi_inference.py --key zone_person --resolution 3840 2160 --roi 0.5 --sizes 640 960 1280
+
+Frames of a demo clip are upscaled to ``--resolution`` to stand in for a 4K
+factory camera. ``--roi`` is the share of the frame's width and height that
+the centred region covers. Each row times ``InferenceView.detect`` per frame,
+including the letterbox resize of the full frame or the crop, and reports
+the share of pixels inferred.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.models import WEIGHTS, load_model
+from securevision.roi import InferenceView
+from securevision.video import iter_sampled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--key", choices=sorted(WEIGHTS), default="zone_person")
+    parser.add_argument("--weights", help="Weights for --key (default: the app's)")
+    parser.add_argument("--video", default=os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "road_works.mp4"))
+    parser.add_argument("--resolution", type=int, nargs=2, default=[3840, 2160], metavar=("W", "H"))
+    parser.add_argument("--roi", type=float, default=0.5, help="ROI width/height as a share of the frame")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[640, 1280])
+    parser.add_argument("--frames", type=int, default=10)
+    args = parser.parse_args()
+
+    model = load_model(args.key, args.weights)
+    w, h = args.resolution
+    cap = cv2.VideoCapture(args.video)
+    frames = [cv2.resize(f, (w, h)) for _, f in iter_sampled(cap, 1.0)][:args.frames]
+    cap.release()
+    model(frames[0], verbose=False)   # warm-up
+
+    rw, rh = w * args.roi / 2, h * args.roi / 2
+    roi = [w / 2 - rw, h / 2 - rh, w / 2 + rw, h / 2 + rh]
+    print(f"{len(frames)} frames at {w}x{h}, ROI {args.roi:.0%} of each side")
+    print(f"{'view':<16} | {'ms/frame':>8} | {'pixels inferred':>15} | {'boxes':>5}")
+    for size in args.sizes:
+        for name, view in ((f"full @{size}", InferenceView(imgsz=size)),
+                           (f"roi  @{size}", InferenceView(imgsz=size, rois=[roi], pad=0))):
+            t0 = time.perf_counter()
+            boxes = sum(len(view.detect(model, f)) for f in frames)
+            ms = (time.perf_counter() - t0) * 1000 / len(frames)
+            print(f"{name:<16} | {ms:>8.1f} | {view.stats()['inferred_pct']:>14.1f}% | {boxes:>5}")
+
+
+if __name__ == "__main__":
+    main()
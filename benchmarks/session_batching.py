@@ -0,0 +1,92 @@
+"""Concurrent webrtc sessions: every session calling the model itself vs. the batching scheduler.
+
+Usage:
+    python benchmarks/session_batching.py                          # 4 sessions, ppe model
+    python benchmarks/session_batching.py --sessions 8 --windows 0 10 25 --fps 10
+    python benchmarks/session_batching.py --key ppe --weights ppe=/models/best.pt
+
+Each session is a thread sending 640x480 frames at ``--fps`` (or as fast as
+it can when that's 0), like ``transform()`` under ``async_processing=True``.
+The "direct" run calls the shared model from every thread. Each scheduled run
+goes through an ``InferenceScheduler`` with the given batch window. Reports
+per-frame latency (submit to result) and the total frames/s served.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.models import WEIGHTS, load_model
+from securevision.scheduler import SCHED_MAX_BATCH, InferenceScheduler
+
+
+def session(model, frame, fps, seconds, latencies, lock):
+    interval = 1.0 / fps if fps else 0.0
+    end = time.perf_counter() + seconds
+    next_due = time.perf_counter()
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        model(frame, conf=0.25, verbose=False)
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+        if interval:
+            next_due += interval
+            time.sleep(max(0.0, next_due - time.perf_counter()))
+
+
+def run(model, sessions, fps, seconds):
+    rng = np.random.default_rng(0)
+    latencies, lock = [], threading.Lock()
+    threads = [threading.Thread(target=session, args=(model, rng.integers(0, 256, (480, 640, 3), dtype=np.uint8),
+                                                      fps, seconds, latencies, lock))
+               for _ in range(sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    ms = np.array(latencies) * 1000
+    return {"p50": np.percentile(ms, 50), "p95": np.percentile(ms, 95), "fps": len(ms) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--key", choices=sorted(WEIGHTS), default="ppe")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=0.0, help="Per-session frame rate; 0 = flat out")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 10.0, 25.0],
+                        help="Scheduler batch windows (ms) to try")
+    parser.add_argument("--max-batch", type=int, default=SCHED_MAX_BATCH)
+    parser.add_argument("--threads", type=int, help="Torch thread budget (default: every core)")
+    args = parser.parse_args()
+
+    overrides = dict(item.partition("=")[::2] for item in args.weights or [])
+    model = load_model(args.key, overrides.get(args.key))
+    model(np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)   # warm-up
+    print(f"{args.sessions} session(s) at {args.fps or 'max'} fps, {args.seconds:.0f} s per run, "
+          f"{os.cpu_count()} core(s)")
+    print(f"{'mode':<16} | {'p50 ms':>7} | {'p95 ms':>7} | {'total fps':>9} | {'mean batch':>10}")
+
+    # YOLO predictors aren't thread-safe; direct calls share one the way the apps did
+    r = run(model, args.sessions, args.fps, args.seconds)
+    print(f"{'direct':<16} | {r['p50']:>7.1f} | {r['p95']:>7.1f} | {r['fps']:>9.1f} | {'1.00':>10}")
+    for window in args.windows:
+        scheduler = InferenceScheduler(max_batch=args.max_batch, max_wait_ms=window, threads=args.threads)
+        r = run(scheduler.wrap(model, args.key), args.sessions, args.fps, args.seconds)
+        stats = scheduler.stats()
+        print(f"{f'window {window:g} ms':<16} | {r['p50']:>7.1f} | {r['p95']:>7.1f} | {r['fps']:>9.1f} | "
+              f"{stats['mean_batch']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Person-in-zone check: Shapely Point loop vs. rasterized ZoneMask lookup.
+
+Usage:
+    python benchmarks/zone_containment.py [--image SafetyRegion/demo.png]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from shapely.geometry import Point
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from securevision.zone import ZoneMask, detect_green_zone
+
+
+def shapely_loop(polygon, feet):
+    # The pre-vectorization behaviour of SafetyRegion process_frame
+    return np.array([not polygon.contains(Point(int(cx), int(cy))) for cx, cy in feet], dtype=bool)
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", default=os.path.join(ROOT_DIR, "SafetyRegion", "demo.png"))
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    polygon, pts = detect_green_zone(frame)
+    if polygon is None:
+        sys.exit(f"No green zone found in {args.image}")
+    h, w = frame.shape[:2]
+
+    t0 = time.perf_counter()
+    mask = ZoneMask([pts], frame.shape)
+    print(f"zone mask build (once per zone recompute): {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+    rng = np.random.default_rng(0)
+    print(f"{'persons':>7} | {'shapely ms':>10} | {'mask ms':>8} | {'speed-up':>8} | {'agree':>5}")
+    for n in args.counts:
+        feet = np.stack([rng.integers(0, w, n), rng.integers(0, h, n)], axis=1)
+        slow = timed(lambda: shapely_loop(polygon, feet), args.repeats)
+        fast = timed(lambda: ~mask.inside_any(feet), args.repeats)
+        # Shapely excludes the outline and the raster includes it, so points
+        # within a pixel of the outline may disagree.
+        agree = np.mean(shapely_loop(polygon, feet) == ~mask.inside_any(feet))
+        print(f"{n:>7} | {slow:>10.3f} | {fast:>8.3f} | {slow / fast:>7.1f}x | {agree:>5.0%}")
+
+
+if __name__ == "__main__":
+    main()
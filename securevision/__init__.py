@@ -0,0 +1,5 @@
+"""Shared detection helpers used by the TATASecure Vision Streamlit apps.
+
+Each app folder is still deployed on its own; the apps put the repository
+root on ``sys.path`` so they can import from here.
+"""
@@ -0,0 +1,97 @@
+"""Lightweight detection renderer used instead of ``results.plot()``.
+
+``results.plot()`` rebuilds an Annotator, copies the frame and draws every
+box at full resolution whether or not the frame is ever shown. ``render``
+draws only boxes, class-coloured labels and the optional PPE overlay. It can
+draw straight onto a downscaled preview buffer, and callers skip it entirely
+for frames that are never displayed or written.
+"""
+
+import cv2
+import numpy as np
+
+# Same hues as the Ultralytics palette, so annotated output looks unchanged
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+]
+OVERLAY_COLOR = (0, 0, 255)
+
+
+def class_color(cls_id):
+    return PALETTE[int(cls_id) % len(PALETTE)]
+
+
+def as_array(results):
+    """(N, 6) float32 array of ``x1, y1, x2, y2, conf, cls`` from a YOLO result."""
+    return results.boxes.data.cpu().numpy().astype(np.float32).reshape(-1, 6)
+
+
+def preview_scale(shape, max_width):
+    """Scale factor that brings a frame down to ``max_width`` (never up)."""
+    w = shape[1]
+    return max_width / w if max_width and w > max_width else 1.0
+
+
+def downscale(img, max_width):
+    """``img`` shrunk to ``max_width`` keeping aspect ratio (returned as-is if narrower)."""
+    scale = preview_scale(img.shape, max_width)
+    if scale == 1.0:
+        return img
+    h = img.shape[0]
+    return cv2.resize(img, (max_width, int(h * scale)))
+
+
+def draw_detections(img, dets, names, scale=1.0, line_width=2, labels=True):
+    """Draw ``dets`` (N, 6) onto ``img`` in place, scaling boxes by ``scale``."""
+    if len(dets) == 0:
+        return img
+    boxes = np.round(dets[:, :4] * scale).astype(int)
+    font_scale = max(0.4, line_width / 4)
+    for (x1, y1, x2, y2), conf, cls_id in zip(boxes, dets[:, 4], dets[:, 5].astype(int)):
+        color = class_color(cls_id)
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, line_width, cv2.LINE_AA)
+        if labels:
+            text = f"{names[cls_id]} {conf:.2f}"
+            (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+            top = y1 - th - 4 if y1 - th - 4 >= 0 else y1
+            cv2.rectangle(img, (x1, top), (x1 + tw + 2, top + th + 4), color, -1)
+            cv2.putText(img, text, (x1 + 1, top + th + 1), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, (255, 255, 255), 1, cv2.LINE_AA)
+    return img
+
+
+def draw_tags(img, boxes, tags, scale=1.0):
+    """Write ``(text, color)`` tags under each xyxy box in ``boxes``, in place; empty texts are skipped."""
+    for box, (text, color) in zip(boxes, tags):
+        if not text:
+            continue
+        x1, _, _, y2 = (np.asarray(box[:4]) * scale).round().astype(int)
+        cv2.putText(img, text, (x1, y2 + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2, cv2.LINE_AA)
+    return img
+
+
+def draw_overlay(img, messages, origin=(10, 30), step=30):
+    """Stack text messages (e.g. PPE REQUIRED/VIOLATION) down the left edge."""
+    x, y = origin
+    for message in messages:
+        cv2.putText(img, message, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, OVERLAY_COLOR, 2)
+        y += step
+    return img
+
+
+def render(frame, dets, names, max_width=None, messages=(), line_width=2, tags=None):
+    """Annotated copy of ``frame``, downscaled to ``max_width`` first if given.
+
+    Drawing happens on the (possibly smaller) output buffer, so a preview costs
+    only as many pixels as it shows. ``tags`` is an optional ``(boxes,
+    [(text, color), ...])`` pair, e.g. per-worker PPE status.
+    """
+    scale = preview_scale(frame.shape, max_width)
+    out = downscale(frame, max_width) if scale != 1.0 else frame.copy()
+    draw_detections(out, dets, names, scale=scale, line_width=line_width)
+    if tags is not None:
+        draw_tags(out, *tags, scale=scale)
+    return draw_overlay(out, messages)
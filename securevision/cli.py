@@ -0,0 +1,234 @@
+"""Headless batch analysis of a directory of recordings on a process pool.
+
+Usage:
+    python -m securevision.cli ppe /recordings/ --out reports/ --workers 4
+    python -m securevision.cli harness /recordings/ --per-second 2
+    python -m securevision.cli zone /recordings/ --snapshots reports/violations
+    python -m securevision.cli kadhai /kitchen/ --weights kadhai=/models/kadhai.pt
+
+Each worker process loads the task's models once and analyses whole videos.
+A video's name is its path relative to the input directory, without the
+extension (``dock/2024-01-01``), so same-named recordings in different
+folders stay apart. For each video the CLI writes ``<name>.json`` and
+``<name>.csv`` (mirroring the input's subdirectories) with the peak
+count of every class seen in a single frame, split into compliant classes and
+violations as in the PPE demo summary. It also writes ``summary.json`` and
+``summary.csv`` covering the whole run.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from securevision.models import load_model
+from securevision.ppe import split_peaks, update_peaks
+from securevision.roi import load_cameras
+from securevision.snapshots import SnapshotWriter, ViolationEpisodes
+from securevision.tasks import TASKS, frame_time
+from securevision.video import iter_frames, iter_sampled
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+_worker = {}
+
+
+def find_videos(root):
+    if os.path.isfile(root):
+        return [root]
+    paths = glob.glob(os.path.join(root, "**", "*"), recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def video_name(path, root):
+    """``path`` relative to the input ``root``, without extension and with ``/`` separators."""
+    rel = os.path.basename(path) if os.path.isfile(root) else os.path.relpath(path, root)
+    return os.path.splitext(rel)[0].replace(os.sep, "/")
+
+
+def _init_worker(task_name, weights, threads, snapshot_dir, cameras=None):
+    import torch
+    torch.set_num_threads(threads)
+    task_cls = TASKS[task_name]
+    _worker["task"] = task_cls
+    _worker["models"] = {key: load_model(key, weights.get(key)) for key in task_cls.models}
+    _worker["snapshots"] = SnapshotWriter(snapshot_dir) if snapshot_dir else None
+    _worker["cameras"] = load_cameras(cameras)
+
+
+def analyse_video(path, every=1, per_second=None, name=None):
+    """Run the worker's task over one video (``name`` from ``video_name``) and return its report dict."""
+    task_cls, models, writer = _worker["task"], _worker["models"], _worker["snapshots"]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = name or stem
+    # a recording picks up the inference view of the camera it's named after: its name, else its file stem
+    cameras = _worker["cameras"]
+    task = task_cls(models, camera_id=name, view=cameras.get(name) or cameras.get(stem))
+    episodes = ViolationEpisodes(writer, prefix=f"{task.name}_{name.replace('/', '__')}") if writer else None
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {"video": path, "name": name, "task": task.name, "error": "could not open video"}
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+    frames = iter_sampled(cap, per_second, fps) if per_second else iter_frames(cap, every)
+
+    peak_counts = Counter()
+    analysed = last_idx = 0
+    started = time.perf_counter()
+    try:
+        for idx, frame in frames:
+            t = frame_time(idx, fps)
+            frame_counts, score = task.process(frame, t)
+            update_peaks(peak_counts, frame_counts)
+            if episodes:
+                episodes.update(frame, score > 0, score=score, now=t)
+            analysed += 1
+            last_idx = idx
+    finally:
+        cap.release()
+        if episodes:
+            episodes.flush()
+    seconds = time.perf_counter() - started
+
+    compliant, violations = split_peaks(peak_counts, task.is_violation)
+    report = {
+        "video": path,
+        "name": name,
+        "task": task.name,
+        "frames": total,
+        "analysed": analysed,
+        "duration": round(frame_time(last_idx + 1, fps), 2),
+        "seconds": round(seconds, 2),
+        "fps": round(analysed / seconds, 2) if seconds else 0.0,
+        "speed_up": round(frame_time(last_idx + 1, fps) / seconds, 1) if seconds else 0.0,
+        "peak_counts": dict(peak_counts.most_common()),
+        "compliant": compliant,
+        "violations": violations,
+    }
+    report.update(task.extra(), inference_view=task.view.stats())
+    return report
+
+
+def write_report(report, out_dir):
+    base = os.path.join(out_dir, *report["name"].split("/"))
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    with open(f"{base}.json", "w") as f:
+        json.dump(report, f, indent=2)
+    with open(f"{base}.csv", "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["class", "peak", "violation"])
+        for cls, cnt in report.get("peak_counts", {}).items():
+            w.writerow([cls, cnt, cls in report["violations"]])
+
+
+def write_summary(reports, out_dir, wall_seconds):
+    analysed = sum(r.get("analysed", 0) for r in reports)
+    summary = {
+        "videos": len(reports),
+        "failed": [r["video"] for r in reports if "error" in r],
+        "frames": sum(r.get("frames", 0) for r in reports),
+        "analysed": analysed,
+        "wall_seconds": round(wall_seconds, 2),
+        "fps": round(analysed / wall_seconds, 2) if wall_seconds else 0.0,
+        "reports": reports,
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    with open(os.path.join(out_dir, "summary.csv"), "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["video", "task", "class", "peak", "violation"])
+        for r in reports:
+            for cls, cnt in r.get("peak_counts", {}).items():
+                w.writerow([r["video"], r["task"], cls, cnt, cls in r["violations"]])
+    return summary
+
+
+def positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
+def positive_float(value):
+    x = float(value)
+    if not x > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return x
+
+
+def parse_weights(items):
+    weights = {}
+    for item in items or []:
+        key, _, path = item.partition("=")
+        weights[key] = path
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m securevision.cli",
+        description="Analyse a directory of recordings with one of the TATASecure Vision models.")
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("input", help="Video file or directory (searched recursively)")
+    parser.add_argument("--out", default="reports", help="Report directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--every", type=positive_int, default=1, help="Analyse every N-th frame")
+    parser.add_argument("--per-second", type=positive_float, help="Analyse N frames per second of video instead")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--snapshots", help="Save one snapshot per violation episode here")
+    parser.add_argument("--cameras", help="JSON of per-camera inference size / regions of interest, keyed by "
+                                          "video name or file stem (default: $SECUREVISION_CAMERAS; "
+                                          "see securevision.roi)")
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.input)
+    if not videos:
+        parser.error(f"no videos found in {args.input}")
+    os.makedirs(args.out, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(videos)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"{len(videos)} video(s), {workers} worker(s) × {threads} torch thread(s)")
+
+    reports = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(args.task, parse_weights(args.weights), threads, args.snapshots,
+                                       args.cameras)) as pool:
+        futures = {pool.submit(analyse_video, v, args.every, args.per_second, video_name(v, args.input)): v
+                   for v in videos}
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {"video": futures[future], "name": video_name(futures[future], args.input),
+                          "task": args.task, "error": repr(e)}
+            reports.append(report)
+            if "error" in report:
+                print(f"✗ {report['video']}: {report['error']}")
+                continue
+            write_report(report, args.out)
+            print(f"✓ {report['video']}: {report['analysed']} frames in {report['seconds']}s "
+                  f"({report['fps']} fps), violations: {report['violations'] or 'none'}")
+
+    reports.sort(key=lambda r: r["video"])
+    summary = write_summary(reports, args.out, time.perf_counter() - started)
+    print(f"Done: {summary['analysed']} frames from {summary['videos']} video(s) in "
+          f"{summary['wall_seconds']}s — {summary['fps']} fps total")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
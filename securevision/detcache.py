@@ -0,0 +1,260 @@
+"""On-disk cache of raw per-frame detections, keyed by video content and model.
+
+Moving the Demo page's Confidence slider, or switching from Live Preview to
+Export on the same clip, used to re-run the model over every frame. Now
+detections are stored once at ``CACHE_CONF``, the lowest confidence the UI
+offers, and later runs only filter them. The cache key is the SHA-1 of the
+video file plus ``model_id`` (weights hash, backend and image size), so a
+re-uploaded copy of a clip hits the cache while retrained weights miss it.
+Filtering after NMS gives the same boxes as running at the higher threshold:
+a box can only be suppressed by a higher-scoring one, and that box passes the
+filter too.
+
+Each clip is one ``.npz`` (frame indices, per-frame offsets and one (M, 6)
+float32 array) under ``$SECUREVISION_DETECTION_CACHE`` (default
+``~/.cache/securevision/detections``). The least recently used clips are
+evicted once the directory exceeds ``$SECUREVISION_DETECTION_CACHE_MB``
+(default 512). Pre-warm clips ahead of time with:
+
+    python -m securevision.detcache ppe PPEStreamlitApp/demo_videos/*.mp4
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import threading
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DETCACHE_ENV = "SECUREVISION_DETECTION_CACHE"
+DETCACHE_BUDGET_ENV = "SECUREVISION_DETECTION_CACHE_MB"
+DEFAULT_DETCACHE = os.path.join(os.path.expanduser("~"), ".cache", "securevision", "detections")
+DETCACHE_MB = 512
+CACHE_CONF = 0.10   # detections are stored at the Demo slider's minimum
+WARM_BATCH = 8
+
+_file_ids = {}
+
+
+def file_id(path):
+    """SHA-1 of a file's content, remembered per (path, size, mtime) so it's hashed once."""
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _file_ids:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _file_ids[memo] = h.hexdigest()
+    return _file_ids[memo]
+
+
+def model_id(key, path=None, imgsz=640):
+    """Cache key part for the model that ``models.load_model(key, path)`` would load."""
+    from securevision.export import BACKEND_ENV
+    from securevision.models import WEIGHTS, weights_id
+
+    wid = weights_id(path or WEIGHTS[key]).replace(os.sep, "_")
+    backend = os.environ.get(BACKEND_ENV) or "torch"
+    return f"{key}-{wid[:16]}-{backend}-{imgsz}"
+
+
+def filter_conf(dets, conf):
+    return dets[dets[:, 4] >= conf] if conf > CACHE_CONF else dets
+
+
+class ClipDetections:
+    """Detections of one video by one model: frame index → (N, 6) array at ``CACHE_CONF``.
+
+    ``detect(infer, batch, conf)`` returns the detections for ``(idx, frame)``
+    pairs above ``conf``, calling ``infer(frames)`` only for the frames not
+    cached yet. ``infer`` must return one (N, 6) array per frame, at
+    ``CACHE_CONF``. ``hits`` and ``misses`` count frames served each way.
+    """
+
+    def __init__(self, path, frames=None, frame_count=None):
+        self.path = path
+        self.frames = frames or {}
+        self.frame_count = frame_count   # set once every frame of the video has been seen
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def __contains__(self, idx):
+        return idx in self.frames
+
+    def covers(self, indices):
+        return all(idx in self.frames for idx in indices)
+
+    def get(self, idx, conf=CACHE_CONF):
+        return filter_conf(self.frames[idx], conf)
+
+    def add(self, idx, dets):
+        self.frames[idx] = np.asarray(dets, dtype=np.float32).reshape(-1, 6)
+        self.dirty = True
+
+    def detect(self, infer, batch, conf=CACHE_CONF):
+        todo = [(idx, frame) for idx, frame in batch if idx not in self.frames]
+        if todo:
+            for (idx, _), dets in zip(todo, infer([frame for _, frame in todo])):
+                self.add(idx, dets)
+        self.misses += len(todo)
+        self.hits += len(batch) - len(todo)
+        return [self.get(idx, conf) for idx, _ in batch]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            offsets = data["offsets"]
+            frames = {int(idx): data["dets"][offsets[i]:offsets[i + 1]] for i, idx in enumerate(data["idx"])}
+            frame_count = int(data["frame_count"]) or None
+        return cls(path, frames, frame_count)
+
+    def save(self):
+        idx = np.array(sorted(self.frames), dtype=np.int32)
+        sizes = [len(self.frames[i]) for i in idx]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        dets = np.concatenate([self.frames[i] for i in idx]) if len(idx) else np.zeros((0, 6), np.float32)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(tmp, idx=idx, offsets=offsets, dets=dets.astype(np.float32),
+                            frame_count=np.int64(self.frame_count or 0))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+class DetectionCache:
+    """Directory of ``ClipDetections`` files with a size budget and LRU eviction."""
+
+    def __init__(self, root=None, budget_mb=None):
+        self.root = root or os.environ.get(DETCACHE_ENV) or DEFAULT_DETCACHE
+        budget_mb = budget_mb if budget_mb is not None else float(os.environ.get(DETCACHE_BUDGET_ENV) or DETCACHE_MB)
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def clip(self, video_path, model):
+        """Cached detections of ``video_path`` by ``model`` (a ``model_id``); empty on a miss."""
+        path = os.path.join(self.root, f"{file_id(video_path)[:20]}-{model}.npz")
+        with self._lock:
+            if os.path.exists(path):
+                try:
+                    os.utime(path)   # most recently used
+                    return ClipDetections.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("discarding unreadable detection cache %s: %s", path, e)
+        return ClipDetections(path)
+
+    def save(self, clip):
+        """Write ``clip`` (merged with whatever another run saved meanwhile), then evict down to the budget."""
+        if not clip.dirty:
+            return
+        with self._lock:
+            if os.path.exists(clip.path):
+                try:
+                    on_disk = ClipDetections.load(clip.path)
+                    for idx, dets in on_disk.frames.items():
+                        clip.frames.setdefault(idx, dets)
+                    clip.frame_count = clip.frame_count or on_disk.frame_count
+                except (OSError, ValueError, KeyError):
+                    pass
+            clip.save()
+            self._evict(keep=clip.path)
+
+    def _evict(self, keep=None):
+        files = sorted(glob.glob(os.path.join(self.root, "*.npz")), key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.budget_bytes:
+                break
+            if f == keep:
+                continue
+            total -= os.path.getsize(f)
+            os.remove(f)
+            logger.info("detection cache over budget: evicted %s", os.path.basename(f))
+
+    def stats(self):
+        files = glob.glob(os.path.join(self.root, "*.npz"))
+        return {"clips": len(files), "size_mb": round(sum(os.path.getsize(f) for f in files) / 2**20, 1),
+                "budget_mb": round(self.budget_bytes / 2**20)}
+
+
+def warm(cache, video_path, model, infer, batch_size=WARM_BATCH, lock=None, stop=None):
+    """Fill the cache with every frame of ``video_path``; returns the number of frames inferred.
+
+    ``lock`` is held around each ``infer`` call when the model is shared with
+    other threads. Set ``stop`` (a ``threading.Event``) to give up early;
+    whatever was done by then is saved.
+    """
+    clip = cache.clip(video_path, model)
+    if clip.frame_count:
+        return 0
+    cap = cv2.VideoCapture(video_path)
+    idx, batch = 0, []
+
+    def flush():
+        if lock is None:
+            clip.detect(infer, batch)
+        else:
+            with lock:
+                clip.detect(infer, batch)
+        batch.clear()
+
+    try:
+        while not (stop is not None and stop.is_set()):
+            idx += 1
+            if idx in clip:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append((idx, frame))
+            if len(batch) == batch_size:
+                flush()
+        else:
+            idx = None
+        if batch:
+            flush()
+        if idx is not None:
+            clip.frame_count = idx - 1
+            clip.dirty = True
+    finally:
+        cap.release()
+        cache.save(clip)
+    return clip.misses
+
+
+def main(argv=None):
+    from securevision.annotate import as_array
+    from securevision.cli import parse_weights
+    from securevision.models import WEIGHTS, load_model
+
+    parser = argparse.ArgumentParser(prog="python -m securevision.detcache", description=__doc__.splitlines()[0])
+    parser.add_argument("key", choices=sorted(WEIGHTS))
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--batch", type=int, default=WARM_BATCH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    path = parse_weights(args.weights).get(args.key)
+    model = load_model(args.key, path)
+    cache = DetectionCache()
+    mid = model_id(args.key, path)
+    for video in args.videos:
+        inferred = warm(cache, video, mid, lambda frames: [as_array(r) for r in model(frames, conf=CACHE_CONF,
+                                                                                       verbose=False)],
+                        batch_size=args.batch)
+        print(f"{video}: {inferred} frame(s) inferred" if inferred else f"{video}: already cached")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
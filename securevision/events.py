@@ -0,0 +1,339 @@
+"""Queryable store of violation events, with a disk budget.
+
+Each violation episode becomes one row per violating class. A row holds the
+camera, app, start/end time, class, peak count, score and the path of the
+episode's snapshot. Rows go into SQLite in WAL mode. ``record`` only queues
+the row; a background thread inserts the queue in batches, so frame
+processing never waits on the disk. Readers open their own connections and
+don't block the writer. Indexes on (camera, ts), (class, ts) and (ts) keep
+range and aggregate queries fast:
+
+    python -m securevision.events count --class "Without Helmet" --camera cam3 --since 7d
+    python -m securevision.events count --by camera class day
+    python -m securevision.events list --since 1h
+
+The database plus its linked snapshots are kept under a size budget
+(``$SECUREVISION_EVENTS_BUDGET_MB``, default 1024). When it's exceeded, the
+oldest episodes are deleted together with their JPEGs. The apps record to
+``$SECUREVISION_EVENTS_DB`` (default ``securevision_events.db`` in the
+working directory); set it to ``off`` to disable.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+EVENTS_DB_ENV = "SECUREVISION_EVENTS_DB"
+EVENTS_BUDGET_ENV = "SECUREVISION_EVENTS_BUDGET_MB"
+DEFAULT_EVENTS_DB = "securevision_events.db"
+DEFAULT_BUDGET_MB = 1024
+EVENT_QUEUE = 10000
+INSERT_BATCH = 500
+FLUSH_INTERVAL = 1.0     # seconds a queued event may wait for its batch
+BUDGET_INTERVAL = 30.0   # seconds between disk-budget checks
+EVICT_BATCH = 1000       # most rows deleted per eviction round
+ROW_BYTES = 200          # rough on-disk size of one row with its index entries
+SNAPSHOT_GRACE = 600.0   # seconds a linked snapshot may stay missing (still queued) before it counts as 0 bytes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    app TEXT NOT NULL,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    score REAL,
+    snapshot TEXT,
+    snapshot_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_camera_ts ON events (camera, ts);
+CREATE INDEX IF NOT EXISTS events_class_ts ON events (class, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+"""
+GROUPS = {
+    "camera": "camera",
+    "app": "app",
+    "class": "class",
+    "hour": "strftime('%Y-%m-%d %H:00', ts, 'unixepoch', 'localtime')",
+    "day": "date(ts, 'unixepoch', 'localtime')",
+}
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class EventStore:
+    """Append-only SQLite event table with batched background inserts and a disk budget.
+
+    ``EventStore.reader(path)`` opens an existing database for queries only,
+    without creating the schema or starting the writer thread.
+    """
+
+    def __init__(self, path, budget_mb=DEFAULT_BUDGET_MB, batch_size=INSERT_BATCH,
+                 flush_interval=FLUSH_INTERVAL, budget_interval=BUDGET_INTERVAL, readonly=False):
+        self.path = path
+        self.budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.budget_interval = budget_interval
+        self.readonly = readonly
+        self.recorded = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._missing = {}   # event id -> when its snapshot was first found missing
+        self._queue = self._thread = None
+        if readonly:
+            return
+        if os.path.dirname(os.path.abspath(path)):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        # must be set before the first table exists for deletes to give space back
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._queue = queue.Queue(maxsize=EVENT_QUEUE)
+        self._thread = threading.Thread(target=self._work, name="event-store", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def reader(cls, path):
+        return cls(path, budget_mb=None, readonly=True)
+
+    # -- writing ------------------------------------------------------
+
+    def record(self, camera, cls, ts=None, end_ts=None, count=1, score=None, app="", snapshot=None):
+        """Queue one event; never blocks (returns False and counts it in ``dropped`` if the queue is full)."""
+        if self.readonly:
+            raise RuntimeError(f"event store {self.path} was opened read-only")
+        ts = time.time() if ts is None else ts
+        row = (ts, ts if end_ts is None else end_ts, str(camera), app, cls, int(count),
+               None if score is None else float(score), os.path.abspath(snapshot) if snapshot else None)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self):
+        """Insert everything still queued, then stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+
+    def _work(self):
+        conn = connect(self.path)
+        last_budget = time.monotonic()
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                with conn:
+                    conn.executemany("INSERT INTO events (ts, end_ts, camera, app, class, count, score, snapshot) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                self.recorded += len(batch)
+            if self.budget_bytes and (stopping or time.monotonic() - last_budget >= self.budget_interval):
+                last_budget = time.monotonic()
+                try:
+                    self.enforce_budget(conn)
+                except sqlite3.Error as e:
+                    logger.warning("event store budget check failed: %s", e)
+        conn.close()
+
+    # -- disk budget --------------------------------------------------
+
+    def _snapshot_sizes(self, conn):
+        # snapshots are written after their event is queued, so sizes are filled in lazily: a file
+        # that's missing (or just being written) is re-checked next time, until SNAPSHOT_GRACE runs out
+        rows = conn.execute("SELECT id, snapshot FROM events WHERE snapshot IS NOT NULL "
+                            "AND snapshot_bytes IS NULL").fetchall()
+        seen = set(r[0] for r in conn.execute("SELECT DISTINCT snapshot FROM events WHERE snapshot_bytes > 0"))
+        now = time.time()
+        updates = []
+        for event_id, path in rows:
+            # one row per class shares an episode's snapshot: count the file once
+            if path in seen:
+                size = 0
+            elif os.path.exists(path):
+                st = os.stat(path)
+                if now - st.st_mtime < 1.0:
+                    continue
+                size = st.st_size
+            elif now - self._missing.setdefault(event_id, now) >= SNAPSHOT_GRACE:
+                size = 0
+            else:
+                continue
+            self._missing.pop(event_id, None)
+            seen.add(path)
+            updates.append((size, event_id))
+        if updates:
+            with conn:
+                conn.executemany("UPDATE events SET snapshot_bytes = ? WHERE id = ?", updates)
+
+    def disk_usage(self, conn=None):
+        """Bytes used by live database pages plus linked snapshots."""
+        own = conn is None
+        conn = conn or connect(self.path)
+        try:
+            self._snapshot_sizes(conn)
+            page_size, = conn.execute("PRAGMA page_size").fetchone()
+            pages, = conn.execute("PRAGMA page_count").fetchone()
+            free, = conn.execute("PRAGMA freelist_count").fetchone()
+            snapshots, = conn.execute("SELECT COALESCE(SUM(snapshot_bytes), 0) FROM events").fetchone()
+            return (pages - free) * page_size + snapshots
+        finally:
+            if own:
+                conn.close()
+
+    def enforce_budget(self, conn):
+        """Delete the oldest episodes (rows and JPEGs) until usage fits the budget."""
+        while True:
+            excess = self.disk_usage(conn) - self.budget_bytes
+            if excess <= 0:
+                break
+            cutoff = None
+            for ts, size in conn.execute("SELECT ts, COALESCE(snapshot_bytes, 0) FROM events ORDER BY ts LIMIT ?",
+                                         (EVICT_BATCH,)):
+                cutoff = ts
+                excess -= size + ROW_BYTES
+                if excess <= 0:
+                    break
+            if cutoff is None:
+                break
+            # whole episodes go at once: every class row of an episode shares its ts
+            doomed = conn.execute("SELECT DISTINCT snapshot FROM events WHERE ts <= ? AND snapshot IS NOT NULL",
+                                  (cutoff,)).fetchall()
+            with conn:
+                deleted = conn.execute("DELETE FROM events WHERE ts <= ?", (cutoff,)).rowcount
+            for (path,) in doomed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.evicted += deleted
+            logger.info("event store over budget: evicted %d event(s) up to %s", deleted,
+                        datetime.fromtimestamp(cutoff).isoformat(timespec="seconds"))
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # -- queries ------------------------------------------------------
+
+    def _where(self, camera=None, cls=None, app=None, start=None, end=None):
+        clauses, args = [], []
+        for column, value in (("camera", camera), ("class", cls), ("app", app)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if start is not None:
+            clauses.append("ts >= ?")
+            args.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            args.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, camera=None, cls=None, app=None, start=None, end=None, limit=100):
+        """Newest matching events first, as dicts."""
+        where, args = self._where(camera, cls, app, start, end)
+        with closing(connect(self.path)) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f"SELECT * FROM events{where} ORDER BY ts DESC LIMIT ?", args + [limit])
+            return [dict(r) for r in rows]
+
+    def count(self, camera=None, cls=None, app=None, start=None, end=None, by=()):
+        """Event counts (and summed peak counts), optionally grouped by ``GROUPS`` keys."""
+        where, args = self._where(camera, cls, app, start, end)
+        keys = [GROUPS[b] for b in by]
+        select = ", ".join(keys + ["COUNT(*)", "SUM(count)"])
+        group = f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else ""
+        with closing(connect(self.path)) as conn:
+            rows = conn.execute(f"SELECT {select} FROM events{where}{group}", args).fetchall()
+        return [dict(zip(list(by) + ["events", "total"], r)) for r in rows]
+
+    def stats(self):
+        return {"recorded": self.recorded, "dropped": self.dropped, "evicted": self.evicted,
+                "pending": self._queue.qsize() if self._queue else 0}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def default_store():
+    """The process-wide ``EventStore`` at ``$SECUREVISION_EVENTS_DB``, or None when set to ``off``."""
+    global _store
+    path = os.environ.get(EVENTS_DB_ENV) or DEFAULT_EVENTS_DB
+    if path.lower() in ("off", "none", "0"):
+        return None
+    with _store_lock:
+        if _store is None:
+            budget = float(os.environ.get(EVENTS_BUDGET_ENV) or DEFAULT_BUDGET_MB)
+            _store = EventStore(path, budget_mb=budget)
+        return _store
+
+
+def parse_since(text):
+    """``30m`` / ``6h`` / ``7d`` ago, or an ISO date/time, as a Unix timestamp."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if text[-1:] in units and text[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(text[:-1]) * units[text[-1]]
+    return datetime.fromisoformat(text).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m securevision.events", description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.environ.get(EVENTS_DB_ENV) or DEFAULT_EVENTS_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("count", "list"):
+        p = sub.add_parser(name)
+        p.add_argument("--camera")
+        p.add_argument("--class", dest="cls")
+        p.add_argument("--app")
+        p.add_argument("--since", type=parse_since, help="e.g. 7d, 6h or 2025-06-01")
+        p.add_argument("--until", type=parse_since)
+    sub.choices["count"].add_argument("--by", nargs="+", choices=sorted(GROUPS), default=[])
+    sub.choices["list"].add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"no event database at {args.db}")
+    store = EventStore.reader(args.db)
+    filters = dict(camera=args.camera, cls=args.cls, app=args.app, start=args.since, end=args.until)
+    if args.command == "count":
+        for row in store.count(by=args.by, **filters):
+            print("  ".join(f"{k}={v}" for k, v in row.items()))
+    else:
+        for e in store.query(limit=args.limit, **filters):
+            when = datetime.fromtimestamp(e["ts"]).isoformat(sep=" ", timespec="seconds")
+            print(f"{when}  {e['camera']:<12} {e['app']:<8} {e['class']:<22} ×{e['count']}  "
+                  f"{e['snapshot'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Exported CPU inference backends (ONNX Runtime / OpenVINO), cached by weight hash.
+
+``load_model`` uses one of these when ``$SECUREVISION_BACKEND`` is set:
+
+    torch           the .pt weights through PyTorch (default)
+    onnx            ONNX Runtime, FP32
+    onnx-int8       ONNX Runtime, INT8 (static QDQ quantization, calibrated on demo frames)
+    openvino        OpenVINO, FP32
+    openvino-int8   OpenVINO, INT8 (ultralytics export; needs ``nncf``)
+
+Each model is exported once, the first time it's needed, into
+``$SECUREVISION_EXPORT_CACHE`` (default ``~/.cache/securevision/exports``).
+Artifacts are keyed by the SHA-1 of the weights, the backend and the
+ultralytics version, so retrained weights or an upgrade get a fresh export.
+Exports use dynamic shapes, so batched harness crops at ``HARNESS_IMGSZ`` work
+unchanged. ``onnx``/``onnxruntime`` or ``openvino`` are only needed when
+their backend is selected.
+"""
+
+import glob
+import logging
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from securevision.harness import letterbox
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ENV = "SECUREVISION_BACKEND"
+CACHE_ENV = "SECUREVISION_EXPORT_CACHE"
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "securevision", "exports")
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+EXPORT_IMGSZ = 640
+CALIBRATION_FRAMES = 32
+
+
+def cache_dir():
+    return os.environ.get(CACHE_ENV) or DEFAULT_CACHE
+
+
+def artifact_path(path, backend, root=None):
+    """Where the ``backend`` export of weights ``path`` lives in the cache (may not exist yet)."""
+    import ultralytics
+    from securevision.models import weights_id
+
+    wid = weights_id(path)
+    if not os.path.isfile(path):
+        wid = wid.replace(os.sep, "_")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}-{wid[:16]}-{backend}-ul{ultralytics.__version__}"
+    suffix = ".onnx" if backend.startswith("onnx") else "_openvino_model"
+    return os.path.join(root or cache_dir(), name + suffix)
+
+
+def exported(path, backend, calibration=None):
+    """Path of the cached ``backend`` artifact for ``path``, exporting it first if needed."""
+    target = artifact_path(path, backend)
+    if os.path.exists(target):
+        return target
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    logger.info("exporting %s for %s → %s", path, backend, target)
+
+    from ultralytics import YOLO
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(target)) as tmp:
+        # export next to a private copy, so concurrent exports never collide; ultralytics
+        # writes the artifact beside its source, so non-file weights (e.g. *.yaml) are
+        # saved as a checkpoint in ``tmp`` first instead of exporting into the cwd
+        if os.path.isfile(path):
+            source = shutil.copy(path, tmp)
+        else:
+            source = os.path.join(tmp, os.path.splitext(os.path.basename(path))[0] + ".pt")
+            YOLO(path).save(source)
+        model = YOLO(source)
+        if backend.startswith("onnx"):
+            out = model.export(format="onnx", imgsz=EXPORT_IMGSZ, dynamic=True, simplify=False)
+            if backend == "onnx-int8":
+                out = quantize_onnx(out, os.path.join(tmp, "int8.onnx"), calibration)
+        else:
+            out = model.export(format="openvino", imgsz=EXPORT_IMGSZ, dynamic=True,
+                               int8=backend == "openvino-int8")
+        out = os.path.abspath(out)
+        if not os.path.exists(target):
+            os.replace(out, target)
+    return target
+
+
+def calibration_frames(n=CALIBRATION_FRAMES, videos=None):
+    """``n`` frames spread over the bundled demo videos, for INT8 calibration."""
+    from securevision.models import ROOT_DIR
+
+    videos = videos or sorted(glob.glob(os.path.join(ROOT_DIR, "PPEStreamlitApp", "demo_videos", "*.mp4")))
+    frames = []
+    per_video = max(1, n // max(1, len(videos)))
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or per_video
+        for i in range(per_video):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, i * total // per_video)
+            ok, frame = cap.read()
+            if ok:
+                frames.append(frame)
+        cap.release()
+    return frames
+
+
+def to_input(frame, imgsz=EXPORT_IMGSZ):
+    """Letterboxed, RGB, 0-1 NCHW float32 batch of one, as ultralytics feeds the network."""
+    img, _, _ = letterbox(frame, imgsz)
+    return np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def quantize_onnx(fp32_path, int8_path, frames=None):
+    """Static INT8 (QDQ) quantization of an ONNX model, calibrated on ``frames``."""
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    frames = frames if frames is not None else calibration_frames()
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.inputs = iter([{"images": to_input(f)} for f in frames])
+
+        def get_next(self):
+            return next(self.inputs, None)
+
+    quantize_static(fp32_path, int8_path, Reader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return int8_path
+
+
+def load_exported(path, backend):
+    """``YOLO`` over the cached export of ``path``; falls back to the .pt weights if export fails."""
+    from ultralytics import YOLO
+
+    if backend == "torch":
+        return YOLO(path)
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    try:
+        return YOLO(exported(path, backend), task="detect")
+    except Exception as e:
+        logger.warning("%s export of %s failed (%s); using PyTorch", backend, path, e)
+        return YOLO(path)
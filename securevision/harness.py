@@ -0,0 +1,184 @@
+"""Batched harness checks over the person crops of one frame, with per-person verdict caching."""
+
+import time
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+
+from securevision.tracking import IoUTracker, box_iou
+
+HARNESS_CONF = 0.4
+HARNESS_IMGSZ = 320      # crops are letterboxed to a square of this size
+HARNESS_MAX_BATCH = 16   # max crops per forward pass
+HARNESS_VERDICT_TTL = 2.0    # seconds a per-person verdict is reused
+HARNESS_RECHECK_IOU = 0.5    # re-check once a person's box overlaps its checked box less than this
+HARNESS_CONF_MARGIN = 0.1    # scores this close to HARNESS_CONF are re-checked every frame
+
+
+def letterbox(img, size=HARNESS_IMGSZ, color=(114, 114, 114)):
+    """Resize ``img`` to fit a ``size`` x ``size`` square, padding the rest.
+
+    Returns the padded image, the scale applied and the (left, top) padding so
+    boxes found in the square can be mapped back onto the original crop.
+    """
+    h, w = img.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+    if (new_w, new_h) != (w, h):
+        interp = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        img = cv2.resize(img, (new_w, new_h), interpolation=interp)
+
+    left = (size - new_w) // 2
+    top = (size - new_h) // 2
+    out = np.full((size, size, 3), color, dtype=np.uint8)
+    out[top:top + new_h, left:left + new_w] = img
+    return out, scale, (left, top)
+
+
+def harness_detections(harness_model, img, person_boxes, conf=HARNESS_CONF,
+                       imgsz=HARNESS_IMGSZ, max_batch=HARNESS_MAX_BATCH, metrics=None):
+    """Like ``check_harness``, but each entry is an (M, 5) float array of xyxy + score."""
+    if len(person_boxes) == 0:
+        return []
+
+    stage = metrics.stage if metrics is not None else lambda name: nullcontext()
+
+    h, w = img.shape[:2]
+    crops, metas = [], []
+    with stage("preprocess"):
+        for x1, y1, x2, y2 in person_boxes:
+            # at least one pixel inside the image, even for a box on (or past) its far edge
+            x1, y1 = np.clip(x1, 0, w - 1), np.clip(y1, 0, h - 1)
+            x2, y2 = min(max(x2, x1 + 1), w), min(max(y2, y1 + 1), h)
+            crop, scale, (left, top) = letterbox(img[y1:y2, x1:x2], imgsz)
+            crops.append(crop)
+            metas.append((x1, y1, scale, left, top))
+
+    found = []
+    max_batch = max(1, int(max_batch))
+    for start in range(0, len(crops), max_batch):
+        batch = crops[start:start + max_batch]
+        with stage("inference.harness"):
+            results = harness_model(batch, conf=conf, imgsz=imgsz, verbose=False)
+        with stage("postprocess"):
+            for res, (x1, y1, scale, left, top) in zip(results, metas[start:start + max_batch]):
+                boxes = res.boxes.xyxy.cpu().numpy()
+                if len(boxes):
+                    boxes = (boxes - [left, top, left, top]) / scale + [x1, y1, x1, y1]
+                scores = res.boxes.conf.cpu().numpy()
+                found.append(np.column_stack([boxes.reshape(-1, 4), scores.reshape(-1)]))
+    return found
+
+
+def check_harness(harness_model, img, person_boxes, conf=HARNESS_CONF,
+                  imgsz=HARNESS_IMGSZ, max_batch=HARNESS_MAX_BATCH, metrics=None):
+    """Run the harness model on every person crop in as few passes as possible.
+
+    ``person_boxes`` is an (N, 4) int array of xyxy boxes in ``img``. Returns a
+    list with one entry per person box, in the same order: an (M, 4) int array
+    of the harness boxes found for that person, in frame coordinates. With a
+    ``StageMetrics``, cropping, the forward passes and box mapping are timed as
+    ``preprocess``, ``inference.harness`` and ``postprocess``.
+    """
+    found = harness_detections(harness_model, img, person_boxes, conf, imgsz, max_batch, metrics)
+    return [dets[:, :4].astype(int).reshape(-1, 4) for dets in found]
+
+
+class HarnessVerdictCache:
+    """Per-person harness verdicts that are reused until they go stale.
+
+    People get persistent IDs from an ``IoUTracker``. ``check`` returns the
+    same thing as ``check_harness``, but only crops whose verdict is stale go
+    to the model. A verdict is stale when it's new, older than ``ttl``
+    seconds, when the person's box has changed a lot since (IoU below
+    ``min_iou``), or when the best harness score was within ``margin`` of
+    ``conf``. ``ttl=0`` re-checks everyone on every frame.
+    """
+
+    def __init__(self, ttl=HARNESS_VERDICT_TTL, min_iou=HARNESS_RECHECK_IOU, margin=HARNESS_CONF_MARGIN,
+                 conf=HARNESS_CONF, metrics=None):
+        self.ttl = ttl
+        self.min_iou = min_iou
+        self.margin = margin
+        self.conf = conf
+        self.metrics = metrics
+        self.tracker = IoUTracker()
+        self.checked = 0
+        self.reused = 0
+        self._verdicts = {}   # track id -> (checked at, person box, harness dets, best score)
+
+    def _fresh(self, entry, box, now):
+        if entry is None or now - entry[0] >= self.ttl:
+            return False
+        if abs(entry[3] - self.conf) < self.margin:
+            return False
+        return box_iou(np.asarray([box], dtype=np.float32), entry[1][None])[0, 0] >= self.min_iou
+
+    def check(self, harness_model, img, person_boxes, now=None, imgsz=HARNESS_IMGSZ,
+              max_batch=HARNESS_MAX_BATCH):
+        now = time.time() if now is None else now
+        ids = self.tracker.update(person_boxes)
+        stale = [i for i, (tid, box) in enumerate(zip(ids, person_boxes))
+                 if not self._fresh(self._verdicts.get(tid), box, now)]
+
+        if stale:
+            # a lower threshold, so scores just under ``conf`` show up as uncertain
+            found = harness_detections(harness_model, img, np.asarray(person_boxes)[stale],
+                                       conf=max(0.01, self.conf - self.margin), imgsz=imgsz,
+                                       max_batch=max_batch, metrics=self.metrics)
+            for i, dets in zip(stale, found):
+                best = float(dets[:, 4].max()) if len(dets) else 0.0
+                self._verdicts[ids[i]] = (now, np.asarray(person_boxes[i], dtype=np.float32),
+                                          dets[dets[:, 4] >= self.conf, :4], best)
+        self.checked += len(stale)
+        self.reused += len(ids) - len(stale)
+
+        for tid in set(self._verdicts) - self.tracker.active:
+            del self._verdicts[tid]
+
+        out = []
+        for tid, box in zip(ids, person_boxes):
+            _, old_box, boxes, _ = self._verdicts[tid]
+            # follow the person: shift cached harness boxes by the box's move
+            shift = np.asarray(box[:2], dtype=np.float32) - old_box[:2]
+            out.append((boxes + np.tile(shift, 2)).astype(int).reshape(-1, 4))
+        return out
+
+    def stats(self):
+        total = self.checked + self.reused
+        return {"checked": self.checked, "reused": self.reused,
+                "reuse_rate": round(self.reused / total, 3) if total else 0.0}
+
+
+def check_frame(person_model, harness_model, img, verdicts, imgsz=HARNESS_IMGSZ, max_batch=HARNESS_MAX_BATCH,
+                metrics=None):
+    """The Harness app's per-frame work: ``(annotated, violators)``.
+
+    People are detected on the whole frame, ``verdicts`` (a
+    ``HarnessVerdictCache``) checks the new or uncertain ones, and each person
+    is boxed green or red on a copy of ``img``.
+    """
+    stage = metrics.stage if metrics is not None else lambda name: nullcontext()
+    annotated_frame = img.copy()
+    violators = 0
+
+    with stage("inference.person"):
+        results = person_model(img, classes=[0], conf=HARNESS_CONF)[0]
+    person_boxes = results.boxes.xyxy.cpu().numpy().astype(int)
+
+    # One batched harness pass over the crops of new or uncertain people only
+    harness_found = verdicts.check(harness_model, img, person_boxes, imgsz=imgsz, max_batch=max_batch)
+
+    with stage("annotate"):
+        for (x1, y1, x2, y2), harness_boxes in zip(person_boxes, harness_found):
+            if len(harness_boxes) == 0:
+                violators += 1
+                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                cv2.putText(annotated_frame, "❌ No Harness", (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            else:
+                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                cv2.putText(annotated_frame, "✅ Harness", (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    return annotated_frame, violators
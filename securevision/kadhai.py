@@ -0,0 +1,185 @@
+"""Kadhai detection, the unattended-kadhai timer and the motion gate in front of them.
+
+``KadhaiMonitor`` ties them together for one camera. It is driven only by
+the timestamps it's given: stream PTS live, and video time when replaying a
+recording (``securevision.replay``). So the same alert fires at the same
+point of a shift whether it's watched live or audited at many times real time.
+"""
+
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from securevision.roi import InferenceView
+
+TIMER_DURATION = 5 * 60  # 5 minutes
+KADHAI_CONF = 0.5
+PERSON_CONF = 0.5
+GATE_SIZE = (96, 54)           # the gate compares frames at this resolution
+GATE_PIXEL_DELTA = 20          # grey-level change that counts a gate pixel as changed
+GATE_CHANGED_FRACTION = 0.01   # share of changed pixels that means the scene moved
+GATE_MAX_INTERVAL = 10.0       # seconds; full inference at least this often regardless
+
+
+def detect(kadhai_model, person_model, img, metrics=None, view=None):
+    """``(kadhai, person)`` detections as (N, 6) ``x1, y1, x2, y2, conf, cls`` arrays.
+
+    With a ``StageMetrics``, the two models are timed as ``inference.kadhai``
+    and ``inference.person``. ``view`` (a ``roi.InferenceView``) restricts
+    both to the camera's regions of interest.
+    """
+    stage = metrics.stage if metrics is not None else lambda name: nullcontext()
+    view = view or InferenceView()
+    with stage("inference.kadhai"):
+        kadhai = view.detect(kadhai_model, img, conf=KADHAI_CONF)
+    with stage("inference.person"):
+        person = view.detect(person_model, img, conf=PERSON_CONF, classes=[0])
+    return kadhai, person
+
+
+def draw(img, kadhai_dets, person_dets):
+    """Copy of ``img`` with kadhai (orange) and person (green) boxes, as the app shows them."""
+    annotated = img.copy()
+    for dets, label, color in ((kadhai_dets, "Kadhai", (255, 165, 0)), (person_dets, "Person", (0, 255, 0))):
+        for x1, y1, x2, y2, conf, cls in dets:
+            cv2.rectangle(annotated, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+            cv2.putText(annotated, f"{label} {conf:.2f}", (int(x1), int(y1) - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return annotated
+
+
+class UnattendedTimer:
+    """The KadhaiSafetyTransformer timer rules, driven by caller timestamps.
+
+    ``now`` is in seconds and may be wall-clock time or a video timestamp.
+    ``update`` returns True on the one frame where the alert fires.
+    """
+
+    def __init__(self, duration=TIMER_DURATION):
+        self.duration = duration
+        self.reset()
+
+    def reset(self):
+        self.timer_started = False
+        self.start_time = None
+        self.warning_triggered = False
+        self.show_alert = False
+        self.time_remaining = self.duration
+
+    def update(self, kadhai_detected, person_detected, now):
+        if kadhai_detected and not person_detected:
+            if not self.timer_started:
+                self.start_time = now
+                self.timer_started = True
+                self.warning_triggered = False
+            else:
+                elapsed = now - self.start_time
+                self.time_remaining = max(0, self.duration - int(elapsed))
+                if elapsed >= self.duration and not self.warning_triggered:
+                    self.warning_triggered = True
+                    self.show_alert = True
+                    return True
+        else:
+            self.reset()
+        return False
+
+
+class MotionGate:
+    """Decides whether a frame needs fresh detections or can reuse the last ones.
+
+    Each frame is shrunk to ``GATE_SIZE`` grey, blurred, and compared with the
+    frame the detectors last ran on. ``changed`` is True when more than
+    ``changed_fraction`` of its pixels moved by over ``pixel_delta``, when
+    ``max_interval`` seconds have passed since the last run, or on the first
+    frame. Comparing against the last inference frame means slow drift adds
+    up until it triggers.
+    """
+
+    def __init__(self, max_interval=GATE_MAX_INTERVAL, changed_fraction=GATE_CHANGED_FRACTION,
+                 pixel_delta=GATE_PIXEL_DELTA):
+        self.max_interval = max_interval
+        self.changed_fraction = changed_fraction
+        self.pixel_delta = pixel_delta
+        self.frames = 0
+        self.skipped = 0
+        self._reference = None
+        self._last_run = None
+
+    def changed(self, img, now):
+        small = cv2.resize(img, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        self.frames += 1
+        run = (self._reference is None or self._last_run is None
+               or now - self._last_run >= self.max_interval
+               or np.mean(cv2.absdiff(small, self._reference) > self.pixel_delta) > self.changed_fraction)
+        if run:
+            self._reference = small
+            self._last_run = now
+        else:
+            self.skipped += 1
+        return run
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped,
+                "skipped_pct": round(100 * self.skipped / self.frames, 1) if self.frames else 0.0}
+
+
+class KadhaiMonitor:
+    """Detections, motion gate and unattended timer for one kitchen camera.
+
+    ``update(img, now)`` refreshes the detections (unless the gate says the
+    scene is unchanged) and advances the timer to ``now``. It returns True on
+    the frame where the alert fires. ``gated=False`` runs the detectors on
+    every frame. ``view`` sets the camera's inference size and regions of
+    interest.
+    """
+
+    def __init__(self, kadhai_model, person_model, duration=TIMER_DURATION, gated=True, metrics=None, view=None):
+        self.kadhai_model = kadhai_model
+        self.person_model = person_model
+        self.view = view
+        self.timer = UnattendedTimer(duration)
+        self.gate = MotionGate()
+        self.gated = gated
+        self.metrics = metrics
+        self.kadhai_dets = np.zeros((0, 6), dtype=np.float32)
+        self.person_dets = np.zeros((0, 6), dtype=np.float32)
+
+    def update(self, img, now):
+        stage = self.metrics.stage if self.metrics is not None else lambda name: nullcontext()
+        with stage("gate"):
+            run = not self.gated or self.gate.changed(img, now)
+        if run:
+            self.kadhai_dets, self.person_dets = detect(self.kadhai_model, self.person_model, img, self.metrics,
+                                                        self.view)
+        return self.timer.update(len(self.kadhai_dets) > 0, len(self.person_dets) > 0, now)
+
+    def draw(self, img):
+        return draw(img, self.kadhai_dets, self.person_dets)
+
+    def process(self, img, now):
+        """The Kadhai app's per-frame work: ``(annotated, fired)``."""
+        fired = self.update(img, now)
+        stage = self.metrics.stage if self.metrics is not None else lambda name: nullcontext()
+        with stage("annotate"):
+            annotated = self.draw(img)
+        return annotated, fired
+
+    def record_alert(self, frame, now, writer=None, events=None, camera="webcam", at=None, name=None):
+        """Snapshot ``frame`` through ``writer`` for the alert that fired at stream time ``now``; log it to ``events``.
+
+        ``at`` is the alert's Unix time (wall clock by default; a replay passes
+        the frame's own time), and the event starts when the kadhai was first
+        left unattended. Returns the snapshot path, or None if none was queued.
+        """
+        at = time.time() if at is None else at
+        name = name or f"flagged_{datetime.fromtimestamp(at).strftime('%Y%m%d_%H%M%S')}.jpg"
+        snapshot = os.path.join(writer.out_dir, name) if writer is not None and writer.submit(name, frame) else None
+        if events:
+            events.record(camera, "Unattended Kadhai", ts=at - (now - self.timer.start_time), end_ts=at,
+                          count=max(1, len(self.kadhai_dets)), app="kadhai", snapshot=snapshot)
+        return snapshot
@@ -0,0 +1,140 @@
+"""Run one app's detection logic over many live cameras at once.
+
+Usage:
+    python -m securevision.live zone rtsp://10.0.0.21/stream1 rtsp://10.0.0.22/stream1 --names dock gate
+    python -m securevision.live ppe lab_env.mp4 road_works.mp4 --loop --duration 60   # files as fake cameras
+
+Every camera is decoded on its own thread (``securevision.streams``). The
+detector takes whichever camera has a fresh frame next. Frames that arrive
+while it's busy are dropped rather than queued, so the reported ``age``
+(capture to result) stays bounded however many cameras are added. Each camera
+gets its own task state (zone cache, kadhai timer, violation episodes). All
+cameras share one copy of the models. Violation episodes are recorded per
+camera in the event store (``securevision.events``) unless
+``$SECUREVISION_EVENTS_DB`` is ``off``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+from securevision.cli import parse_weights
+from securevision.events import default_store
+from securevision.metrics import get_metrics, serve_metrics
+from securevision.models import load_model
+from securevision.roi import load_cameras
+from securevision.snapshots import SnapshotWriter, ViolationEpisodes
+from securevision.streams import StreamHub
+from securevision.tasks import TASKS
+
+REPORT_EVERY = 10.0   # seconds between per-camera stat lines
+
+
+def run(task_name, sources, names=None, loop=False, duration=None, weights=None,
+        snapshot_dir=None, report_every=REPORT_EVERY, events=None, cameras=None):
+    """Process ``sources`` until they end (or ``duration`` seconds pass); returns per-camera stats.
+
+    ``cameras`` maps camera names to ``roi.InferenceView``s (see ``roi.load_cameras``).
+    """
+    task_cls = TASKS[task_name]
+    models = {key: load_model(key, (weights or {}).get(key)) for key in task_cls.models}
+    metrics = get_metrics(f"live_{task_name}")
+    writer = SnapshotWriter(snapshot_dir, metrics=metrics) if snapshot_dir else None
+
+    hub = StreamHub(sources, names=names, loop=loop)
+    cams = {}
+    for stream in hub.streams:
+        cams[stream.name] = {
+            "task": task_cls(models, camera_id=stream.name, view=(cameras or {}).get(stream.name)),
+            "episodes": ViolationEpisodes(writer, prefix=f"{task_name}_{stream.name}", events=events,
+                                          camera=stream.name, app=task_name) if writer or events else None,
+            "processed": 0,
+            "violations": 0,
+        }
+
+    started = last_report = time.time()
+    hub.start()
+    try:
+        for stream, stamp, frame in hub:
+            cam = cams[stream.name]
+            t0 = time.perf_counter()
+            with metrics.stage(f"inference.{task_name}"):
+                counts, score = cam["task"].process(frame, stamp)
+            metrics.frame_done(t0)
+            metrics.observe("age", time.time() - stamp)   # capture → result, incl. waiting in the slot
+            cam["processed"] += 1
+            violations = {cls: n for cls, n in counts.items() if cam["task"].is_violation(cls)}
+            if cam["episodes"] and cam["episodes"].update(frame, score > 0, score=score, now=stamp,
+                                                          classes=violations):
+                cam["violations"] += 1
+                logging.info("%s: violation %s", stream.name, dict(counts))
+
+            now = time.time()
+            if now - last_report >= report_every:
+                last_report = now
+                for name, stats in hub.stats().items():
+                    logging.info("%s: processed %d, decoded %d, dropped %d, age %ss",
+                                 name, cams[name]["processed"], stats["decoded"], stats["dropped"], stats["age_s"])
+            if duration and now - started >= duration:
+                break
+    finally:
+        hub.stop()
+        for cam in cams.values():
+            if cam["episodes"]:
+                cam["episodes"].flush()
+        if writer:
+            writer.close()
+
+    elapsed = time.time() - started
+    stream_stats = hub.stats()
+    report = {"task": task_name, "seconds": round(elapsed, 1), "metrics": metrics.snapshot(), "cameras": {}}
+    for name, cam in cams.items():
+        report["cameras"][name] = {**stream_stats[name], "processed": cam["processed"],
+                                   "processed_fps": round(cam["processed"] / elapsed, 2) if elapsed else 0.0,
+                                   "violation_episodes": cam["violations"], **cam["task"].extra(),
+                                   "inference_view": cam["task"].view.stats()}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m securevision.live", description=__doc__.splitlines()[0])
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("sources", nargs="+", help="RTSP/HTTP URLs, device numbers or video files")
+    parser.add_argument("--names", nargs="+", help="Camera names, in source order")
+    parser.add_argument("--loop", action="store_true", help="Rewind video files at the end (fake cameras)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    parser.add_argument("--snapshots", help="Save one snapshot per violation episode per camera here")
+    parser.add_argument("--out", help="Write the final per-camera report to this JSON file")
+    parser.add_argument("--cameras", help="JSON of per-camera inference size / regions of interest, keyed by "
+                                          "camera name (default: $SECUREVISION_CAMERAS; see securevision.roi)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    serve_metrics()
+
+    if args.names and len(args.names) != len(args.sources):
+        parser.error("--names needs one name per source")
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    events = default_store()
+    report = run(args.task, sources, names=args.names, loop=args.loop, duration=args.duration,
+                 weights=parse_weights(args.weights), snapshot_dir=args.snapshots, events=events,
+                 cameras=load_cameras(args.cameras))
+    if events:
+        events.close()
+
+    for name, cam in report["cameras"].items():
+        print(f"{name}: {cam['processed']} processed ({cam['processed_fps']} fps) of {cam['decoded']} decoded, "
+              f"{cam['dropped']} dropped, {cam['violation_episodes']} violation episode(s)")
+    age = report["metrics"]["stages"].get("age", {})
+    print(f"capture → result age p50 {age.get('p50_ms', 0):.0f} ms, p95 {age.get('p95_ms', 0):.0f} ms")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Per-stage latency of the video processors, as rolling histograms.
+
+Each app has one ``StageMetrics`` (``get_metrics(app)``), shared by all of its
+streams. Code is timed with ``with metrics.stage("inference.person"):``, and
+each finished frame calls ``metrics.frame_done(started)``. Stage names follow
+``decode``, ``preprocess``, ``inference.<model>``, ``postprocess``, ``annotate``
+and ``io.<what>``. Each stage keeps its last ``window`` samples for quantiles,
+plus lifetime count and sum.
+
+``serve_metrics`` exposes every app in the process on ``/metrics`` (Prometheus
+text) and ``/metrics.json``. It listens on the port in
+``$SECUREVISION_METRICS_PORT``, or stays off if that is unset.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METRICS_WINDOW = 500      # samples kept per stage for quantiles / fps
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_PORT_ENV = "SECUREVISION_METRICS_PORT"
+STATS_COLOR = (255, 255, 255)
+
+
+class RollingHistogram:
+    """Last ``window`` samples of one stage, plus lifetime count and sum (seconds)."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.sum += seconds
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.samples:
+            return {q: 0.0 for q in qs}
+        values = np.percentile(np.fromiter(self.samples, float), [q * 100 for q in qs])
+        return dict(zip(qs, values.tolist()))
+
+
+class StageMetrics:
+    """Thread-safe rolling latency per stage, plus frame rate, for one app."""
+
+    def __init__(self, app, window=METRICS_WINDOW):
+        self.app = app
+        self.window = window
+        self.frames = 0
+        self._stages = {}
+        self._frame_times = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            hist = self._stages.get(name)
+            if hist is None:
+                hist = self._stages[name] = RollingHistogram(self.window)
+            hist.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed_iter(self, iterable, name="decode"):
+        """Yield from ``iterable``, timing each ``next()`` as stage ``name``."""
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - t0)
+            yield item
+
+    def frame_done(self, started=None):
+        """Count one finished frame; with its ``perf_counter`` start, also time it as ``total``."""
+        now = time.perf_counter()
+        if started is not None:
+            self.observe("total", now - started)
+        with self._lock:
+            self.frames += 1
+            self._frame_times.append(now)
+
+    def fps(self):
+        with self._lock:
+            times = list(self._frame_times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def snapshot(self):
+        """JSON-friendly dict: fps, frames and per-stage ms quantiles."""
+        with self._lock:
+            stages = {name: (hist.quantiles(), hist.count, hist.sum) for name, hist in self._stages.items()}
+        out = {"app": self.app, "fps": round(self.fps(), 2), "frames": self.frames, "stages": {}}
+        for name, (qs, count, total) in sorted(stages.items()):
+            out["stages"][name] = {
+                "count": count,
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                **{f"p{round(q * 100)}_ms": round(v * 1000, 3) for q, v in qs.items()},
+            }
+        return out
+
+    def prometheus(self):
+        """Prometheus text lines (no HELP/TYPE headers) for this app."""
+        lines = []
+        with self._lock:
+            stages = [(name, hist.quantiles(), hist.count, hist.sum) for name, hist in sorted(self._stages.items())]
+        for name, qs, count, total in stages:
+            labels = f'app="{self.app}",stage="{name}"'
+            for q, v in qs.items():
+                lines.append(f'securevision_stage_seconds{{{labels},quantile="{q}"}} {v:.6f}')
+            lines.append(f"securevision_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"securevision_stage_seconds_count{{{labels}}} {count}")
+        lines.append(f'securevision_fps{{app="{self.app}"}} {self.fps():.3f}')
+        lines.append(f'securevision_frames_total{{app="{self.app}"}} {self.frames}')
+        return lines
+
+    def overlay_text(self):
+        # medians of just the stages shown, so drawing it every frame stays cheap
+        with self._lock:
+            medians = {name: np.median(hist.samples) * 1000 if hist.samples else 0.0
+                       for name, hist in self._stages.items()
+                       if name == "total" or name.startswith("inference")}
+        total = medians.pop("total", 0.0)
+        return f"{self.fps():.1f} fps | frame p50 {total:.0f} ms | inference {sum(medians.values()):.0f} ms"
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_metrics(app):
+    """The process-wide ``StageMetrics`` for ``app``."""
+    with _registry_lock:
+        if app not in _registry:
+            _registry[app] = StageMetrics(app)
+        return _registry[app]
+
+
+def prometheus_text():
+    lines = [
+        "# HELP securevision_stage_seconds Per-frame stage latency, quantiles over a rolling window.",
+        "# TYPE securevision_stage_seconds summary",
+        "# HELP securevision_fps Frames per second over the rolling window.",
+        "# TYPE securevision_fps gauge",
+        "# HELP securevision_frames_total Frames processed.",
+        "# TYPE securevision_frames_total counter",
+    ]
+    with _registry_lock:
+        apps = list(_registry.values())
+    for metrics in apps:
+        lines.extend(metrics.prometheus())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_json():
+    with _registry_lock:
+        apps = list(_registry.values())
+    return {m.app: m.snapshot() for m in apps}
+
+
+def dump_json(path):
+    with open(path, "w") as f:
+        json.dump(metrics_json(), f, indent=2)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, ctype = prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, ctype = json.dumps(metrics_json()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def serve_metrics(port=None, host="0.0.0.0"):
+    """Start the metrics endpoint once per process, on a daemon thread.
+
+    Safe to call on every Streamlit rerun. Returns the server, or None if no
+    port is configured or it couldn't be bound.
+    """
+    global _server
+    port = port or os.environ.get(METRICS_PORT_ENV)
+    if not port:
+        return None
+    with _registry_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logger.warning("metrics endpoint not started on port %s: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info("serving metrics on http://%s:%s/metrics", host, port)
+    return _server
+
+
+def draw_stats(img, metrics, origin=None):
+    """Draw the FPS/latency line of ``metrics`` along the bottom-left of ``img``."""
+    x, y = origin or (10, img.shape[0] - 12)
+    text = metrics.overlay_text()
+    cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+    cv2.putText(img, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, STATS_COLOR, 1)
+    return img
@@ -0,0 +1,60 @@
+"""Where each app's weights live, so headless tools can load the same models."""
+
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WEIGHTS = {
+    "ppe": os.path.join(ROOT_DIR, "PPEStreamlitApp", "best.pt"),
+    "harness_person": os.path.join(ROOT_DIR, "HarnessStreamlitApp", "yolo11n.pt"),
+    "harness": os.path.join(ROOT_DIR, "HarnessStreamlitApp", "best.pt"),
+    "zone_person": os.path.join(ROOT_DIR, "SafetyRegion", "yolo11n.pt"),
+    "kadhai": os.path.join(ROOT_DIR, "StreamlitKitchenSafe", "best.pt"),
+    "kadhai_person": os.path.join(ROOT_DIR, "StreamlitKitchenSafe", "yolov8n.pt"),
+}
+
+_weights_ids = {}
+
+
+def weights_id(path):
+    """Content hash of a weights file (the path itself for non-files, e.g. ``yolo11n.yaml``).
+
+    Remembered per (path, size, mtime), so callers on every Streamlit rerun
+    don't re-read the whole file.
+    """
+    if not os.path.isfile(path):
+        return path
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _weights_ids:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _weights_ids[memo] = h.hexdigest()
+    return _weights_ids[memo]
+
+
+def load_model(key, path=None, backend=None):
+    """YOLO model for ``key`` (see ``WEIGHTS``), or from ``path`` if given.
+
+    When ``$SECUREVISION_MODEL_SERVER`` points at a running
+    ``securevision.serving`` socket (and no ``path`` is given), returns a
+    ``RemoteModel`` backed by the shared server instead. ``backend`` (default
+    ``$SECUREVISION_BACKEND``, else ``torch``) picks an exported CPU runtime;
+    see ``securevision.export``.
+    """
+    from securevision.export import BACKEND_ENV, load_exported
+    from securevision.serving import SERVER_ENV, RemoteModel, server_available
+
+    if path is None and os.environ.get(SERVER_ENV):
+        if server_available():
+            return RemoteModel(key)
+        logger.warning("model server %s not reachable; loading %s locally", os.environ[SERVER_ENV], key)
+
+    backend = backend or os.environ.get(BACKEND_ENV) or "torch"
+    return load_exported(path or WEIGHTS[key], backend)
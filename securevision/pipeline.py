@@ -0,0 +1,181 @@
+"""Overlapped decode → inference → annotate/encode pipeline for offline video.
+
+Decoding and encoding run on their own threads (OpenCV and PyTorch both
+release the GIL), so a long recording takes roughly as long as its slowest
+stage instead of the sum of all three. Stages are joined by bounded FIFO
+queues, which keeps frames in order and caps memory use.
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class StageStats:
+    """Frame count and busy time of one pipeline stage."""
+
+    def __init__(self, name, q=None):
+        self.name = name
+        self.queue = q
+        self.frames = 0
+        self.busy = 0.0
+
+    def add(self, seconds, frames=1):
+        self.frames += frames
+        self.busy += seconds
+
+    @property
+    def fps(self):
+        """Throughput of this stage alone (frames per busy second)."""
+        return self.frames / self.busy if self.busy else 0.0
+
+    @property
+    def depth(self):
+        """Frames waiting in this stage's input queue."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+
+class VideoPipeline:
+    """Run ``infer`` on every frame of ``cap`` while decode and encode overlap it.
+
+    ``infer(frames)`` runs on the calling thread, so it may share a model with
+    the rest of the app. It gets a list of up to ``batch_size`` consecutive
+    frames and returns one result per frame. ``sink(idx, frame, result)`` runs
+    on the encode thread in frame order; whatever it returns is kept in
+    ``latest`` for previews. Iterating the pipeline yields
+    ``(idx, frame, result)`` for every frame once its batch is inferred.
+    With a ``StageMetrics``, each frame's read is timed as ``decode``. With
+    ``indexed=True``, ``infer`` gets ``(idx, frame)`` pairs instead of bare
+    frames (e.g. for ``detcache.ClipDetections.detect``).
+    """
+
+    def __init__(self, cap, infer, sink, queue_size=8, batch_size=1, metrics=None, indexed=False):
+        self.cap = cap
+        self.indexed = indexed
+        self.metrics = metrics
+        self.infer = infer
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.decoded = queue.Queue(maxsize=max(queue_size, 2 * self.batch_size))
+        self.inferred = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "decode": StageStats("decode"),
+            "infer": StageStats("infer", self.decoded),
+            "encode": StageStats("encode", self.inferred),
+        }
+        self.latest = None
+        self.started = None
+        self._stop = threading.Event()
+        self._finished = False
+        self._error = None
+        self._threads = []
+
+    def __iter__(self):
+        self.started = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._decode, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._encode, name="pipeline-encode", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < self.batch_size:
+                    item = self._get(self.decoded)
+                    if item is _DONE or self._stop.is_set():
+                        done = True
+                        break
+                    batch.append(item)
+                if not batch:
+                    break
+
+                t0 = time.perf_counter()
+                results = self.infer(batch if self.indexed else [frame for _, frame in batch])
+                self.stats["infer"].add(time.perf_counter() - t0, len(batch))
+                for (idx, frame), result in zip(batch, results):
+                    self._put(self.inferred, (idx, frame, result))
+                    yield idx, frame, result
+            self._put(self.inferred, _DONE)
+            self._finished = not self._stop.is_set()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop all stages and wait for them; re-raises any stage error."""
+        if not self._finished:
+            self._stop.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def summary(self):
+        """Per-stage queue depth and throughput, plus overall wall-clock fps."""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        done = self.stats["encode"].frames
+        out = {name: {"queue": s.depth, "fps": round(s.fps, 1), "frames": s.frames}
+               for name, s in self.stats.items()}
+        out["overall_fps"] = round(done / elapsed, 1) if elapsed else 0.0
+        return out
+
+    # ── Stage threads ─────────────────────────────────────────────────────────
+    def _decode(self):
+        idx = 0
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                seconds = time.perf_counter() - t0
+                self.stats["decode"].add(seconds)
+                if self.metrics is not None:
+                    self.metrics.observe("decode", seconds)
+                idx += 1
+                self._put(self.decoded, (idx, frame))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(self.decoded, _DONE)
+
+    def _encode(self):
+        try:
+            while True:
+                item = self._get(self.inferred)
+                if item is _DONE:
+                    break
+                t0 = time.perf_counter()
+                self.latest = self.sink(*item)
+                self.stats["encode"].add(time.perf_counter() - t0)
+        except Exception as e:
+            self._fail(e)
+
+    # ── Queue helpers that give up once the pipeline is stopped ──────────────
+    def _put(self, q, item):
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    return
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _DONE
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
@@ -0,0 +1,210 @@
+"""PPE class names, per-worker compliance and the REQUIRED / VIOLATION overlay messages.
+
+``compliance_matrix`` assigns every PPE and "Without ..." box to the person
+box that contains it, in one vectorised pass. The result is a persons x
+``PPE_ITEMS`` matrix of ``WORN`` / ``MISSING`` / ``UNSEEN``, plus the
+violation boxes that fall outside every person. The VIOLATION overlay lines
+(``matrix_messages``), violation episodes (``matrix_violations``), worker
+tags and per-worker exports (``compliance_rows``) are read off those. Peak
+summaries and reports count every box per class (``class_counts``), so
+classes that belong to no worker still show up there.
+"""
+
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
+
+import numpy as np
+
+from securevision.annotate import render
+
+REQUIRED_LABELS = {
+    "Glasses": "🕶️ Wear safety glasses",
+    "Mask": "😷 Wear a mask",
+    "Vest": "🦺 Wear a safety vest",
+    "Safety Shoes": "🥾 Wear safety shoes",
+    "Helmet": "⛑️ Wear a helmet"
+}
+
+VIOLATION_LABELS = {
+    "Without Glass": "❌ No safety glasses",
+    "Without Mask": "❌ No mask",
+    "Without Vest": "❌ No safety vest",
+    "Without Safety Shoes": "❌ No safety shoes",
+    "Without Helmet": "❌ No helmet"
+}
+
+
+OPTIONAL_ITEMS = ("Ear Protection", "Gloves")   # tracked per worker, but not on the REQUIRED overlay
+PPE_ITEMS = (*REQUIRED_LABELS, *OPTIONAL_ITEMS)
+ITEM_VIOLATIONS = {
+    "Glasses": "Without Glass",
+    "Mask": "Without Mask",
+    "Vest": "Without Vest",
+    "Safety Shoes": "Without Safety Shoes",
+    "Helmet": "Without Helmet",
+    "Ear Protection": "Without Ear Protectors",   # the model has no "Without Gloves" class
+}
+PERSON_LABEL = "Person"
+WORN, UNSEEN, MISSING = 1, 0, -1
+MIN_CONTAINMENT = 0.5   # share of a PPE box that must lie inside a person box to belong to it
+COMPLIANCE_HEADER = ["time", "x1", "y1", "x2", "y2", *PPE_ITEMS]
+
+
+def is_violation(cls_name):
+    return "no-" in cls_name.lower() or "without" in cls_name.lower()
+
+
+def class_counts(dets, names):
+    """``Counter`` of class names over one frame's (N, 6) detections: every box, for peak summaries."""
+    return Counter(names[int(c)] for c in dets[:, 5])
+
+
+def update_peaks(peak_counts, frame_counts):
+    """Raise each class in ``peak_counts`` to its count in this frame if higher."""
+    for cls, cnt in frame_counts.items():
+        if cnt > peak_counts[cls]:
+            peak_counts[cls] = cnt
+
+
+def split_peaks(peak_counts, violation=is_violation):
+    """``(compliant, violations)`` dicts, largest first, as in the demo summary."""
+    ordered = Counter(peak_counts).most_common()
+    compliant = {k: v for k, v in ordered if not violation(k)}
+    violations = {k: v for k, v in ordered if violation(k)}
+    return compliant, violations
+
+
+@lru_cache(maxsize=8)
+def _class_tables(names):
+    # names: sorted (id, name) tuple -> per-class-id lookup arrays
+    size = max((cid for cid, _ in names), default=-1) + 1
+    is_person = np.zeros(size, dtype=bool)
+    item_of = np.full(size, -1, dtype=np.int64)
+    sign_of = np.zeros(size, dtype=np.int8)
+    violations = {v: k for k, v in ITEM_VIOLATIONS.items()}
+    for cid, name in names:
+        if name == PERSON_LABEL:
+            is_person[cid] = True
+        elif name in PPE_ITEMS:
+            item_of[cid], sign_of[cid] = PPE_ITEMS.index(name), WORN
+        elif name in violations:
+            item_of[cid], sign_of[cid] = PPE_ITEMS.index(violations[name]), MISSING
+    return is_person, item_of, sign_of
+
+
+def compliance(dets, names, min_containment=MIN_CONTAINMENT):
+    """Per-worker PPE status from one frame's (N, 6) detections.
+
+    Returns ``(persons, matrix, unassigned)``. ``persons`` holds the (P, 6)
+    person detections. ``matrix`` is a (P, len(PPE_ITEMS)) int8 array of
+    ``WORN``, ``MISSING`` or ``UNSEEN``. Each PPE/violation box goes to the
+    person box that covers most of it, if that's at least ``min_containment``
+    of its area; ties go to the higher IoU. A violation box outranks a worn
+    box for the same item. ``unassigned`` is a ``Counter`` of the violation
+    boxes outside every person by class (e.g. a "Without Helmet" head whose
+    body wasn't detected); worn boxes outside every person are ignored.
+    """
+    is_person, item_of, sign_of = _class_tables(tuple(sorted((int(k), v) for k, v in names.items())))
+    cls = dets[:, 5].astype(np.int64)
+    persons = dets[is_person[cls]]
+    ppe_mask = item_of[cls] >= 0
+    ppe, ppe_cls = dets[ppe_mask], cls[ppe_mask]
+    matrix = np.zeros((len(persons), len(PPE_ITEMS)), dtype=np.int8)
+    if len(persons) == 0 or len(ppe) == 0:
+        return persons, matrix, Counter(names[int(c)] for c in ppe_cls[sign_of[ppe_cls] == MISSING])
+
+    tl = np.maximum(ppe[:, None, :2], persons[None, :, :2])
+    br = np.minimum(ppe[:, None, 2:4], persons[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)                     # (B, P)
+    area_ppe = np.prod(ppe[:, 2:4] - ppe[:, :2], axis=1)
+    area_person = np.prod(persons[:, 2:4] - persons[:, :2], axis=1)
+    containment = inter / (area_ppe[:, None] + 1e-9)
+    iou = inter / (area_ppe[:, None] + area_person[None, :] - inter + 1e-9)
+
+    owner = np.argmax(containment + 1e-3 * iou, axis=1)
+    kept = containment[np.arange(len(ppe)), owner] >= min_containment
+    stray = ppe_cls[~kept]
+    unassigned = Counter(names[int(c)] for c in stray[sign_of[stray] == MISSING])
+    owner, item, sign = owner[kept], item_of[ppe_cls[kept]], sign_of[ppe_cls[kept]]
+    worn = sign == WORN
+    matrix[owner[worn], item[worn]] = WORN
+    matrix[owner[~worn], item[~worn]] = MISSING
+    return persons, matrix, unassigned
+
+
+def compliance_matrix(dets, names, min_containment=MIN_CONTAINMENT):
+    """``(persons, matrix)`` of ``compliance``."""
+    persons, matrix, _ = compliance(dets, names, min_containment)
+    return persons, matrix
+
+
+def matrix_violations(matrix, unassigned=None):
+    """``{violation class: count}`` for one frame: workers without each item plus ``unassigned`` boxes."""
+    found = Counter(unassigned or {})
+    for i, item in enumerate(PPE_ITEMS):
+        n = int((matrix[:, i] == MISSING).sum())
+        if n:
+            found[ITEM_VIOLATIONS[item]] += n
+    return dict(found)
+
+
+def matrix_messages(matrix, detected_classes, unassigned=None):
+    """The PPE overlay for one frame.
+
+    With anyone in view: a REQUIRED line per required item missing from
+    ``detected_classes`` (the class names seen in the frame), then a
+    VIOLATION line per class a worker is seen without or that is in
+    ``unassigned``.
+    """
+    if len(matrix) == 0:
+        return []
+    found = matrix_violations(matrix, unassigned)
+    messages = [message for label, message in REQUIRED_LABELS.items() if label not in detected_classes]
+    messages += [message for label, message in VIOLATION_LABELS.items() if label in found]
+    return messages
+
+
+def violators(matrix, unassigned=None):
+    """Number of workers seen without at least one item, plus the ``unassigned`` violation boxes."""
+    return int((matrix == MISSING).any(axis=1).sum()) + sum((unassigned or {}).values())
+
+
+def worker_tags(persons, matrix):
+    """``(boxes, tags)`` for ``annotate.render``: each worker's missing items in red, or "PPE ok" in green."""
+    tags = []
+    for row in matrix:
+        missing = [item for item, s in zip(PPE_ITEMS, row) if s == MISSING]
+        if missing:
+            tags.append(("no " + ", ".join(missing), (0, 0, 255)))
+        elif (row == WORN).any():
+            tags.append(("PPE ok", (0, 200, 0)))
+        else:
+            tags.append(("", None))
+    return persons[:, :4], tags
+
+
+def check_frame(img, dets, names, metrics=None):
+    """The PPE app's per-frame work once ``dets`` are known: ``(annotated, missing)``.
+
+    ``annotated`` has the boxes, per-worker tags and REQUIRED/VIOLATION
+    overlay. ``missing`` is ``matrix_violations``, so violation episodes
+    match the VIOLATION lines on screen.
+    """
+    stage = metrics.stage if metrics is not None else lambda name: nullcontext()
+    with stage("postprocess"):
+        # persons x PPE items: which worker is missing what
+        persons, matrix, unassigned = compliance(dets, names)
+        messages = matrix_messages(matrix, class_counts(dets, names), unassigned)
+        missing = matrix_violations(matrix, unassigned)
+    # boxes, per-worker tags + REQUIRED/VIOLATION overlay, without results.plot()
+    with stage("annotate"):
+        annotated = render(img, dets, names, messages=messages, tags=worker_tags(persons, matrix))
+    return annotated, missing
+
+
+def compliance_rows(t, persons, matrix):
+    """One export row per worker: time, box and ``worn`` / ``missing`` / ``unseen`` per item."""
+    status = {WORN: "worn", MISSING: "missing", UNSEEN: "unseen"}
+    return [[round(t, 3), *(int(v) for v in box[:4]), *(status[int(s)] for s in row)]
+            for box, row in zip(persons, matrix)]
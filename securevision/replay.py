@@ -0,0 +1,146 @@
+"""Audit a recorded kitchen shift faster than real time.
+
+Usage:
+    python -m securevision.replay shift.mp4 --per-second 2
+    python -m securevision.replay shift.mp4 --start 2025-06-01T08:00:00 --snapshots flagged_frames --out shift.json
+
+The recording is run through the same ``kadhai.KadhaiMonitor`` as the live
+app. The unattended timer follows each frame's presentation timestamp, so
+alerts fire at the same point of the shift as they would have live, however
+fast the replay runs. Frames are decoded as fast as the CPU allows; with
+``--per-second`` (or ``--every``), skipped frames are never converted (see
+``securevision.video``). Each alert goes through the same
+``KadhaiMonitor.record_alert`` as the live path: the annotated frame is
+saved, and the alert is recorded in the event store (``$SECUREVISION_EVENTS_DB``,
+camera = the recording's name). Both are stamped with the frame's time: with
+``--start`` (the wall-clock time the recording began) that is a real time;
+otherwise it is the offset into the recording.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import cv2
+
+from securevision import kadhai
+from securevision.cli import parse_weights, positive_float, positive_int
+from securevision.events import default_store
+from securevision.models import load_model
+from securevision.snapshots import SnapshotWriter
+from securevision.tasks import frame_time
+from securevision.video import iter_frames, iter_sampled
+
+logger = logging.getLogger(__name__)
+
+
+def pts_seconds(cap, idx, fps):
+    """Presentation time of the frame just read, from the container; frame index / FPS if it has none."""
+    msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+    return msec / 1000 if msec > 0 or idx == 1 else frame_time(idx, fps)
+
+
+def clock(t, start=None):
+    """``t`` seconds into the recording, as wall-clock time when ``start`` is known."""
+    if start is not None:
+        return (start + timedelta(seconds=t)).strftime("%Y-%m-%d %H:%M:%S")
+    return str(timedelta(seconds=int(t)))
+
+
+def run(path, models, per_second=None, every=1, duration=kadhai.TIMER_DURATION, gated=True,
+        snapshot_dir=None, start=None, events=None):
+    """Replay one recording; returns the report dict (alerts, timing and speed-up over real time).
+
+    Alerts are also recorded in ``events`` (an ``events.EventStore``) when given.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"could not open {path}")
+    fps = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+    frames = iter_sampled(cap, per_second, fps) if per_second else iter_frames(cap, every)
+    monitor = kadhai.KadhaiMonitor(models["kadhai"], models["kadhai_person"], duration, gated=gated)
+    writer = SnapshotWriter(snapshot_dir) if snapshot_dir else None
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    alerts = []
+    analysed = 0
+    t = 0.0
+    started = time.perf_counter()
+    try:
+        for idx, frame in frames:
+            t = pts_seconds(cap, idx, fps)
+            analysed += 1
+            if not monitor.update(frame, t):
+                continue
+            since = monitor.timer.start_time
+            alert = {"time": round(t, 2), "unattended_since": round(since, 2),
+                     "at": clock(t, start), "since": clock(since, start)}
+            when = (start + timedelta(seconds=t)).strftime("%Y%m%d_%H%M%S") if start else f"{stem}_{int(t):06d}s"
+            snapshot = monitor.record_alert(monitor.draw(frame) if writer else None, t, writer, events, camera=stem,
+                                            at=start.timestamp() + t if start else t, name=f"flagged_{when}.jpg")
+            if snapshot:
+                alert["snapshot"] = snapshot
+            alerts.append(alert)
+            logger.info("%s: kadhai unattended since %s", alert["at"], alert["since"])
+    finally:
+        cap.release()
+        if writer:
+            writer.close()
+    seconds = time.perf_counter() - started
+
+    return {
+        "video": path,
+        "analysed": analysed,
+        "duration": round(t, 2),
+        "seconds": round(seconds, 2),
+        "speed_up": round(t / seconds, 1) if seconds else 0.0,
+        "alerts": alerts,
+        "motion_gate": monitor.gate.stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m securevision.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("video")
+    parser.add_argument("--per-second", type=positive_float, help="Analyse N frames per second of video")
+    parser.add_argument("--every", type=positive_int, default=1, help="Analyse every N-th frame instead")
+    parser.add_argument("--timer", type=float, default=kadhai.TIMER_DURATION,
+                        help="Unattended seconds before an alert (default: %(default)s)")
+    parser.add_argument("--no-gate", action="store_true", help="Run the detectors on every analysed frame")
+    parser.add_argument("--start", type=datetime.fromisoformat,
+                        help="Wall-clock time the recording started, e.g. 2025-06-01T08:00:00")
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. kadhai=/models/kadhai.pt (repeatable)")
+    parser.add_argument("--snapshots", help="Save the annotated frame of every alert here")
+    parser.add_argument("--out", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    weights = parse_weights(args.weights)
+    models = {key: load_model(key, weights.get(key)) for key in ("kadhai", "kadhai_person")}
+    events = default_store()
+    try:
+        report = run(args.video, models, per_second=args.per_second, every=args.every, duration=args.timer,
+                     gated=not args.no_gate, snapshot_dir=args.snapshots, start=args.start, events=events)
+    finally:
+        if events:
+            events.close()
+
+    print(f"{report['video']}: {timedelta(seconds=int(report['duration']))} of video in {report['seconds']}s "
+          f"({report['speed_up']}x real time), {report['analysed']} frames analysed, "
+          f"{report['motion_gate']['skipped_pct']}% skipped by the motion gate")
+    for alert in report["alerts"]:
+        print(f"  ALERT {alert['at']}: kadhai unattended since {alert['since']}")
+    if not report["alerts"]:
+        print("  no unattended-kadhai alerts")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Per-camera inference size and regions of interest.
+
+A 4K frame handed to YOLO is still letterboxed down to ``imgsz``. That spends
+the input resolution on pixels where nothing relevant can happen (sky, walls,
+the far side of the floor), and small workers shrink to a few pixels.
+``InferenceView`` holds one camera's settings. ``view.detect(model, frame)``
+crops the frame to the bounding boxes of its ROIs, padded by ``pad`` with
+overlapping ones merged. It runs the model on all the crops in one call and
+returns ``(N, 6)`` detections in full-frame coordinates. A crop smaller than
+``imgsz`` is run at its own size (rounded up to the stride) rather than
+upscaled. With no ROIs, the whole frame is run at ``imgsz``; left unset, that
+is the size the weights were trained at, as before.
+
+ROIs are polygons (or ``[x1, y1, x2, y2]`` boxes) in frame pixels. With
+``zone_roi``, the zone app uses the detected green zone instead, grown by
+``pad``, so only people near the zone are detected. Cameras are configured in
+a JSON file (``--cameras`` or ``$SECUREVISION_CAMERAS``):
+
+    {
+      "dock": {"imgsz": 960, "rois": [[[0, 400], [3839, 400], [3839, 2159], [0, 2159]]]},
+      "gate": {"zone_roi": true, "pad": 96}
+    }
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+from securevision.annotate import as_array
+
+logger = logging.getLogger(__name__)
+
+CAMERAS_ENV = "SECUREVISION_CAMERAS"
+DEFAULT_IMGSZ = 640
+ROI_PAD = 32      # px added around each ROI, so people on its edge aren't cut in half
+STRIDE = 32       # YOLO input sizes are multiples of this
+
+
+def fit_imgsz(shape, imgsz=DEFAULT_IMGSZ):
+    """``imgsz``, or less if the image is smaller (never upscale), as a multiple of ``STRIDE``."""
+    side = max(shape[:2])
+    return max(STRIDE, min(imgsz, math.ceil(side / STRIDE) * STRIDE))
+
+
+def roi_box(roi):
+    """xyxy bounding box of a polygon (K, 2) or a box [x1, y1, x2, y2]."""
+    pts = np.asarray(roi, dtype=np.float32)
+    if pts.ndim == 1:
+        pts = pts.reshape(2, 2)
+    return np.concatenate([pts.min(axis=0), pts.max(axis=0)])
+
+
+def merge_boxes(boxes):
+    """Union-merge overlapping xyxy boxes until none overlap."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+class InferenceView:
+    """Where (``rois``) and at what size (``imgsz``) one camera's frames are inferred.
+
+    ``stats()`` reports the share of frame pixels actually sent to the model.
+    """
+
+    def __init__(self, imgsz=None, rois=(), pad=ROI_PAD, zone_roi=False):
+        self.imgsz = int(imgsz) if imgsz else None
+        self.rois = [np.asarray(r, dtype=np.float32) for r in rois]
+        self.pad = int(pad)
+        self.zone_roi = zone_roi
+        self.frames = 0
+        self.pixels = 0
+        self.inferred_pixels = 0
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(imgsz=cfg.get("imgsz"), rois=cfg.get("rois", ()),
+                   pad=cfg.get("pad", ROI_PAD), zone_roi=cfg.get("zone_roi", False))
+
+    def set_zone(self, pts):
+        """Use a detected zone polygon as the only ROI (when ``zone_roi``); None clears it."""
+        if self.zone_roi:
+            self.rois = [] if pts is None else [np.asarray(pts, dtype=np.float32)]
+
+    def regions(self, shape):
+        """Padded, merged, in-frame xyxy int boxes of the ROIs; the whole frame if there are none."""
+        h, w = shape[:2]
+        if not self.rois:
+            return [(0, 0, w, h)]
+        boxes = []
+        for roi in self.rois:
+            x1, y1, x2, y2 = roi_box(roi) + (-self.pad, -self.pad, self.pad, self.pad)
+            x1, y1 = max(0, int(x1)), max(0, int(y1))
+            x2, y2 = min(w, int(math.ceil(x2))), min(h, int(math.ceil(y2)))
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+        return [tuple(b) for b in merge_boxes(boxes)]
+
+    def detect(self, model, frame, **kwargs):
+        """(N, 6) ``x1, y1, x2, y2, conf, cls`` detections of ``model`` over the ROIs, in frame coordinates."""
+        kwargs.setdefault("verbose", False)
+        if self.imgsz:
+            kwargs.setdefault("imgsz", self.imgsz)
+        regions = self.regions(frame.shape)
+        self.frames += 1
+        self.pixels += frame.shape[0] * frame.shape[1]
+        self.inferred_pixels += sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if not self.rois:
+            return as_array(model(frame, **kwargs)[0])
+        if not regions:
+            return np.zeros((0, 6), dtype=np.float32)
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        kwargs["imgsz"] = max(fit_imgsz(c.shape, self.imgsz or DEFAULT_IMGSZ) for c in crops)
+        results = model(crops, **kwargs)
+        dets = []
+        for (x1, y1, _, _), r in zip(regions, results):
+            d = as_array(r)
+            d[:, :4] += (x1, y1, x1, y1)
+            dets.append(d)
+        return np.concatenate(dets)
+
+    def stats(self):
+        return {"imgsz": self.imgsz, "rois": len(self.rois),
+                "inferred_pct": round(100 * self.inferred_pixels / self.pixels, 1) if self.pixels else 100.0}
+
+
+def load_cameras(path=None):
+    """``{camera name: InferenceView}`` from a JSON config (``$SECUREVISION_CAMERAS`` by default); {} if none."""
+    path = path or os.environ.get(CAMERAS_ENV)
+    if not path:
+        return {}
+    with open(path) as f:
+        config = json.load(f)
+    logger.info("inference views for %d camera(s) from %s", len(config), path)
+    return {name: InferenceView.from_config(cfg) for name, cfg in config.items()}
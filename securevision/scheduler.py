@@ -0,0 +1,164 @@
+"""Cross-session micro-batching for the webrtc apps.
+
+With ``async_processing=True`` every browser session runs ``transform()`` on
+its own thread, and each one calls the shared model separately. That gives
+one forward pass per frame per session, with all of them competing for the
+same cores, and a YOLO predictor isn't thread-safe anyway. An
+``InferenceScheduler`` owns a single inference thread instead. Sessions call
+a ``ScheduledModel`` exactly like the model, and the call blocks until its
+results are ready. The worker collects frames from every session for up to
+``max_wait_ms`` (or until ``max_batch`` frames are queued) and runs them as
+one batch.
+
+``max_wait_ms`` is the latency/throughput knob. At 0, a frame only batches
+with whatever is already queued, which is lowest latency. Larger windows
+build bigger batches, so there are fewer passes per frame, at the cost of up
+to that much extra latency. Calls are only batched together if they are for
+the same model with the same keyword arguments. Since only the worker runs
+inference, the torch thread budget (``threads``, default
+``$SECUREVISION_TORCH_THREADS`` or every core) is the whole process's
+inference budget, however many sessions are open.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+THREADS_ENV = "SECUREVISION_TORCH_THREADS"
+SCHED_MAX_BATCH = 8       # frames per forward pass
+SCHED_MAX_WAIT_MS = 10.0  # how long the first queued frame may wait for company
+
+
+class _Request:
+    __slots__ = ("model", "images", "kwargs", "key", "submitted", "done", "results", "error")
+
+    def __init__(self, model, images, kwargs):
+        self.model = model
+        self.images = images
+        self.kwargs = kwargs
+        self.key = (id(model), repr(sorted(kwargs.items())))
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class InferenceScheduler:
+    """One inference thread that batches calls from every session.
+
+    ``wrap(model, name)`` returns a drop-in ``ScheduledModel``. When
+    ``metrics`` is given, the time each call spends queued is recorded as
+    ``queue.<name>`` and each batched pass as ``batch.<name>``.
+    """
+
+    def __init__(self, max_batch=SCHED_MAX_BATCH, max_wait_ms=SCHED_MAX_WAIT_MS, threads=None, metrics=None):
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.threads = threads or int(os.environ.get(THREADS_ENV) or 0) or os.cpu_count() or 1
+        self.metrics = metrics
+        self.batches = 0
+        self.frames = 0
+        self._names = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def wrap(self, model, name=None):
+        self._names[id(model)] = name or "model"
+        return ScheduledModel(self, model)
+
+    def submit(self, model, images, kwargs):
+        """Queue ``images`` for ``model``, wait for the batch and return their results."""
+        request = _Request(model, images, kwargs)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self._thread.start()
+            self._queue.append(request)
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def stats(self):
+        return {"batches": self.batches, "frames": self.frames,
+                "mean_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "max_wait_ms": self.max_wait_ms, "threads": self.threads}
+
+    def _queued(self, key):
+        return sum(len(r.images) for r in self._queue if r.key == key)
+
+    def _next_batch(self):
+        """Oldest request plus every queued one it can share a pass with, once its window closes."""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            first = self._queue[0]
+            deadline = first.submitted + self.max_wait_ms / 1000
+            while self._queued(first.key) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, size = [], 0
+            for request in list(self._queue):
+                if request.key != first.key:
+                    continue
+                if batch and size + len(request.images) > self.max_batch:
+                    break
+                self._queue.remove(request)
+                batch.append(request)
+                size += len(request.images)
+            return batch
+
+    def _run(self):
+        torch = sys.modules.get("torch")   # remote / exported models never import it
+        if torch is not None:
+            torch.set_num_threads(self.threads)
+        while True:
+            batch = self._next_batch()
+            first = batch[0]
+            name = self._names.get(id(first.model), "model")
+            started = time.perf_counter()
+            images = [img for r in batch for img in r.images]
+            try:
+                results = first.model(images, **first.kwargs)
+            except Exception as e:
+                logger.exception("batched %s inference failed", name)
+                for r in batch:
+                    r.error = e
+                    r.done.set()
+                continue
+            if self.metrics:
+                self.metrics.observe(f"batch.{name}", time.perf_counter() - started)
+                for r in batch:
+                    self.metrics.observe(f"queue.{name}", started - r.submitted)
+            self.batches += 1
+            self.frames += len(images)
+            i = 0
+            for r in batch:
+                r.results = results[i:i + len(r.images)]
+                i += len(r.images)
+                r.done.set()
+
+
+class ScheduledModel:
+    """Stand-in for a ``YOLO`` model that routes calls through an ``InferenceScheduler``."""
+
+    def __init__(self, scheduler, model):
+        self.scheduler = scheduler
+        self.model = model
+        self.names = model.names
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        kwargs.setdefault("verbose", False)
+        return self.scheduler.submit(self.model, images, kwargs)
+
+    predict = __call__
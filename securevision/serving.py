@@ -0,0 +1,216 @@
+"""Optional local model server shared by all four apps.
+
+Without it every Streamlit process loads and warms up its own copy of each
+model. Start one server per machine instead:
+
+    python -m securevision.serving                      # every model in WEIGHTS
+    python -m securevision.serving --keys ppe harness harness_person
+
+Then run the apps with ``SECUREVISION_MODEL_SERVER`` set to the socket path
+(``securevision.models.load_model`` returns a ``RemoteModel`` then). Frames go
+over a Unix socket as pickled arrays; only the (N, 6) detections come back.
+The client wraps them in numpy-only stand-ins for ``Results``/``Boxes``, so the
+app code needs no changes and app processes never import torch. Weights
+shared by several keys are loaded once: the two ``yolo11n.pt`` copies, for
+example.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SERVER_ENV = "SECUREVISION_MODEL_SERVER"
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "securevision-models.sock")
+WARMUP_SHAPE = (640, 640, 3)
+
+
+class ModelServer:
+    """Loads each model once, warms it up and answers predict requests on ``address``.
+
+    Every client connection gets a thread; a lock per model serialises
+    inference, as a YOLO predictor isn't thread-safe.
+    """
+
+    def __init__(self, weights, address=DEFAULT_SOCKET):
+        from securevision.models import load_model, weights_id
+
+        self.address = address
+        self.models = {}
+        self.locks = {}
+        loaded = {}
+        for key, path in weights.items():
+            wid = weights_id(path)
+            if wid not in loaded:
+                model = load_model(key, path)
+                model(np.zeros(WARMUP_SHAPE, dtype=np.uint8), verbose=False)
+                loaded[wid] = (model, threading.Lock())
+                logger.info("loaded %s from %s", key, path)
+            self.models[key], self.locks[key] = loaded[wid]
+        self.unique = len(loaded)
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        # owner-only from the moment it's bound: a chmod afterwards leaves a window to connect
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX")
+        finally:
+            os.umask(umask)
+        with listener:
+            logger.info("serving %s on %s", ", ".join(self.models), self.address)
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send(("ok", self._answer(request)))
+                except Exception as e:
+                    conn.send(("error", repr(e)))
+
+    def _answer(self, request):
+        op, key = request["op"], request.get("key")
+        if op == "ping":
+            return sorted(self.models)
+        model = self.models[key]
+        if op == "names":
+            return dict(model.names)
+        if op == "predict":
+            with self.locks[key]:
+                results = model(request["images"], **request["kwargs"])
+            return [r.boxes.data.cpu().numpy() for r in results]
+        raise ValueError(f"unknown op {op!r}")
+
+
+class HostArray(np.ndarray):
+    """ndarray with the tensor ``.cpu()`` / ``.numpy()`` calls the apps make on boxes."""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+
+class RemoteBoxes:
+    """The ``Boxes`` attributes the apps read, over an (N, 6) detections array."""
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6).view(HostArray)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+
+class RemoteResults:
+    def __init__(self, orig_img, names, data):
+        self.orig_img = orig_img
+        self.names = names
+        self.boxes = RemoteBoxes(data)
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class RemoteModel:
+    """Client shim with the parts of the ``YOLO`` API the apps use.
+
+    ``model(img_or_list, **kwargs)`` and ``model.predict(...)`` return a list
+    of ``RemoteResults``, and ``model.names`` matches the served model.
+    Each thread gets its own connection, so webrtc streams don't queue behind
+    each other on the socket.
+    """
+
+    def __init__(self, key, address=None):
+        self.key = key
+        self.address = address or os.environ.get(SERVER_ENV) or DEFAULT_SOCKET
+        self._local = threading.local()
+        self.names = self._request({"op": "names", "key": key})
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family="AF_UNIX")
+        return conn
+
+    def _request(self, request):
+        conn = self._conn()
+        conn.send(request)
+        status, payload = conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"model server: {payload}")
+        return payload
+
+    def __call__(self, source, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        kwargs["verbose"] = False
+        detections = self._request({"op": "predict", "key": self.key, "images": images, "kwargs": kwargs})
+        return [RemoteResults(img, self.names, data) for img, data in zip(images, detections)]
+
+    predict = __call__
+
+
+def server_available(address=None):
+    address = address or os.environ.get(SERVER_ENV)
+    if not address or not os.path.exists(address):
+        return False
+    try:
+        with Client(address, family="AF_UNIX") as conn:
+            conn.send({"op": "ping"})
+            return conn.recv()[0] == "ok"
+    except OSError:
+        return False
+
+
+def main(argv=None):
+    from securevision.models import WEIGHTS
+
+    parser = argparse.ArgumentParser(prog="python -m securevision.serving", description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", nargs="+", choices=sorted(WEIGHTS), default=sorted(WEIGHTS))
+    parser.add_argument("--socket", default=os.environ.get(SERVER_ENV) or DEFAULT_SOCKET)
+    parser.add_argument("--weights", action="append", metavar="KEY=PATH",
+                        help="Override model weights, e.g. ppe=/models/best.pt (repeatable)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    overrides = dict(item.partition("=")[::2] for item in args.weights or [])
+    weights = {key: overrides.get(key, WEIGHTS[key]) for key in args.keys}
+    server = ModelServer(weights, args.socket)
+    logger.info("%d key(s) backed by %d loaded model(s)", len(weights), server.unique)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
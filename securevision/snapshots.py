@@ -0,0 +1,160 @@
+"""Background writer for violation snapshots.
+
+``cv2.imwrite`` used to run inside ``transform()``, and the harness app wrote
+a JPEG on every flagged frame. Here, frames go into a bounded queue that a
+small pool of threads drains, so a slow disk never stalls frame processing.
+``ViolationEpisodes`` groups consecutive flagged frames into a single
+episode and saves only the best frame from each one. With an
+``events.EventStore``, each episode is also recorded there, linked to its
+snapshot.
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+SNAPSHOT_COOLDOWN = 3.0   # seconds without a flagged frame that close an episode
+MAX_EPISODE = 60.0        # long violations still get a snapshot at least this often
+SNAPSHOT_WORKERS = 2
+SNAPSHOT_QUEUE = 32
+JPEG_QUALITY = 90
+
+
+class SnapshotWriter:
+    """Thread pool that writes JPEGs from a bounded queue.
+
+    ``submit`` never blocks: if the queue is full the snapshot is dropped and
+    counted in ``dropped``. One writer can be shared by every session of an
+    app (wrap it in ``st.cache_resource``). With a ``StageMetrics``, each
+    write is timed as ``io.imwrite``.
+    """
+
+    def __init__(self, out_dir, workers=SNAPSHOT_WORKERS, queue_size=SNAPSHOT_QUEUE,
+                 quality=JPEG_QUALITY, metrics=None):
+        self.out_dir = out_dir
+        self.quality = quality
+        self.metrics = metrics
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = [
+            threading.Thread(target=self._work, name=f"snapshot-writer-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        os.makedirs(out_dir, exist_ok=True)
+        for t in self._threads:
+            t.start()
+
+    def submit(self, name, frame):
+        """Queue ``frame`` to be saved as ``out_dir/name``; returns False if dropped."""
+        try:
+            self._queue.put_nowait((os.path.join(self.out_dir, name), frame))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """Write everything still queued, then stop the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, frame = item
+            t0 = time.perf_counter()
+            if cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+                self.written += 1
+            if self.metrics is not None:
+                self.metrics.observe("io.imwrite", time.perf_counter() - t0)
+
+
+class ViolationEpisodes:
+    """Turn a stream of flagged frames into one snapshot per violation episode.
+
+    Call ``update`` once per processed frame. A flagged frame opens an episode,
+    or extends the open one. The episode closes when ``cooldown`` seconds pass
+    with no flagged frame. Its highest-scoring frame is then sent to the
+    writer. Episodes longer than ``max_duration`` are split. ``now`` defaults
+    to wall-clock time; offline callers can pass the video timestamp instead.
+
+    With ``events``, a closed episode adds one row per violating class to the
+    store: ``classes`` maps class name to count on each flagged frame (``label``
+    is used when it's not given), and the row keeps the peak count. ``writer``
+    may be None to record events without snapshots.
+    """
+
+    def __init__(self, writer, prefix="flagged", cooldown=SNAPSHOT_COOLDOWN,
+                 max_duration=MAX_EPISODE, events=None, camera="default", app="", label="violation"):
+        self.writer = writer
+        self.prefix = prefix
+        self.cooldown = cooldown
+        self.max_duration = max_duration
+        self.events = events
+        self.camera = camera
+        self.app = app
+        self.label = label
+        self.episodes = 0
+        self._start = None
+        self._last = None
+        self._best = None
+        self._best_score = None
+        self._classes = {}
+
+    @property
+    def active(self):
+        return self._start is not None
+
+    def update(self, frame, flagged, score=1.0, now=None, classes=None):
+        """Record one frame; returns True when it opens a new episode."""
+        now = time.time() if now is None else now
+        opened = False
+
+        if self.active and (now < self._last
+                            or now - self._last > self.cooldown
+                            or now - self._start > self.max_duration):
+            self.flush()
+
+        if flagged:
+            if not self.active:
+                self._start = now
+                self.episodes += 1
+                opened = True
+            self._last = now
+            if self._best_score is None or score > self._best_score:
+                if self.writer is not None:
+                    self._best = frame.copy()
+                self._best_score = score
+            for cls, n in (classes or {self.label: 1}).items():
+                if n > 0:
+                    self._classes[cls] = max(n, self._classes.get(cls, 0))
+        return opened
+
+    def flush(self):
+        """Close the open episode (if any), queue its best frame and record its events."""
+        if not self.active:
+            return
+        snapshot = None
+        if self.writer is not None:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            name = f"{self.prefix}_{stamp}_ep{self.episodes}.jpg"
+            if self.writer.submit(name, self._best):
+                snapshot = os.path.join(self.writer.out_dir, name)
+        if self.events is not None:
+            for cls, n in self._classes.items():
+                self.events.record(self.camera, cls, ts=self._start, end_ts=self._last, count=n,
+                                   score=self._best_score, app=self.app, snapshot=snapshot)
+        self._start = self._last = self._best = self._best_score = None
+        self._classes = {}
@@ -0,0 +1,177 @@
+"""Ingest many RTSP cameras (or video files) with latest-frame semantics.
+
+Each ``CameraStream`` decodes its source on its own thread into a one-frame
+slot. A new frame overwrites one the detector hasn't taken yet, and the
+overwrite is counted in ``dropped``. So a detector slower than the cameras
+always sees the freshest picture, and latency never builds up in a queue.
+``StreamHub`` watches all the slots and hands out whichever streams have a
+frame the caller hasn't seen yet.
+
+Local files stand in for cameras: they're paced at their own FPS and, with
+``loop=True``, rewound at the end. RTSP sources reconnect after a drop.
+"""
+
+import logging
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 2.0   # seconds before reopening a dropped stream
+
+
+def is_live(source):
+    return isinstance(source, int) or str(source).lower().startswith(("rtsp://", "rtsps://", "http://", "https://"))
+
+
+class CameraStream:
+    """One source decoded on a background thread into a latest-frame slot."""
+
+    def __init__(self, source, name=None, loop=False, realtime=None,
+                 reconnect_delay=RECONNECT_DELAY, on_frame=None):
+        self.source = source
+        self.name = name or str(source)
+        self.loop = loop
+        # files are paced to their FPS unless told otherwise; cameras pace themselves
+        self.realtime = (not is_live(source)) if realtime is None else realtime
+        self.reconnect_delay = reconnect_delay
+        self.on_frame = on_frame
+        self.decoded = 0
+        self.dropped = 0
+        self.consumed = 0
+        self.reconnects = 0
+        self.finished = False
+        self._frame = None
+        self._seq = 0
+        self._taken = 0
+        self._stamp = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def latest(self):
+        """``(stamp, frame)`` of the newest frame if it hasn't been taken yet, else None."""
+        with self._lock:
+            if self._taken == self._seq:
+                return None
+            self._taken = self._seq
+            self.consumed += 1
+            return self._stamp, self._frame
+
+    def has_new(self):
+        with self._lock:
+            return self._taken != self._seq
+
+    def stats(self):
+        with self._lock:
+            age = time.time() - self._stamp if self._stamp else None
+        return {"decoded": self.decoded, "consumed": self.consumed, "dropped": self.dropped,
+                "reconnects": self.reconnects, "age_s": round(age, 3) if age is not None else None}
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if is_live(self.source):
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # don't let the backend queue stale frames either
+        return cap
+
+    def _run(self):
+        while not self._stop.is_set():
+            cap = self._open()
+            if not cap.isOpened():
+                logger.warning("%s: could not open %s", self.name, self.source)
+            else:
+                self._decode(cap)
+            cap.release()
+            if self._stop.is_set() or not (is_live(self.source) or self.loop):
+                break
+            if is_live(self.source):
+                self.reconnects += 1
+                self._stop.wait(self.reconnect_delay)
+        self.finished = True
+        if self.on_frame:
+            self.on_frame()
+
+    def _decode(self, cap):
+        fps = float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+        interval = 1.0 / fps
+        next_due = time.perf_counter()
+        while not self._stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                return
+            if self.realtime:
+                next_due += interval
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_due = time.perf_counter()   # fell behind: don't burst to catch up
+            with self._lock:
+                if self._taken != self._seq:
+                    self.dropped += 1   # the previous frame was never picked up
+                self._frame = frame
+                self._seq += 1
+                self._stamp = time.time()
+                self.decoded += 1
+            if self.on_frame:
+                self.on_frame()
+
+
+class StreamHub:
+    """Fan-in of many ``CameraStream`` slots.
+
+    Iterating yields ``(stream, stamp, frame)`` for every stream that has a
+    frame newer than the last one handed out, cycling through streams so a
+    fast camera can't starve the others. Iteration ends when every stream is
+    finished (files without ``loop``) or ``stop()`` is called.
+    """
+
+    def __init__(self, sources, names=None, loop=False, realtime=None):
+        self._wake = threading.Condition()
+        self._pending = False
+        self._stopped = False
+        names = names or [f"cam{i}" for i in range(len(sources))]
+        self.streams = [CameraStream(source, name=name, loop=loop, realtime=realtime, on_frame=self._notify)
+                        for source, name in zip(sources, names)]
+
+    def _notify(self):
+        with self._wake:
+            self._pending = True
+            self._wake.notify()
+
+    def start(self):
+        for s in self.streams:
+            s.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._notify()
+        for s in self.streams:
+            s.stop()
+
+    def __iter__(self):
+        while not self._stopped:
+            with self._wake:
+                if not self._pending:
+                    self._wake.wait(timeout=0.5)
+                self._pending = False
+            for s in self.streams:
+                item = s.latest()
+                if item is not None:
+                    yield (s,) + item
+            if all(s.finished and not s.has_new() for s in self.streams):
+                return
+
+    def stats(self):
+        return {s.name: s.stats() for s in self.streams}
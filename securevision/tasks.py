@@ -0,0 +1,133 @@
+"""Headless per-frame analysis for each app, without Streamlit.
+
+Each task wraps one app's detection logic and reports per-frame class
+counts, the same thing the PPE demo accumulates into its peak counts. A task
+instance holds per-video state (zone cache, kadhai timer), so make one per
+video or camera and share the loaded models between them. ``view`` (a
+``roi.InferenceView``) sets the camera's inference size and regions of
+interest.
+"""
+
+from collections import Counter
+
+from securevision import kadhai, ppe
+from securevision.harness import HARNESS_CONF, HarnessVerdictCache
+from securevision.roi import InferenceView
+from securevision.zone import GreenZoneCache, foot_points, outside_zone
+
+
+class Task:
+    name = ""
+    models = ()             # keys of securevision.models.WEIGHTS this task needs
+    violation_classes = ()
+
+    def __init__(self, models, camera_id="default", view=None):
+        self.m = models
+        self.camera_id = camera_id
+        self.view = view or InferenceView()
+
+    def is_violation(self, cls_name):
+        return cls_name in self.violation_classes
+
+    def process(self, frame, t):
+        """Analyse one frame at video time ``t`` (seconds).
+
+        Returns ``(frame_counts, score)``: a ``Counter`` of class names and a
+        violation score (0 when the frame is compliant), for snapshot episodes.
+        """
+        raise NotImplementedError
+
+    def extra(self):
+        """Task-specific fields for the report."""
+        return {}
+
+
+class PPETask(Task):
+    name = "ppe"
+    models = ("ppe",)
+
+    def __init__(self, models, conf=0.25, **kwargs):
+        super().__init__(models, **kwargs)
+        self.conf = conf
+        self.names = models["ppe"].names
+
+    def is_violation(self, cls_name):
+        return ppe.is_violation(cls_name)
+
+    def process(self, frame, t):
+        dets = self.view.detect(self.m["ppe"], frame, conf=self.conf)
+        _, matrix, unassigned = ppe.compliance(dets, self.names)
+        return ppe.class_counts(dets, self.names), ppe.violators(matrix, unassigned)
+
+
+class HarnessTask(Task):
+    name = "harness"
+    models = ("harness_person", "harness")
+    violation_classes = ("No Harness",)
+
+    def __init__(self, models, **kwargs):
+        super().__init__(models, **kwargs)
+        self.verdicts = HarnessVerdictCache()
+
+    def process(self, frame, t):
+        persons = self.view.detect(self.m["harness_person"], frame, classes=[0], conf=HARNESS_CONF)
+        person_boxes = persons[:, :4].astype(int)
+        found = self.verdicts.check(self.m["harness"], frame, person_boxes, now=t)
+        missing = sum(1 for boxes in found if len(boxes) == 0)
+        counts = Counter({"Harness": len(found) - missing, "No Harness": missing})
+        return +counts, missing
+
+    def extra(self):
+        return {"harness_checks": self.verdicts.stats()}
+
+
+class ZoneTask(Task):
+    name = "zone"
+    models = ("zone_person",)
+    violation_classes = ("Outside Zone",)
+
+    def __init__(self, models, **kwargs):
+        super().__init__(models, **kwargs)
+        self.zone_cache = GreenZoneCache(self.camera_id)
+
+    def process(self, frame, t):
+        _, zone_pts = self.zone_cache.get(frame)
+        self.view.set_zone(zone_pts)
+        dets = self.view.detect(self.m["zone_person"], frame)
+        person_boxes = dets[dets[:, 5] == 0, :4].astype(int)
+        outside = int(outside_zone(self.zone_cache.mask, foot_points(person_boxes)).sum())
+        counts = Counter({"Inside Zone": len(person_boxes) - outside, "Outside Zone": outside})
+        return +counts, outside
+
+    def extra(self):
+        return {"zone": self.zone_cache.summary()}
+
+
+class KadhaiTask(Task):
+    name = "kadhai"
+    models = ("kadhai", "kadhai_person")
+    violation_classes = ("Unattended Kadhai",)
+
+    def __init__(self, models, duration=kadhai.TIMER_DURATION, **kwargs):
+        super().__init__(models, **kwargs)
+        self.monitor = kadhai.KadhaiMonitor(models["kadhai"], models["kadhai_person"], duration, view=self.view)
+        self.alerts = []
+
+    def process(self, frame, t):
+        fired = self.monitor.update(frame, t)
+        if fired:
+            self.alerts.append({"time": round(t, 2), "unattended_since": round(self.monitor.timer.start_time, 2)})
+        counts = Counter({"Kadhai": len(self.monitor.kadhai_dets), "Person": len(self.monitor.person_dets),
+                          "Unattended Kadhai": int(fired)})
+        return +counts, int(fired)
+
+    def extra(self):
+        return {"alerts": self.alerts, "motion_gate": self.monitor.gate.stats()}
+
+
+TASKS = {task.name: task for task in (PPETask, HarnessTask, ZoneTask, KadhaiTask)}
+
+
+def frame_time(idx, fps):
+    """Video time in seconds of 1-based frame ``idx``."""
+    return (idx - 1) / fps if fps else 0.0
@@ -0,0 +1,175 @@
+"""Carry detections between frames, so the detector needn't run on every one.
+
+``KeyframeDetector`` runs the detector on a keyframe, then moves its boxes
+along with sparse Lucas-Kanade optical flow until the next one. A keyframe is
+due after ``k`` frames, or sooner when the flow loses a box (too few points
+survive the forward-backward check, or the box leaves the frame). With
+``adaptive=True``, ``k`` follows the measured cost per frame: it grows while
+the average frame takes longer than ``budget_ms``, and shrinks again once
+there's slack.
+
+``IoUTracker`` gives boxes persistent IDs across frames, for per-person state
+such as cached harness verdicts.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+DETECT_EVERY = 3          # frames per detector run (the starting k when adaptive)
+MAX_DETECT_EVERY = 10
+FRAME_BUDGET_MS = 66.0    # ~15 fps
+FLOW_GRID = 5             # points per box side fed to the optical flow
+FLOW_FB_ERROR = 1.0       # px; forward-backward disagreement above this drops a point
+MIN_TRACK_CONFIDENCE = 0.4
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+def box_iou(a, b):
+    """(N, M) IoU of xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def grid_points(boxes, n=FLOW_GRID):
+    """``n`` x ``n`` points inside each box (inset by 10%), as an (N*n*n, 1, 2) float32 array."""
+    steps = np.linspace(0.1, 0.9, n)
+    gx, gy = np.meshgrid(steps, steps)
+    x1, y1, x2, y2 = (boxes[:, i, None] for i in range(4))
+    xs = x1 + (x2 - x1) * gx.ravel()
+    ys = y1 + (y2 - y1) * gy.ravel()
+    return np.stack([xs, ys], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+
+
+def propagate(prev_gray, gray, boxes, n=FLOW_GRID):
+    """Shift ``boxes`` (xyxy) from ``prev_gray`` to ``gray``.
+
+    Returns the moved boxes and, per box, the fraction of its points that
+    tracked consistently. That fraction works as a confidence in the move.
+    """
+    if len(boxes) == 0:
+        return boxes, np.zeros(0)
+    p0 = grid_points(boxes, n)
+    p1, st, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, p0, None, **LK_PARAMS)
+    back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, p1, None, **LK_PARAMS)
+    fb = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+    good = ((st.ravel() == 1) & (st_back.ravel() == 1) & (fb < FLOW_FB_ERROR)).reshape(len(boxes), -1)
+    shift = (p1 - p0).reshape(len(boxes), -1, 2)
+
+    moved = boxes.astype(np.float32).copy()
+    for i in range(len(boxes)):
+        if good[i].any():
+            dx, dy = np.median(shift[i][good[i]], axis=0)
+            moved[i] += (dx, dy, dx, dy)
+    return moved, good.mean(axis=1)
+
+
+class KeyframeDetector:
+    """Detections for every frame, with the detector only running on keyframes.
+
+    ``update(img, detect)`` returns the ``(N, 6)`` detections for ``img``
+    (see ``annotate.as_array``), calling ``detect(img)`` only when a keyframe
+    is due. In between, classes and scores are kept and boxes follow the flow,
+    timed as ``track.flow`` when ``metrics`` is given.
+    """
+
+    def __init__(self, k=DETECT_EVERY, max_k=MAX_DETECT_EVERY, adaptive=True, budget_ms=FRAME_BUDGET_MS,
+                 min_confidence=MIN_TRACK_CONFIDENCE, metrics=None):
+        self.k = k
+        self.max_k = max_k
+        self.adaptive = adaptive
+        self.budget_ms = budget_ms
+        self.min_confidence = min_confidence
+        self.metrics = metrics
+        self.frames = 0
+        self.keyframes = 0
+        self.frame_ms = 0.0   # moving average of the whole update
+        self._since = 0
+        self._lost = True
+        self._gray = None
+        self._dets = np.zeros((0, 6), dtype=np.float32)
+
+    def update(self, img, detect):
+        t0 = time.perf_counter()
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        self.frames += 1
+        if self._lost or self._since >= self.k or self._gray is None or self._gray.shape != gray.shape:
+            self._dets = np.asarray(detect(img), dtype=np.float32).reshape(-1, 6)
+            self._since = 1
+            self._lost = False
+            self.keyframes += 1
+        else:
+            t_flow = time.perf_counter()
+            boxes, confidence = propagate(self._gray, gray, self._dets[:, :4])
+            if self.metrics:
+                self.metrics.observe("track.flow", time.perf_counter() - t_flow)
+            h, w = gray.shape
+            inside = (boxes[:, 0] < w) & (boxes[:, 2] > 0) & (boxes[:, 1] < h) & (boxes[:, 3] > 0)
+            self._dets = self._dets.copy()
+            self._dets[:, :4] = boxes
+            self._since += 1
+            self._lost = bool(len(boxes)) and bool((confidence < self.min_confidence).any() or not inside.all())
+        self._gray = gray
+
+        ms = (time.perf_counter() - t0) * 1000
+        self.frame_ms = ms if self.frames == 1 else 0.9 * self.frame_ms + 0.1 * ms
+        if self.adaptive and self._since == 1 and self.frames > 1:
+            # adjust once per keyframe cycle, against the amortised cost per frame
+            if self.frame_ms > self.budget_ms:
+                self.k = min(self.max_k, self.k + 1)
+            elif self.frame_ms < 0.7 * self.budget_ms:
+                self.k = max(1, self.k - 1)
+        return self._dets
+
+
+class IoUTracker:
+    """Persistent IDs for boxes across frames, by greedy IoU matching.
+
+    ``update(boxes)`` returns one ID per box. A box takes over the track it
+    overlaps most (IoU >= ``min_iou``), otherwise it starts a new one. Tracks
+    unmatched for more than ``max_missed`` updates are forgotten.
+    """
+
+    def __init__(self, min_iou=0.3, max_missed=15):
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.next_id = 1
+        self._ids = []
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._missed = []
+
+    @property
+    def active(self):
+        return set(self._ids)
+
+    def update(self, boxes):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        ids = [0] * len(boxes)
+        matched = set()
+        if len(boxes) and len(self._ids):
+            iou = box_iou(boxes, self._boxes)
+            while True:
+                i, j = np.unravel_index(np.argmax(iou), iou.shape)
+                if iou[i, j] < self.min_iou:
+                    break
+                ids[i] = self._ids[j]
+                matched.add(j)
+                iou[i, :] = 0
+                iou[:, j] = 0
+        for i, tid in enumerate(ids):
+            if not tid:
+                ids[i] = self.next_id
+                self.next_id += 1
+
+        keep = [j for j in range(len(self._ids))
+                if j not in matched and self._missed[j] < self.max_missed]
+        self._ids = ids + [self._ids[j] for j in keep]
+        self._boxes = np.concatenate([boxes, self._boxes[keep]])
+        self._missed = [0] * len(ids) + [self._missed[j] + 1 for j in keep]
+        return ids
@@ -0,0 +1,71 @@
+"""Wall-clock budgeted refresh of Streamlit placeholders.
+
+Every ``slot.markdown`` / ``slot.image`` / ``slot.progress`` call is a
+websocket message. Sending them for every processed frame competes with
+inference. ``UIScheduler`` lets each widget refresh at most ``rate`` times per
+second, and only when its content actually changed. Content is built lazily,
+so a skipped update costs nothing.
+"""
+
+import time
+
+DEFAULT_RATE = 4.0   # refreshes per second per widget
+
+
+class UIScheduler:
+    """Throttle updates per widget name.
+
+    ``update(name, key, send)`` calls ``send()`` only if ``name`` is due under
+    its rate and ``key`` (any cheap, comparable summary of the content) differs
+    from what was last sent. Skipped updates are remembered so ``flush()`` can
+    send the latest state once the loop ends.
+    """
+
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, clock=time.monotonic):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.clock = clock
+        self.sent = {}
+        self.skipped = 0
+        self.started = clock()
+        self._last_time = {}
+        self._last_key = {}
+        self._pending = {}
+
+    def due(self, name):
+        """True if ``name`` may refresh now (use to skip building content early)."""
+        rate = self.rates.get(name, self.default_rate)
+        last = self._last_time.get(name)
+        return last is None or rate <= 0 or self.clock() - last >= 1.0 / rate
+
+    def update(self, name, key, send):
+        """Send ``name``'s content if it is due and changed; returns True if sent."""
+        if name in self._last_key and self._last_key[name] == key:
+            self._pending.pop(name, None)
+            self.skipped += 1
+            return False
+        if not self.due(name):
+            self._pending[name] = (key, send)
+            self.skipped += 1
+            return False
+        self._send(name, key, send)
+        return True
+
+    def flush(self):
+        """Send the latest skipped update of every widget."""
+        for name, (key, send) in list(self._pending.items()):
+            self._send(name, key, send)
+
+    def total_sent(self):
+        return sum(self.sent.values())
+
+    def updates_per_second(self):
+        elapsed = self.clock() - self.started
+        return self.total_sent() / elapsed if elapsed > 0 else 0.0
+
+    def _send(self, name, key, send):
+        send()
+        self._pending.pop(name, None)
+        self._last_time[name] = self.clock()
+        self._last_key[name] = key
+        self.sent[name] = self.sent.get(name, 0) + 1
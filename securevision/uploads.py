@@ -0,0 +1,71 @@
+"""Per-session spooling of uploaded videos and disk-backed downloads.
+
+Uploads are copied to a scratch directory owned by one browser session, in
+fixed-size chunks, instead of ``uploaded.read()``-ing a second full copy into
+memory. Concurrent sessions therefore never share an input file. Exports stay
+on disk until the user actually clicks download.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+SPOOL_ROOT = os.path.join(tempfile.gettempdir(), "securevision_sessions")
+CHUNK_SIZE = 8 * 1024 * 1024
+SESSION_MAX_AGE = 12 * 3600   # scratch dirs untouched this long are removed
+
+
+def sweep_stale_sessions(root=SPOOL_ROOT, max_age=SESSION_MAX_AGE):
+    """Delete session scratch dirs that haven't been modified for ``max_age`` s."""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(root, "*")):
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def session_dir(state, root=SPOOL_ROOT):
+    """Scratch directory for one session, created on first use.
+
+    ``state`` is ``st.session_state`` (any dict-like works); the directory
+    path is remembered in it under ``"spool_dir"``.
+    """
+    path = state.get("spool_dir")
+    if not path or not os.path.isdir(path):
+        os.makedirs(root, exist_ok=True)
+        sweep_stale_sessions(root)
+        path = tempfile.mkdtemp(prefix="session_", dir=root)
+        state["spool_dir"] = path
+    return path
+
+
+def spool_upload(uploaded, directory, chunk_size=CHUNK_SIZE):
+    """Copy a Streamlit ``UploadedFile`` into ``directory`` and return its path.
+
+    The copy is made once per distinct upload; reruns reuse the file on disk,
+    and a new upload replaces the previous one.
+    """
+    suffix = os.path.splitext(uploaded.name)[-1] or ".mp4"
+    file_id = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+    digest = hashlib.sha1(file_id.encode()).hexdigest()[:12]
+    path = os.path.join(directory, f"upload_{digest}{suffix}")
+
+    if not os.path.exists(path):
+        for old in glob.glob(os.path.join(directory, "upload_*")):
+            os.unlink(old)
+        part = path + ".part"
+        uploaded.seek(0)
+        with open(part, "wb") as f:
+            shutil.copyfileobj(uploaded, f, chunk_size)
+        os.replace(part, path)
+    return path
+
+
+def deferred_file(path):
+    """``st.download_button`` data that opens ``path`` only when clicked."""
+    return lambda: open(path, "rb")
@@ -0,0 +1,75 @@
+"""Frame sources for the offline video modes.
+
+Skipped frames are only ``grab()``-ed: the decoder advances, but the frame
+is never retrieved or converted to BGR. Time-based sampling seeks over long
+gaps instead of decoding through them.
+"""
+
+import cv2
+
+SEEK_MIN_GAP = 2.0   # seconds; shorter gaps are grabbed through, longer ones seeked
+
+
+def iter_frames(cap, every=1):
+    """Yield ``(idx, frame)`` for every ``every``-th frame of ``cap`` (1-based idx)."""
+    if every < 1:
+        raise ValueError(f"every must be at least 1, got {every}")
+    idx = 0
+    while cap.isOpened():
+        idx += 1
+        if idx % every != 0:
+            if not cap.grab():
+                break
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield idx, frame
+
+
+def sampled_indices(frame_count, every=1, per_second=None, fps=25.0):
+    """The 1-based frame indices ``iter_frames`` / ``iter_sampled`` aim for in a ``frame_count``-frame video."""
+    if per_second is not None and per_second <= 0:
+        raise ValueError(f"per_second must be positive, got {per_second}")
+    if not per_second:
+        if every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        return list(range(every, frame_count + 1, every))
+    step = fps / per_second
+    return sorted({int(round(k * step)) + 1 for k in range(int(frame_count / step) + 1)} - {frame_count + 1})
+
+
+def iter_sampled(cap, per_second, fps=None, seek_min_gap=SEEK_MIN_GAP):
+    """Yield ``(idx, frame)`` at ``per_second`` frames per second of video time.
+
+    Which frames are picked doesn't depend on the source FPS. Gaps shorter
+    than ``seek_min_gap`` seconds are grabbed through. Longer gaps are seeked;
+    the backend decodes from the nearest keyframe, and any shortfall is
+    grabbed.
+    """
+    if per_second <= 0:
+        raise ValueError(f"per_second must be positive, got {per_second}")
+    fps = fps or float(cap.get(cv2.CAP_PROP_FPS)) or 25.0
+    step = fps / per_second
+    seek_gap = seek_min_gap * fps
+    pos = 0        # frames consumed so far == 1-based idx of the last frame read
+    k = 0
+    while cap.isOpened():
+        target = int(round(k * step)) + 1
+        k += 1
+        if target <= pos:
+            continue
+
+        if target - 1 - pos > seek_gap and cap.set(cv2.CAP_PROP_POS_FRAMES, target - 1):
+            # trust where the backend actually landed; grab forward if short
+            pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        while pos < target - 1:
+            if not cap.grab():
+                return
+            pos += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        pos += 1
+        yield pos, frame
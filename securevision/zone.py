@@ -0,0 +1,214 @@
+"""Green safety-zone detection for the SafetyRegion app.
+
+The painted floor lines of a fixed camera almost never move, so
+``GreenZoneCache`` runs the full HSV → contour → polygon detection only every
+``interval`` frames, or sooner if a cheap low-resolution probe shows the green
+mask has drifted. Each detected zone is rasterized once into a ``ZoneMask``,
+so checking every person's foot-point is one array lookup.
+"""
+
+import logging
+import time
+from contextlib import nullcontext
+
+import cv2
+import numpy as np
+from shapely.geometry import Polygon
+
+logger = logging.getLogger(__name__)
+
+LOWER_GREEN = np.array([35, 40, 40])
+UPPER_GREEN = np.array([85, 255, 255])
+
+ZONE_REFRESH_FRAMES = 150      # full re-detection at least this often
+ZONE_DRIFT_THRESHOLD = 0.15    # 1 - IoU of the low-res green masks
+ZONE_PROBE_SIZE = (160, 120)   # (w, h) of the low-res drift probe
+ZONE_MARGIN = 0                # px of tolerance around a zone (negative shrinks it)
+
+
+def green_mask(frame):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, LOWER_GREEN, UPPER_GREEN)
+
+
+def detect_green_zone(frame):
+    """Largest green region as ``(Polygon, pts)``, or ``(None, None)``."""
+    mask = green_mask(frame)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if contours:
+        largest = max(contours, key=cv2.contourArea)
+        approx = cv2.approxPolyDP(largest, 5, True)
+        pts = [tuple(pt[0]) for pt in approx]
+        if len(pts) >= 3:   # specks of green collapse to a point or a line
+            return Polygon(pts), np.array(pts)
+    return None, None
+
+
+class ZoneMask:
+    """Rasterized lookup table for one or more zone polygons.
+
+    ``zones`` is a list of (K, 2) point arrays and ``margins`` an int (or one
+    per zone) of pixels to grow (positive) or shrink (negative) each zone by.
+    Pixels on a zone's edge count as inside it, and points outside the frame
+    count as outside every zone.
+    """
+
+    def __init__(self, zones, frame_shape, margins=ZONE_MARGIN):
+        h, w = frame_shape[:2]
+        if np.isscalar(margins):
+            margins = [margins] * len(zones)
+        self.masks = np.zeros((len(zones), h, w), dtype=bool)
+        for i, (pts, margin) in enumerate(zip(zones, margins)):
+            layer = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(layer, [np.asarray(pts, dtype=np.int32).reshape(-1, 1, 2)], 1)
+            if margin:
+                k = 2 * abs(int(margin)) + 1
+                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (k, k))
+                layer = cv2.dilate(layer, kernel) if margin > 0 else cv2.erode(layer, kernel)
+            self.masks[i] = layer.astype(bool)
+
+    def contains(self, points):
+        """(zones, N) bool array: is each (x, y) point inside each zone?"""
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        _, h, w = self.masks.shape
+        xs, ys = points[:, 0], points[:, 1]
+        in_frame = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        hits = self.masks[:, np.clip(ys, 0, h - 1), np.clip(xs, 0, w - 1)]
+        return hits & in_frame
+
+    def inside_any(self, points):
+        """(N,) bool array: is each point inside at least one zone?"""
+        return self.contains(points).any(axis=0)
+
+
+def foot_points(boxes):
+    """Bottom-centre (x, y) of each xyxy box, as an (N, 2) int array."""
+    boxes = np.asarray(boxes).reshape(-1, 4).astype(int)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) // 2, boxes[:, 3]], axis=1)
+
+
+def outside_zone(zone_mask, feet):
+    """(N,) bool: which foot-points fall outside every zone (none if no zone)."""
+    if zone_mask is None:
+        return np.zeros(len(feet), dtype=bool)
+    return ~zone_mask.inside_any(feet)
+
+
+class GreenZoneCache:
+    """Per-camera cache of the detected green zone.
+
+    ``get(frame)`` returns the same ``(Polygon, pts)`` as ``detect_green_zone``
+    but only recomputes it when the cache is empty, ``interval`` frames have
+    passed, the frame size changed, or the low-res green mask drifted more
+    than ``drift_threshold`` from the one seen at the last recompute. The
+    rasterized zone is kept in ``mask`` (None when no zone was found).
+    """
+
+    def __init__(self, camera_id="default", interval=ZONE_REFRESH_FRAMES,
+                 drift_threshold=ZONE_DRIFT_THRESHOLD, probe_size=ZONE_PROBE_SIZE,
+                 margin=ZONE_MARGIN):
+        self.camera_id = camera_id
+        self.interval = interval
+        self.drift_threshold = drift_threshold
+        self.probe_size = probe_size
+        self.margin = margin
+        self.mask = None
+        self.frames = 0
+        self.events = []          # (frame number, reason, detect ms)
+        self.detect_ms = 0.0
+        self.probe_ms = 0.0
+        self._zone = (None, None)
+        self._probe = None
+        self._shape = None
+        self._since = 0
+
+    def get(self, frame):
+        self.frames += 1
+        self._since += 1
+
+        t0 = time.perf_counter()
+        small = cv2.resize(frame, self.probe_size, interpolation=cv2.INTER_NEAREST)
+        probe = green_mask(small) > 0
+        self.probe_ms += (time.perf_counter() - t0) * 1000
+
+        reason = None
+        if self._probe is None:
+            reason = "initial"
+        elif frame.shape != self._shape:
+            reason = "resized"
+        elif self._since >= self.interval:
+            reason = "interval"
+        else:
+            union = np.count_nonzero(probe | self._probe)
+            drift = 1 - np.count_nonzero(probe & self._probe) / union if union else 0.0
+            if drift > self.drift_threshold:
+                reason = f"drift {drift:.2f}"
+
+        if reason is not None:
+            self._recompute(frame, probe, reason)
+        return self._zone
+
+    def invalidate(self):
+        """Force a full re-detection on the next frame."""
+        self._probe = None
+
+    def _recompute(self, frame, probe, reason):
+        t0 = time.perf_counter()
+        self._zone = detect_green_zone(frame)
+        pts = self._zone[1]
+        self.mask = ZoneMask([pts], frame.shape, self.margin) if pts is not None else None
+        ms = (time.perf_counter() - t0) * 1000
+        self.detect_ms += ms
+        self.events.append((self.frames, reason, ms))
+        self._probe = probe
+        self._shape = frame.shape
+        self._since = 0
+        logger.info("green zone recomputed for %s at frame %d (%s) in %.2f ms",
+                    self.camera_id, self.frames, reason, ms)
+
+    def summary(self):
+        """Recompute count and average per-frame cost, for reporting the saving."""
+        recomputes = len(self.events)
+        full_ms = self.detect_ms / recomputes if recomputes else 0.0
+        per_frame = (self.detect_ms + self.probe_ms) / self.frames if self.frames else 0.0
+        return {
+            "frames": self.frames,
+            "recomputes": recomputes,
+            "full_detect_ms": round(full_ms, 3),
+            "cached_ms_per_frame": round(per_frame, 3),
+        }
+
+
+def check_frame(frame, model, zone_cache, view, metrics=None):
+    """The SafetyRegion app's per-frame work, drawing on ``frame`` in place; returns the violator count.
+
+    The zone comes from ``zone_cache``, people from ``model`` through
+    ``view`` (a ``roi.InferenceView``), and each person's foot-point is checked
+    against the zone mask.
+    """
+    stage = metrics.stage if metrics is not None else lambda name: nullcontext()
+    orig_frame = frame.copy()
+    with stage("preprocess.zone"):
+        _, zone_pts = zone_cache.get(frame)
+
+    if zone_pts is not None:
+        cv2.polylines(frame, [zone_pts], isClosed=True, color=(0, 255, 0), thickness=2)
+
+    view.set_zone(zone_pts)
+    with stage("inference.person"):
+        dets = view.detect(model, orig_frame)
+
+    # All persons' foot-points checked against the rasterized zone in one lookup
+    with stage("postprocess"):
+        person_boxes = dets[dets[:, 5] == 0, :4].astype(int)
+        feet = foot_points(person_boxes)
+        outside = outside_zone(zone_cache.mask, feet)
+
+    with stage("annotate"):
+        for (x1, y1, x2, y2), (cx, cy), out in zip(person_boxes, feet, outside):
+            color = (0, 0, 255) if out else (0, 255, 0)
+
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.circle(frame, (cx, cy), 5, color, -1)
+    return int(outside.sum())